@@ -2,24 +2,26 @@ from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Header, Q
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, FileResponse, JSONResponse
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, StreamingResponse
 from fastapi.requests import Request
 from pydantic import BaseModel
 from typing import Optional, List
 import mysql.connector
+import aiomysql
 from datetime import datetime, date, timedelta
 import os
 import logging
 from logging.handlers import RotatingFileHandler
-from config import DB_CONFIG, APP_CONFIG
+from config import DB_CONFIG, APP_CONFIG, OCR_CONFIG
 import base64
 import shutil
 from pathlib import Path
 import json
 from functools import wraps
 from werkzeug.utils import secure_filename
-import requests
+import httpx
 import uuid
+import hashlib
 import argparse
 import ssl
 from PIL import Image
@@ -27,12 +29,26 @@ import asyncio
 from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 import io
 import threading
+import multiprocessing
 import queue
 import time
 import traceback  # 添加在文件顶部的其他导入语句旁边
 import re  # 添加正则表达式模块
 from mysql.connector import pooling
+from db_pool import ConnectionPool
+from async_db import AsyncDatabase
 from contextlib import asynccontextmanager
+from country_registry import CountryRegistry
+from ocr_client import OCRBackendPool
+from job_journal import JobJournal
+import daily_stats
+from thumbnail_engine import ThumbnailEngine, THUMBNAIL_FORMATS, thumbnail_path
+from upload_stream import receive_upload, UploadError, UploadTooLarge
+from image_normalizer import normalize_image
+from mrz_locator import crop_mrz
+from mrz_parser import find_mrz
+from memory_optimized_config import get_image_processing_config
+from ocr_events import OCREventBroker, EVENT_QUEUED, EVENT_PROCESSING, EVENT_COMPLETED, EVENT_FAILED
 
 # 配置日志
 logger = logging.getLogger('ocr_server.fastapi')
@@ -42,19 +58,67 @@ logger.setLevel(logging.INFO)
 MAX_UPLOAD_QUEUE = 30  # 最大上传队列数量
 IO_THREAD_POOL_SIZE = 10  # IO线程池大小
 UPLOAD_THREAD_POOL_SIZE = 5  # 专门用于文件上传的线程池
+OCR_CONSUMER_COUNT = int(os.getenv('OCR_CONSUMER_COUNT', '4'))  # 并发OCR消费者数量（同时发往OCR服务的最大任务数）
+OCR_DRAIN_TIMEOUT = float(os.getenv('OCR_DRAIN_TIMEOUT', '60'))  # 关闭服务时等待OCR队列清空的最长时间(秒)
+THUMBNAIL_SIZES = sorted(int(size) for size in os.getenv('THUMBNAIL_SIZES', '128,320,640').split(','))  # 缩略图最长边(像素)
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_WORKERS = int(os.getenv('THUMBNAIL_WORKERS', '2'))  # 缩略图工作进程数
+OCR_IMAGE_WORKERS = int(os.getenv('OCR_IMAGE_WORKERS', '2'))  # OCR前图片预处理（缩小重编码、定位MRZ区域）的工作进程数，不与缩略图和补生成排队
+IMAGE_PROCESSING_CONFIG = get_image_processing_config()
+OCR_MAX_IMAGE_SIDE = int(os.getenv('OCR_MAX_IMAGE_SIDE', str(IMAGE_PROCESSING_CONFIG['max_image_size'])))  # 发往OCR服务的图片最长边(像素)，0表示发送原图
+OCR_IMAGE_QUALITY = int(os.getenv('OCR_IMAGE_QUALITY', str(IMAGE_PROCESSING_CONFIG['compression_quality'])))  # 预处理后的JPEG质量
+MRZ_FAST_PATH = os.getenv('MRZ_FAST_PATH', '1') == '1'  # 先只识别裁剪出的护照MRZ区域，解析失败时再识别整页
 
 # 创建全局线程池
 thread_pool = ThreadPoolExecutor(max_workers=IO_THREAD_POOL_SIZE)
 upload_thread_pool = ThreadPoolExecutor(max_workers=UPLOAD_THREAD_POOL_SIZE)
+thumbnail_thread_pool = ThreadPoolExecutor(max_workers=THUMBNAIL_WORKERS)  # 等待缩略图进程池结果并写库的线程，不占用上传线程
+ocr_image_pool: Optional[ProcessPoolExecutor] = None  # OCR前图片预处理进程池（在应用启动时创建）
 
 # 全局队列
-ocr_queue = queue.Queue(maxsize=MAX_UPLOAD_QUEUE)  # OCR处理队列
+ocr_queue: Optional[asyncio.Queue] = None  # OCR处理队列（由事件循环中的消费者并发处理，在应用启动时于事件循环中创建）
 upload_queue = queue.Queue(maxsize=MAX_UPLOAD_QUEUE)  # 文件上传队列
 db_write_queue = queue.Queue()  # OCR结果写入队列
+DB_WRITE_BATCH_SIZE = int(os.getenv('DB_WRITE_BATCH_SIZE', '50'))  # 每次提交最多合并的写入数
+DB_WRITE_BATCH_WAIT_MS = float(os.getenv('DB_WRITE_BATCH_WAIT_MS', '20'))  # 收到第一条写入后最多等待合批的时间(毫秒)
+db_writer_stats = {
+    'commits': 0,
+    'rows': 0,
+    'failed_batches': 0,
+    'failed_rows': 0,
+    'last_rows_per_commit': 0,
+    'max_rows_per_commit': 0,
+    'last_commit_latency': 0.0,
+    'max_commit_latency': 0.0,
+    'total_commit_latency': 0.0
+}  # 写入线程统计
+db_writer_stats_lock = threading.Lock()
 
 # 全局状态管理
+ocr_in_flight = 0  # 正在处理的OCR任务数
+ocr_consumer_tasks = []  # OCR消费者任务
+ocr_recovery_task = None  # 启动时重放未完成任务的后台任务
+ocr_recovery_stats = {'running': False, 'recovered': 0, 'abandoned': 0}  # 任务重放统计（abandoned: 超过重放次数上限被标记为失败）
+thumbnail_backfill_task = None  # 启动时为缺少缩略图的历史记录补生成的后台任务
+thumbnail_stats = {'generated': 0, 'failed': 0, 'backfill_running': False, 'backfilled': 0}  # 缩略图生成统计
+image_normalize_stats = {'images': 0, 'reencoded': 0, 'failed': 0, 'original_bytes': 0, 'sent_bytes': 0}  # OCR前预处理统计
+mrz_fast_path_stats = {'attempts': 0, 'located': 0, 'accepted': 0, 'fallbacks': 0}  # MRZ裁剪快速识别统计
 processing_status = {}  # 处理状态字典
 processing_lock = threading.Lock()  # 状态字典的线程锁
+MAX_PROCESSING_STATUS = 5000  # 状态字典最多保留的记录数（超出时丢弃最早的）
+SSE_HEARTBEAT_INTERVAL = 15  # SSE连接心跳间隔(秒)，防止代理断开空闲连接
+
+# OCR状态事件推送（SSE）
+ocr_events = OCREventBroker()
+
+# OCR任务持久化日志（入队时记录，结果写入数据库后确认，重启后重放未确认的任务）
+job_journal = JobJournal(
+    os.getenv('OCR_JOB_JOURNAL', 'data/ocr_jobs.sqlite3'),
+    max_attempts=int(os.getenv('OCR_JOB_MAX_ATTEMPTS', '3'))
+)
+
+# 国家代码注册表（启动时加载，文件修改后自动重新加载）
+country_registry = CountryRegistry('data/country-codes.csv')
 
 # 获取项目根目录
 base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -100,15 +164,21 @@ async def lifespan(app: FastAPI):
         logger.info(f"读连接池大小: {DB_READ_POOL_CONFIG['pool_size']}")
         logger.info(f"写连接超时: {DB_WRITE_POOL_CONFIG['connect_timeout']}秒")
         logger.info(f"读连接超时: {DB_READ_POOL_CONFIG['connect_timeout']}秒")
+        logger.info(f"异步连接池大小: {ASYNC_DB_POOL_SIZE}")
+        await async_db.start()
         
         # 线程池和队列配置
         logger.info("\n[线程池和队列配置]")
         logger.info(f"IO线程池大小: {IO_THREAD_POOL_SIZE}")
         logger.info(f"最大上传队列数量: {MAX_UPLOAD_QUEUE}")
+        logger.info(f"OCR并发消费者数量: {OCR_CONSUMER_COUNT}")
         
         # OCR服务配置
         logger.info("\n[OCR服务配置]")
-        logger.info(f"OCR服务地址: {OCR_SERVICE_URL}")
+        logger.info(f"OCR服务地址: {', '.join(OCR_SERVICE_URLS)}")
+        logger.info(f"OCR路由策略: {OCR_ROUTING}")
+        logger.info(f"OCR连接超时: {OCR_CONFIG['connect_timeout']}秒, 读取超时: {OCR_CONFIG['read_timeout']}秒")
+        await ocr_backends.start()
         
         # 目录配置
         logger.info("\n[目录配置]")
@@ -125,12 +195,45 @@ async def lifespan(app: FastAPI):
         OCR_INFO_DIR.mkdir(exist_ok=True)
         logger.info(f"创建OCR信息目录: {OCR_INFO_DIR}")
         
+        # 缩略图进程池
+        thumbnail_engine.start()
+        # OCR前图片预处理进程池（与缩略图分开，OCR任务不排在缩略图和补生成之后）
+        global ocr_image_pool
+        ocr_image_pool = ProcessPoolExecutor(
+            max_workers=OCR_IMAGE_WORKERS,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+        logger.info(f"OCR图片预处理进程池已创建: {OCR_IMAGE_WORKERS} 个进程")
+        
+        # 加载国家代码注册表
+        logger.info("\n[国家代码]")
+        if country_registry.load():
+            logger.info(f"国家代码已加载: {len(country_registry.countries)} 条")
+        else:
+            logger.warning(f"国家代码加载失败: {country_registry.csv_path}")
+        
+        # 打开OCR任务日志
+        logger.info("\n[OCR任务日志]")
+        job_journal.open()
+        
+        # 绑定状态事件推送的事件循环（写入线程通过它把事件切回事件循环）
+        ocr_events.bind(asyncio.get_running_loop())
+        
         # 启动处理线程
         logger.info("\n[启动处理线程]")
-        # 启动OCR处理线程
-        ocr_thread = threading.Thread(target=process_ocr_queue, daemon=True)
-        ocr_thread.start()
-        logger.info("OCR处理线程已启动")
+        # 创建OCR队列（Python 3.8/3.9 的 asyncio.Queue 在创建时绑定事件循环，必须在运行中的事件循环里创建）
+        global ocr_queue
+        ocr_queue = asyncio.Queue(maxsize=MAX_UPLOAD_QUEUE)
+        # 启动OCR队列消费者
+        for consumer_id in range(OCR_CONSUMER_COUNT):
+            ocr_consumer_tasks.append(asyncio.create_task(ocr_consumer(consumer_id)))
+        logger.info(f"OCR队列消费者已启动: {OCR_CONSUMER_COUNT} 个")
+        
+        # 后台重放上次未完成的任务，不阻塞服务就绪
+        global ocr_recovery_task, thumbnail_backfill_task
+        ocr_recovery_task = asyncio.create_task(recover_ocr_jobs())
+        # 后台为缺少缩略图的历史记录补生成
+        thumbnail_backfill_task = asyncio.create_task(backfill_thumbnails())
         
         # 启动OCR结果写入线程
         write_thread = threading.Thread(target=ocr_result_writer, daemon=True)
@@ -151,10 +254,44 @@ async def lifespan(app: FastAPI):
         # 关闭事件
         logger.info("正在关闭服务...")
         
+        # 停止任务重放（未重放的任务仍在日志中，下次启动时继续）
+        if ocr_recovery_task and not ocr_recovery_task.done():
+            ocr_recovery_task.cancel()
+            await asyncio.gather(ocr_recovery_task, return_exceptions=True)
+        if thumbnail_backfill_task and not thumbnail_backfill_task.done():
+            thumbnail_backfill_task.cancel()
+            await asyncio.gather(thumbnail_backfill_task, return_exceptions=True)
+        
+        # 等待已排队的OCR任务处理完毕，再停止消费者
+        await drain_ocr_queue(OCR_DRAIN_TIMEOUT)
+        for consumer_task in ocr_consumer_tasks:
+            consumer_task.cancel()
+        await asyncio.gather(*ocr_consumer_tasks, return_exceptions=True)
+        ocr_consumer_tasks.clear()
+        logger.info("OCR队列消费者已停止")
+        
+        # 关闭OCR服务客户端连接池
+        await ocr_backends.close()
+        
+        # 关闭异步数据库连接池
+        await async_db.close()
+        
         # 关闭线程池
         thread_pool.shutdown(wait=True)
         logger.info("线程池已关闭")
         
+        # 关闭缩略图线程池和进程池
+        thumbnail_thread_pool.shutdown(wait=True)
+        thumbnail_engine.close()
+        
+        # 关闭OCR图片预处理进程池
+        ocr_image_pool.shutdown(wait=True, cancel_futures=True)
+        logger.info("OCR图片预处理进程池已关闭")
+        
+        # 关闭OCR任务日志（未确认的任务在下次启动时重放）
+        job_journal.close()
+        logger.info("OCR任务日志已关闭")
+        
         logger.info("服务已停止")
         
     except Exception as e:
@@ -188,8 +325,30 @@ UPLOAD_DIR.mkdir(exist_ok=True)
 OCR_INFO_DIR = Path("ocr_info")
 OCR_INFO_DIR.mkdir(exist_ok=True)
 
+# 图片处理进程池：缩略图和OCR前的预处理（JPEG 按 DCT 缩放解码，在启动时创建）
+thumbnail_engine = ThumbnailEngine(UPLOAD_DIR, THUMBNAIL_SIZES, quality=THUMBNAIL_QUALITY, workers=THUMBNAIL_WORKERS)
+
 # OCR服务配置
 OCR_SERVICE_URL = os.getenv('OCR_SERVICE_URL', 'http://localhost:8080/ocr')
+# 多个OCR后端用逗号分隔，未设置时只使用 OCR_SERVICE_URL
+OCR_SERVICE_URLS = [
+    url.strip() for url in os.getenv('OCR_SERVICE_URLS', OCR_SERVICE_URL).split(',') if url.strip()
+]
+OCR_ROUTING = os.getenv('OCR_ROUTING', OCR_CONFIG['routing'])
+
+# OCR后端池（每个后端一个长连接池，随应用生命周期启动和关闭）
+ocr_backends = OCRBackendPool(
+    OCR_SERVICE_URLS,
+    routing=OCR_ROUTING,
+    failure_threshold=OCR_CONFIG['failure_threshold'],
+    probe_interval=OCR_CONFIG['probe_interval'],
+    ewma_alpha=OCR_CONFIG['ewma_alpha'],
+    health_urls=OCR_CONFIG.get('health_urls'),
+    connect_timeout=OCR_CONFIG['connect_timeout'],
+    read_timeout=OCR_CONFIG['read_timeout'],
+    max_connections=OCR_CONFIG['max_connections'],
+    max_keepalive_connections=OCR_CONFIG['max_keepalive_connections']
+)
 
 # 配置OCR日志
 OCR_LOG_DIR = Path("logs/ocr")
@@ -200,33 +359,31 @@ DB_WRITE_POOL_CONFIG = {
     **DB_CONFIG,
     'pool_name': 'write_pool',
     'pool_size': 20,  # 写连接池大小
-    'pool_reset_session': True,
     'autocommit': True,
-    'connect_timeout': 20,
-    'time_zone': '+00:00'
+    'connect_timeout': 20
 }
 
 DB_READ_POOL_CONFIG = {
     **DB_CONFIG,
     'pool_name': 'read_pool',
     'pool_size': 12,  # 读连接池大小
-    'pool_reset_session': True,
     'autocommit': True,
-    'connect_timeout': 10,
-    'time_zone': '+00:00'
+    'connect_timeout': 10
 }
 
 # 配置数据库连接池（保持向后兼容）
 DB_POOL_CONFIG = {
     **DB_CONFIG,
     'pool_name': 'mypool',
-    'pool_size': 32,  # 最大允许值32
-    'pool_reset_session': True,
+    'pool_size': 32,
     'autocommit': True,
-    'connect_timeout': 20,
-    'time_zone': '+00:00'
+    'connect_timeout': 20
 }
 
+# 每个物理连接建立时设置一次的会话变量（归还连接池时不重置会话）
+DB_SESSION_VARIABLES = {'time_zone': '+08:00'}  # 东八区
+DB_IDLE_CHECK_SECONDS = 30  # 连接空闲超过该时间后，检出时先检查存活
+
 # 数据模型
 class OCRRecord(BaseModel):
     id: int
@@ -260,46 +417,32 @@ class VisaInfoUpdate(BaseModel):
     visa_no: Optional[str] = None
     visa_date: Optional[str] = None
 
-# 创建全局连接池
-try:
-    connection_pool = mysql.connector.pooling.MySQLConnectionPool(**DB_POOL_CONFIG)
-    logger.info(f"数据库连接池初始化成功，连接池大小: {DB_POOL_CONFIG['pool_size']}")
-except Exception as e:
-    logger.error(f"数据库连接池初始化失败: {str(e)}")
-    raise
+# 创建全局连接池（物理连接按需建立）
+connection_pool = ConnectionPool(
+    DB_POOL_CONFIG,
+    session_variables=DB_SESSION_VARIABLES,
+    max_retries=5,
+    idle_check_seconds=DB_IDLE_CHECK_SECONDS
+)
+logger.info(f"数据库连接池初始化成功，连接池大小: {DB_POOL_CONFIG['pool_size']}")
 
 def get_db_connection():
     """从连接池获取数据库连接"""
-    max_retries = 5
-    retry_delay = 1
-    last_error = None
-    
-    for attempt in range(max_retries):
-        try:
-            # 从连接池获取连接
-            connection = connection_pool.get_connection()
-            if connection.is_connected():
-                # 设置时区为东八区
-                cursor = connection.cursor()
-                cursor.execute("SET time_zone = '+08:00'")
-                cursor.close()
-                return connection
-            else:
-                connection.ping(reconnect=True, attempts=3, delay=1)
-                # 设置时区为东八区
-                cursor = connection.cursor()
-                cursor.execute("SET time_zone = '+08:00'")
-                cursor.close()
-                return connection
-        except mysql.connector.Error as e:
-            last_error = e
-            if attempt < max_retries - 1:
-                sleep_time = retry_delay * (2 ** attempt)
-                logger.warning(f"获取数据库连接失败，{sleep_time}秒后重试: {str(e)}")
-                time.sleep(sleep_time)
-            else:
-                logger.error(f"获取数据库连接失败，已重试{max_retries}次: {str(e)}")
-                raise last_error
+    return connection_pool.get_connection()
+
+# 异步连接池（供API路由在事件循环中查询，随应用生命周期创建和关闭）
+ASYNC_DB_POOL_SIZE = int(os.getenv('ASYNC_DB_POOL_SIZE', '20'))
+async_db = AsyncDatabase(
+    {**DB_CONFIG, 'connect_timeout': 10},
+    minsize=1,
+    maxsize=ASYNC_DB_POOL_SIZE,
+    session_variables=DB_SESSION_VARIABLES
+)
+
+async def get_async_cursor():
+    """FastAPI依赖项，从异步连接池获取字典游标"""
+    async with async_db.cursor() as cursor:
+        yield cursor
 
 def get_db():
     """FastAPI依赖项，用于获取数据库连接"""
@@ -346,22 +489,61 @@ async def index(request: Request):
         }
     })
 
+# 记录总数缓存：{(start_date, end_date): (总数, 过期时间)}，翻页时不再每次 COUNT(*)
+RECORD_COUNT_CACHE_TTL = 30  # 秒
+record_count_cache = {}
+
+def encode_records_cursor(created_at: str, record_id: int) -> str:
+    """把最后一条记录的 (created_at, id) 编码为不透明的游标"""
+    raw = json.dumps([created_at, record_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_records_cursor(token: str):
+    """解析游标，返回 (created_at, id)"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        created_at, record_id = json.loads(raw)
+        datetime.strptime(created_at, '%Y-%m-%d %H:%M:%S')
+        return created_at, int(record_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+
+async def count_records_cached(cursor, count_query: str, params: list, cache_key) -> int:
+    """带缓存的记录总数（近似值，最多滞后 RECORD_COUNT_CACHE_TTL 秒）"""
+    cached = record_count_cache.get(cache_key)
+    now = time.monotonic()
+    if cached and cached[1] > now:
+        return cached[0]
+    await cursor.execute(count_query, tuple(params))
+    total = (await cursor.fetchone())['total']
+    if len(record_count_cache) > 256:
+        record_count_cache.clear()
+    record_count_cache[cache_key] = (total, now + RECORD_COUNT_CACHE_TTL)
+    return total
+
 @app.get("/api/ocr/records")
 async def get_records_route(
     page: int = 1,
     page_size: int = 20,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    db: mysql.connector.MySQLConnection = Depends(get_db)
+    cursor_token: Optional[str] = Query(None, alias="cursor"),
+    include_total: bool = True,
+    cursor: aiomysql.DictCursor = Depends(get_async_cursor)
 ):
+    """分页获取记录
+    - 传 cursor 参数时使用游标分页（按 created_at, id 倒序），cursor 为空字符串表示第一页，
+      返回的 next_cursor 用于获取下一页，翻页速度与页码无关
+    - 不传 cursor 时按 page 页码分页（兼容旧客户端）
+    - 总数来自缓存的近似值，include_total=false 时不返回总数
+    """
     try:
         # 验证参数
         if page < 1:
             page = 1
         if page_size not in [20, 50]:
             page_size = 20
-            
-        cursor = db.cursor(dictionary=True)
+        keyset_mode = cursor_token is not None
         
         # 构建基础查询 - 修复时区转换问题
         base_query = """
@@ -369,9 +551,9 @@ async def get_records_route(
                 id, passport_no, name1, name2, gender, birth_date, 
                 expiry_date, country_name_cn, doc_type_cn, 
                 visa_no, visa_date, passport_type, image_path,
-                DATE_FORMAT(created_at, '%Y-%m-%d %H:%i:%S') as created_at,
-                DATE_FORMAT(updated_at, '%Y-%m-%d %H:%i:%S') as updated_at,
-                status
+                DATE_FORMAT(created_at, '%%Y-%%m-%%d %%H:%%i:%%S') as created_at,
+                DATE_FORMAT(updated_at, '%%Y-%%m-%%d %%H:%%i:%%S') as updated_at,
+                status, ocr_cache_hit, thumbnail_sizes
             FROM passport_records
         """
         count_query = "SELECT COUNT(*) as total FROM passport_records"
@@ -380,32 +562,43 @@ async def get_records_route(
         params = []
         where_clauses = []
         
-        # 处理日期过滤 - 修复时区转换问题
+        # 处理日期过滤 - 使用左闭右开的时间范围，可以走 created_at 索引
         if start_date and end_date:
-            where_clauses.append("DATE(created_at) BETWEEN %s AND %s")
+            where_clauses.append("created_at >= %s AND created_at < %s + INTERVAL 1 DAY")
             params.extend([start_date, end_date])
         
         # 构建完整的查询语句
         if where_clauses:
             where_sql = " WHERE " + " AND ".join(where_clauses)
-            base_query += where_sql
             count_query += where_sql
         
-        # 获取总记录数
-        cursor.execute(count_query, tuple(params))
-        total_records = cursor.fetchone()['total']
+        # 获取总记录数（缓存的近似值）
+        total_records = None
+        if include_total:
+            total_records = await count_records_cached(cursor, count_query, params, (start_date, end_date))
         
-        # 添加分页
-        base_query += " ORDER BY created_at DESC LIMIT %s OFFSET %s"
-        offset = (page - 1) * page_size
+        # 添加分页：多取一条用于判断是否还有下一页
         query_params = params.copy()  # 创建参数副本
-        query_params.extend([page_size, offset])
+        if keyset_mode and cursor_token:
+            last_created_at, last_id = decode_records_cursor(cursor_token)
+            where_clauses.append("created_at <= %s AND (created_at < %s OR id < %s)")
+            query_params.extend([last_created_at, last_created_at, last_id])
+        if where_clauses:
+            base_query += " WHERE " + " AND ".join(where_clauses)
+        base_query += " ORDER BY created_at DESC, id DESC LIMIT %s"
+        query_params.append(page_size + 1)
+        if not keyset_mode:
+            base_query += " OFFSET %s"
+            query_params.append((page - 1) * page_size)
         
         # 执行查询
         logger.info(f"执行查询: {base_query}")
         logger.info(f"查询参数: {query_params}")
-        cursor.execute(base_query, tuple(query_params))
-        records = cursor.fetchall()
+        await cursor.execute(base_query, tuple(query_params))
+        records = list(await cursor.fetchall())
+        has_more = len(records) > page_size
+        records = records[:page_size]
+        next_cursor = encode_records_cursor(records[-1]['created_at'], records[-1]['id']) if has_more else None
         
         # 处理日期字段和图片路径
         for record in records:
@@ -414,37 +607,47 @@ async def get_records_route(
                 if record.get(field) in ('0000-00-00', None):
                     record[field] = None
             
-            # 处理图片路径
+            # 处理图片路径（缩略图是否存在以数据库记录为准，不访问文件系统）
+            thumbnail_sizes = record.pop('thumbnail_sizes', None)
             if record.get('image_path'):
                 record['image_url'] = f"/uploads/{record['image_path']}"
-                thumb_path = UPLOAD_DIR / "thumbnails" / record['image_path']
-                if thumb_path.exists():
-                    record['thumbnail_url'] = f"/uploads/thumbnails/{record['image_path']}"
+                record['thumbnails'] = thumbnail_urls(record['image_path'], thumbnail_sizes)
+                if record['thumbnails']:
+                    # 兼容旧前端：最小尺寸的 JPEG
+                    record['thumbnail_url'] = next(iter(record['thumbnails'].values()))['jpg']
                 else:
-                    try:
-                        original_path = UPLOAD_DIR / record['image_path']
-                        if original_path.exists():
-                            create_thumbnail(str(original_path))
-                            record['thumbnail_url'] = f"/uploads/thumbnails/{record['image_path']}"
-                        else:
-                            record['thumbnail_url'] = record['image_url']
-                    except Exception as e:
-                        logger.error(f"创建缩略图失败: {str(e)}")
-                        record['thumbnail_url'] = record['image_url']
+                    # 缩略图尚未生成，先用原图
+                    record['thumbnail_url'] = record['image_url']
             else:
                 record['image_url'] = None
                 record['thumbnail_url'] = None
+                record['thumbnails'] = {}
+        
+        if keyset_mode:
+            response = {
+                'records': records,
+                'next_cursor': next_cursor,
+                'has_more': has_more,
+                'page_size': page_size
+            }
+            if total_records is not None:
+                response['total_records'] = total_records
+            return response
         
         # 计算总页数
-        total_pages = (total_records + page_size - 1) // page_size
+        total_pages = (total_records + page_size - 1) // page_size if total_records is not None else None
         
         return {
             'records': records,
             'total_pages': total_pages,
             'current_page': page,
-            'total_records': total_records
+            'total_records': total_records,
+            'next_cursor': next_cursor,
+            'has_more': has_more
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"获取记录失败: {str(e)}")
         import traceback as tb  # 确保traceback可用
@@ -453,36 +656,27 @@ async def get_records_route(
 
 @app.get("/api/ocr/stats/simple")
 async def get_stats_simple(
-    db: mysql.connector.MySQLConnection = Depends(get_db)
+    cursor: aiomysql.DictCursor = Depends(get_async_cursor)
 ):
     """简化的统计接口，用于测试"""
     try:
         logger.info("开始执行简化统计查询")
         
-        # 检查数据库连接
-        if not db or not db.is_connected():
-            logger.error("数据库连接无效")
-            raise HTTPException(status_code=500, detail="数据库连接无效")
-        
-        cursor = db.cursor(dictionary=True)
-        
         # 基本连接测试
-        cursor.execute("SELECT 1")
-        result = cursor.fetchone()
+        await cursor.execute("SELECT 1")
+        result = await cursor.fetchone()
         logger.info(f"数据库连接测试成功: {result}")
         
         # 获取总数据量
-        cursor.execute("SELECT COUNT(*) as count FROM passport_records")
-        total_count = cursor.fetchone()['count']
+        await cursor.execute("SELECT COUNT(*) as count FROM passport_records")
+        total_count = (await cursor.fetchone())['count']
         logger.info(f"总数据量: {total_count}")
         
         # 获取今日数据量（简化版本）
-        cursor.execute("SELECT COUNT(*) as count FROM passport_records WHERE DATE(created_at) = CURDATE()")
-        today_count = cursor.fetchone()['count']
+        await cursor.execute("SELECT COUNT(*) as count FROM passport_records WHERE created_at >= CURDATE() AND created_at < CURDATE() + INTERVAL 1 DAY")
+        today_count = (await cursor.fetchone())['count']
         logger.info(f"今日数据量: {today_count}")
         
-        cursor.close()
-        
         return {
             'total_count': total_count,
             'today_count': today_count,
@@ -495,136 +689,101 @@ async def get_stats_simple(
         logger.error(f"异常堆栈: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"简化统计查询失败: {str(e)}")
 
+class StatsCache:
+    """统计结果缓存：短TTL，写入新数据后立即失效
+    invalidate() 只递增版本号，可在写入线程中调用
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._value = None
+        self._value_version = -1
+        self._expires_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None  # 首次使用时在事件循环中创建（Python 3.8/3.9 的锁在创建时绑定事件循环）
+
+    def invalidate(self):
+        self.version += 1
+
+    async def get(self, compute):
+        """返回缓存的统计结果，过期或失效时调用 compute() 重新计算（并发请求只计算一次）"""
+        if self._value is not None and self._value_version == self.version and time.monotonic() < self._expires_at:
+            self.hits += 1
+            return self._value
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._value is not None and self._value_version == self.version and time.monotonic() < self._expires_at:
+                self.hits += 1
+                return self._value
+            self.misses += 1
+            version = self.version
+            self._value = await compute()
+            self._value_version = version
+            self._expires_at = time.monotonic() + self.ttl
+            return self._value
+
+    def stats(self) -> dict:
+        return {'ttl': self.ttl, 'version': self.version, 'hits': self.hits, 'misses': self.misses}
+
+STATS_CACHE_TTL = float(os.getenv('STATS_CACHE_TTL', '10'))  # 统计缓存有效期(秒)
+stats_cache = StatsCache(STATS_CACHE_TTL)
+
+async def compute_today_stats(cursor) -> dict:
+    """一次查询同时得到今日各类型数量（汇总表中今天的几行）和总数（总数表），其余今日统计由分组结果计算"""
+    await cursor.execute("""
+        SELECT doc_type_cn, SUM(today_count) as count, SUM(total_count) as total
+        FROM (
+            SELECT doc_type_cn, record_count as today_count, 0 as total_count
+            FROM passport_daily_stats
+            WHERE stat_date = CURDATE()
+            UNION ALL
+            SELECT doc_type_cn, 0, record_count
+            FROM passport_stats_totals
+        ) as stats
+        GROUP BY doc_type_cn
+    """)
+    rows = await cursor.fetchall()
+    total_count = sum(int(row['total']) for row in rows)
+    today_doc_types = sorted(
+        ({'doc_type_cn': row['doc_type_cn'], 'count': int(row['count'])} for row in rows if row['count'] > 0),
+        key=lambda row: row['count'], reverse=True
+    )
+    
+    def count_where(predicate):
+        return sum(row['count'] for row in today_doc_types if predicate(row['doc_type_cn'] or ''))
+    
+    stats = {
+        'today_passport_count': count_where(lambda doc_type: doc_type == '护照'),
+        # 港澳台相关证件：包含港、澳、台字的所有证件
+        'today_hmt_count': count_where(lambda doc_type: any(ch in doc_type for ch in '港澳台')),
+        'today_id_card_count': count_where(lambda doc_type: doc_type == '身份证'),
+        'total_count': total_count,
+        'today_total': sum(row['count'] for row in today_doc_types),
+        'today_doc_types': today_doc_types,
+        'computed_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+    logger.info(f"统计已重新计算: 今日 {stats['today_total']} 条, 总计 {total_count} 条")
+    return stats
+
 @app.get("/api/ocr/stats")
 async def get_stats(
-    db: mysql.connector.MySQLConnection = Depends(get_db)
+    debug: bool = False,
+    cursor: aiomysql.DictCursor = Depends(get_async_cursor)
 ):
+    """今日统计（缓存，写入新数据后失效）
+    Args:
+        debug: 为true时附带数据库时区、最近记录等调试信息
+    """
     try:
-        logger.info("开始执行统计查询")
-        
-        # 检查数据库连接
-        if not db or not db.is_connected():
-            logger.error("数据库连接无效")
-            raise HTTPException(status_code=500, detail="数据库连接无效")
-        
-        cursor = db.cursor(dictionary=True)
-        
-        # 检查数据库连接
-        try:
-            cursor.execute("SELECT 1")
-            result = cursor.fetchone()
-            logger.info(f"数据库连接测试成功: {result}")
-        except Exception as e:
-            logger.error(f"数据库连接测试失败: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"数据库连接测试失败: {str(e)}")
-        
-        # 获取数据库时区信息
-        try:
-            cursor.execute("SELECT @@global.time_zone, @@session.time_zone, NOW(), CURDATE()")
-            timezone_info = cursor.fetchone()
-            logger.info(f"数据库时区信息: {timezone_info}")
-        except Exception as e:
-            logger.error(f"获取时区信息失败: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"获取时区信息失败: {str(e)}")
-        
-        # 检查表是否存在
-        try:
-            cursor.execute("SHOW TABLES LIKE 'passport_records'")
-            table_exists = cursor.fetchone()
-            if not table_exists:
-                logger.error("passport_records 表不存在")
-                raise HTTPException(status_code=500, detail="passport_records 表不存在")
-            logger.info("passport_records 表存在")
-        except Exception as e:
-            logger.error(f"检查表存在性失败: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"检查表存在性失败: {str(e)}")
-        
-        # 获取今日护照数量（使用本地时间）
-        try:
-            cursor.execute("""
-                SELECT COUNT(*) as count 
-                FROM passport_records 
-                WHERE DATE(created_at) = CURDATE()
-                AND doc_type_cn = '护照'
-            """)
-            today_passport_count = cursor.fetchone()['count']
-            logger.info(f"今日护照查询成功: {today_passport_count}")
-        except Exception as e:
-            logger.error(f"今日护照查询失败: {str(e)}")
-            today_passport_count = 0
-        
-        # 获取今日港澳台相关证件数量（包含港、澳、台字的所有证件）
-        try:
-            cursor.execute("""
-                SELECT COUNT(*) as count 
-                FROM passport_records 
-                WHERE DATE(created_at) = CURDATE()
-                AND (
-                    doc_type_cn LIKE '%%港%%' 
-                    OR doc_type_cn LIKE '%%澳%%' 
-                    OR doc_type_cn LIKE '%%台%%'
-                )
-            """)
-            today_hmt_count = cursor.fetchone()['count']
-            logger.info(f"今日港澳台查询成功: {today_hmt_count}")
-        except Exception as e:
-            logger.error(f"今日港澳台查询失败: {str(e)}")
-            today_hmt_count = 0
+        stats = dict(await stats_cache.get(lambda: compute_today_stats(cursor)))
         
-        # 获取今日身份证数量
-        try:
-            cursor.execute("""
-                SELECT COUNT(*) as count 
-                FROM passport_records 
-                WHERE DATE(created_at) = CURDATE()
-                AND doc_type_cn = '身份证'
-            """)
-            today_id_card_count = cursor.fetchone()['count']
-            logger.info(f"今日身份证查询成功: {today_id_card_count}")
-        except Exception as e:
-            logger.error(f"今日身份证查询失败: {str(e)}")
-            today_id_card_count = 0
-        
-        # 获取总数据量
-        try:
-            cursor.execute("SELECT COUNT(*) as count FROM passport_records")
-            total_count = cursor.fetchone()['count']
-            logger.info(f"总数据量查询成功: {total_count}")
-        except Exception as e:
-            logger.error(f"总数据量查询失败: {str(e)}")
-            total_count = 0
-        
-        # 获取今日总记录数
-        try:
-            cursor.execute("""
-                SELECT COUNT(*) as count 
-                FROM passport_records 
-                WHERE DATE(created_at) = CURDATE()
-            """)
-            today_total_count = cursor.fetchone()['count']
-            logger.info(f"今日总记录数查询成功: {today_total_count}")
-        except Exception as e:
-            logger.error(f"今日总记录数查询失败: {str(e)}")
-            today_total_count = 0
-        
-        # 获取今日各类型文档详细统计
-        try:
-            cursor.execute("""
-                SELECT doc_type_cn, COUNT(*) as count 
-                FROM passport_records 
-                WHERE DATE(created_at) = CURDATE()
-                GROUP BY doc_type_cn
-                ORDER BY count DESC
-            """)
-            today_doc_types = cursor.fetchall()
-            logger.info(f"今日各类型文档查询成功: {len(today_doc_types)} 种类型")
-        except Exception as e:
-            logger.error(f"今日各类型文档查询失败: {str(e)}")
-            today_doc_types = []
-        
-        # 获取最近几条记录的时区转换示例
-        try:
-            cursor.execute("""
+        if debug:
+            await cursor.execute("SELECT @@global.time_zone, @@session.time_zone, NOW(), CURDATE()")
+            timezone_info = await cursor.fetchone()
+            await cursor.execute("""
                 SELECT 
                     id,
                     doc_type_cn,
@@ -635,51 +794,19 @@ async def get_stats(
                 ORDER BY created_at DESC 
                 LIMIT 3
             """)
-            recent_examples = cursor.fetchall()
-            logger.info(f"最近记录示例查询成功: {len(recent_examples)} 条记录")
-        except Exception as e:
-            logger.error(f"最近记录示例查询失败: {str(e)}")
-            recent_examples = []
-        
-        # 记录详细的调试信息
-        logger.info(f"=== 统计调试信息 ===")
-        logger.info(f"数据库时区设置: 全局={timezone_info['@@global.time_zone']}, 会话={timezone_info['@@session.time_zone']}")
-        logger.info(f"数据库当前时间: {timezone_info['NOW()']}")
-        logger.info(f"数据库当前日期: {timezone_info['CURDATE()']}")
-        logger.info(f"今日总记录数: {today_total_count}")
-        logger.info(f"今日护照数量: {today_passport_count}")
-        logger.info(f"今日港澳台数量: {today_hmt_count}")
-        logger.info(f"今日身份证数量: {today_id_card_count}")
-        logger.info(f"总数据量: {total_count}")
-        
-        logger.info(f"今日各类型文档:")
-        for doc_type in today_doc_types:
-            logger.info(f"  {doc_type['doc_type_cn']}: {doc_type['count']}")
-        
-        logger.info(f"最近记录时区转换示例:")
-        for example in recent_examples:
-            logger.info(f"  ID:{example['id']}, 类型:{example['doc_type_cn']}, 原始时间:{example['created_at']}, 北京时间:{example['beijing_time']}, 北京日期:{example['beijing_date']}")
-        
-        cursor.close()
-        
-        return {
-            'today_passport_count': today_passport_count,
-            'today_hmt_count': today_hmt_count,
-            'today_id_card_count': today_id_card_count,
-            'total_count': total_count,
-            'debug_info': {
+            recent_examples = await cursor.fetchall()
+            stats['debug_info'] = {
                 'db_timezone_global': timezone_info['@@global.time_zone'],
                 'db_timezone_session': timezone_info['@@session.time_zone'],
                 'db_now': str(timezone_info['NOW()']),
                 'db_today': str(timezone_info['CURDATE()']),
-                'today_total': today_total_count,
-                'today_doc_types': today_doc_types,
-                'recent_examples': recent_examples
+                'today_total': stats['today_total'],
+                'today_doc_types': stats['today_doc_types'],
+                'recent_examples': recent_examples,
+                'cache': stats_cache.stats()
             }
-        }
-    except HTTPException:
-        # 重新抛出HTTP异常
-        raise
+        
+        return stats
     except Exception as e:
         logger.error(f"统计API异常: {str(e)}")
         import traceback
@@ -689,12 +816,10 @@ async def get_stats(
 @app.get("/api/ocr/records/{record_id}")
 async def get_record(
     record_id: int,
-    db: mysql.connector.MySQLConnection = Depends(get_db)
+    cursor: aiomysql.DictCursor = Depends(get_async_cursor)
 ):
-    cursor = db.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM passport_records WHERE id = %s", (record_id,))
-    record = cursor.fetchone()
-    cursor.close()
+    await cursor.execute("SELECT * FROM passport_records WHERE id = %s", (record_id,))
+    record = await cursor.fetchone()
     
     if not record:
         raise HTTPException(status_code=404, detail="Record not found")
@@ -705,10 +830,8 @@ async def get_record(
 async def update_record(
     record_id: int,
     record: OCRRecordUpdate,
-    db: mysql.connector.MySQLConnection = Depends(get_db)
+    cursor: aiomysql.DictCursor = Depends(get_async_cursor)
 ):
-    cursor = db.cursor()
-    
     # 构建更新字段
     update_fields = []
     values = []
@@ -751,86 +874,154 @@ async def update_record(
     """
     
     try:
-        cursor.execute(query, values)
-        db.commit()
+        # 修改证件类型会改变每日统计，与更新在同一事务中维护汇总表
+        await cursor.connection.begin()
+        before = await daily_stats.snapshot_async(cursor, [record_id])
+        await cursor.execute(query, values)
+        await daily_stats.apply_changes_async(cursor, [record_id], before)
+        await cursor.connection.commit()
     except Exception as e:
-        db.rollback()
+        await cursor.connection.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
     
+    stats_cache.invalidate()
     return {"message": "Record updated successfully"}
 
 @app.delete("/api/ocr/records/{record_id}")
 async def delete_record(
     record_id: int,
-    db: mysql.connector.MySQLConnection = Depends(get_db)
+    cursor: aiomysql.DictCursor = Depends(get_async_cursor)
 ):
-    cursor = db.cursor()
     try:
-        cursor.execute("DELETE FROM passport_records WHERE id = %s", (record_id,))
-        db.commit()
+        await cursor.connection.begin()
+        before = await daily_stats.snapshot_async(cursor, [record_id])
+        await cursor.execute("DELETE FROM passport_records WHERE id = %s", (record_id,))
+        await daily_stats.apply_changes_async(cursor, [record_id], before)
+        await cursor.connection.commit()
     except Exception as e:
-        db.rollback()
+        await cursor.connection.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
     
+    stats_cache.invalidate()
     return {"message": "Record deleted successfully"}
 
 @app.post("/api/ocr/records/{record_id}/recheck")
 async def recheck_record(
     record_id: int,
-    db: mysql.connector.MySQLConnection = Depends(get_db)
+    cursor: aiomysql.DictCursor = Depends(get_async_cursor)
 ):
-    cursor = db.cursor()
     try:
-        cursor.execute("""
+        await cursor.execute("""
             UPDATE passport_records 
             SET visa_no = NULL, 
                 visa_date = NULL,
                 updated_at = %s
             WHERE id = %s
         """, (datetime.now(), record_id))
-        db.commit()
+        await cursor.connection.commit()
         return {"message": "Visa information cleared successfully"}
     except Exception as e:
-        db.rollback()
+        await cursor.connection.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
 
 @app.get("/api/ocr/records/{record_id}/image")
 async def get_record_image(
     record_id: int,
-    db: mysql.connector.MySQLConnection = Depends(get_db)
+    cursor: aiomysql.DictCursor = Depends(get_async_cursor)
 ):
-    cursor = db.cursor(dictionary=True)
+    await cursor.execute("SELECT image_path FROM passport_records WHERE id = %s", (record_id,))
+    record = await cursor.fetchone()
+    if not record or not record['image_path']:
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    image_path = UPLOAD_DIR / record['image_path']
+    if not image_path.exists():
+        raise HTTPException(status_code=404, detail="Image file not found")
+    
+    return FileResponse(image_path)
+
+# 重复图片复用识别结果时复制的字段
+OCR_RESULT_FIELDS = [
+    'doc_type_cn', 'name1', 'name2', 'gender', 'birth_date', 'expiry_date',
+    'passport_no', 'country_name_cn', 'visa_no', 'visa_date', 'passport_type'
+]
+
+def find_cached_ocr_result(content_hash: str) -> Optional[dict]:
+    """按图片内容哈希查找最近一条识别完成的记录"""
+    db = get_db_connection()
     try:
-        cursor.execute("SELECT image_path FROM passport_records WHERE id = %s", (record_id,))
+        cursor = db.cursor(dictionary=True)
+        cursor.execute(f"""
+            SELECT id, image_path, thumbnail_sizes, {', '.join(OCR_RESULT_FIELDS)}
+            FROM passport_records
+            WHERE content_hash = %s AND status = 'completed'
+            ORDER BY id DESC
+            LIMIT 1
+        """, (content_hash,))
         record = cursor.fetchone()
-        if not record or not record['image_path']:
-            raise HTTPException(status_code=404, detail="Image not found")
-        
-        image_path = UPLOAD_DIR / record['image_path']
-        if not image_path.exists():
-            raise HTTPException(status_code=404, detail="Image file not found")
-        
-        return FileResponse(image_path)
+        cursor.close()
+        return record
     finally:
+        db.close()
+
+def create_cached_record(task_id: str, content_hash: str, cached: dict) -> int:
+    """用已缓存的识别结果直接创建一条已完成的记录（不进入OCR队列）"""
+    conn = get_write_connection()
+    try:
+        cursor = conn.cursor()
+        now = datetime.now()
+        columns = ['task_id', 'status', 'image_path', 'thumbnail_sizes', 'doc_type', 'content_hash', 'ocr_cache_hit',
+                   'remarks', 'created_at', 'updated_at'] + OCR_RESULT_FIELDS
+        values = [task_id, 'completed', cached['image_path'], cached['thumbnail_sizes'], 'PASSPORT', content_hash, 1,
+                  f"识别成功（重复图片，复用记录 {cached['id']} 的识别结果）", now, now]
+        values += [cached[field] for field in OCR_RESULT_FIELDS]
+        conn.start_transaction()
+        cursor.execute(f"""
+            INSERT INTO passport_records 
+            ({', '.join(columns)})
+            VALUES ({', '.join(['%s'] * len(columns))})
+        """, values)
+        record_id = cursor.lastrowid
+        daily_stats.apply_changes(cursor, [record_id])
+        conn.commit()
         cursor.close()
+        return record_id
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def create_upload_record(task_id: str, filename: str, content_hash: str) -> int:
+    """创建待识别的上传记录，并在同一事务中累加统计（锁定统计行，在线程池中执行）"""
+    conn = get_write_connection()
+    try:
+        cursor = conn.cursor()
+        now = datetime.now()
+        conn.start_transaction()
+        cursor.execute("""
+            INSERT INTO passport_records 
+            (task_id, status, image_path, doc_type, content_hash, created_at, updated_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, (task_id, 'pending', filename, 'PASSPORT', content_hash, now, now))
+        record_id = cursor.lastrowid
+        daily_stats.apply_changes(cursor, [record_id])
+        conn.commit()
+        cursor.close()
+        return record_id
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
 
 @app.post("/api/ocr/upload-photo")
-async def upload_photo(
-    file: UploadFile = File(...)
-):
-    """上传单张护照图片到处理队列"""
+async def upload_photo(request: Request):
+    """上传单张护照图片到处理队列（multipart/form-data，文件字段名 file）
+    请求体流式写入磁盘，同时计算哈希并检查大小（上限 APP_CONFIG['max_content_length']）
+    """
     try:
-        # 检查文件类型
-        if not file.content_type or not file.content_type.startswith('image/'):
-            raise HTTPException(status_code=400, detail="请选择有效的图片文件")
-        
-        # 检查队列是否已满
+        # 检查队列是否已满（在读取请求体之前）
         if upload_queue.qsize() >= MAX_UPLOAD_QUEUE:
             raise HTTPException(
                 status_code=429,
@@ -839,7 +1030,7 @@ async def upload_photo(
 
         # 检查OCR队列状态
         ocr_queue_size = ocr_queue.qsize()
-        if ocr_queue_size > 50:  # 限制OCR队列大小
+        if ocr_queue.full():  # 限制OCR队列大小
             raise HTTPException(
                 status_code=429,
                 detail=f"处理队列已满（当前{ocr_queue_size}个任务），请稍后再试"
@@ -851,20 +1042,56 @@ async def upload_photo(
         filepath = UPLOAD_DIR / filename
         task_id = uuid.uuid4().hex
 
-        # 异步读取文件内容
-        content = await file.read()
+        # 流式接收：边收边写入临时文件（.part），复用识别结果时删除，否则重命名为正式文件
+        partial_path = filepath.with_name(filepath.name + '.part')
+        loop = asyncio.get_running_loop()
+        try:
+            upload = await receive_upload(request, partial_path, APP_CONFIG['max_content_length'], upload_thread_pool)
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except UploadError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        content_hash = upload.content_hash
+        logger.info(f"文件接收完成: {filename} ({upload.size / 1024:.1f} KB)")
+        
+        # 完全相同的图片已识别过：直接复用识别结果，跳过OCR队列
+        # （同步数据库查询和写入都在线程池中执行，不阻塞事件循环）
+        try:
+            cached = await loop.run_in_executor(thread_pool, find_cached_ocr_result, content_hash)
+        except Exception as e:
+            logger.error(f"查询重复图片失败: {str(e)}")
+            cached = None
+        if cached:
+            await loop.run_in_executor(upload_thread_pool, os.remove, partial_path)
+            try:
+                record_id = await loop.run_in_executor(
+                    thread_pool, create_cached_record, task_id, content_hash, cached
+                )
+            except Exception as e:
+                logger.error(f"创建复用记录失败: {str(e)}")
+                raise HTTPException(status_code=500, detail=str(e))
+            logger.info(f"重复图片复用识别结果 (record_id: {record_id}, 来源记录: {cached['id']})")
+            if cached['thumbnail_sizes'] is None:
+                thumbnail_thread_pool.submit(build_thumbnails, record_id, cached['image_path'])
+            stats_cache.invalidate()
+            emit_ocr_event(record_id, EVENT_COMPLETED, '重复图片，复用识别结果',
+                           date=date.today().isoformat(), ocr_cache_hit=True)
+            return {
+                "status": "success",
+                "message": "检测到重复图片，已复用识别结果",
+                "record_id": record_id,
+                "task_id": task_id,
+                "image_url": f"/uploads/{cached['image_path']}",
+                "queue_position": 0,
+                "ocr_cache_hit": True,
+                "auto_close_delay": 2000,
+                "should_refresh": True
+            }
         
-        # 直接保存文件
+        # 接收完整后再改为正式文件名，列表和OCR不会读到不完整的文件
         try:
-            logger.info(f"开始保存文件: {filename}")
-            with open(filepath, "wb") as f:
-                f.write(content)
+            await loop.run_in_executor(upload_thread_pool, os.replace, partial_path, filepath)
             logger.info(f"文件保存完成: {filename}")
-            
-            # 检查文件是否成功保存
-            if not os.path.exists(filepath):
-                raise FileNotFoundError(f"文件保存失败，文件不存在: {filepath}")
-                
         except Exception as e:
             logger.error(f"保存文件失败: {filename}, 错误: {str(e)}")
             raise HTTPException(
@@ -872,57 +1099,42 @@ async def upload_photo(
                 detail=f"保存文件失败: {str(e)}"
             )
 
-        # 创建数据库记录
-        record_id = None
-        conn = None
+        # 创建数据库记录（事务中锁定统计行，锁等待只占用线程池中的线程，不阻塞事件循环）
         try:
-            conn = get_write_connection()
-            cursor = conn.cursor()
-            sql = """
-                INSERT INTO passport_records 
-                (task_id, status, image_path, doc_type, created_at, updated_at)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """
-            values = (
-                task_id,
-                'pending',
-                filename,
-                'PASSPORT',
-                datetime.now(),
-                datetime.now()
+            record_id = await loop.run_in_executor(
+                thread_pool, create_upload_record, task_id, filename, content_hash
             )
-            cursor.execute(sql, values)
-            record_id = cursor.lastrowid
-            conn.commit()
-            cursor.close()
             logger.info(f"数据库记录创建成功 (record_id: {record_id})")
-            
+            stats_cache.invalidate()
         except mysql.connector.Error as e:
             logger.error(f"数据库操作失败: {str(e)}")
-            if conn:
-                conn.rollback()
             # 如果数据库操作失败，删除已保存的文件
-            if os.path.exists(filepath):
-                try:
-                    os.remove(filepath)
-                    logger.info(f"已删除文件: {filepath}")
-                except Exception as del_e:
-                    logger.error(f"删除文件失败: {str(del_e)}")
+            try:
+                await loop.run_in_executor(upload_thread_pool, os.remove, filepath)
+                logger.info(f"已删除文件: {filepath}")
+            except FileNotFoundError:
+                pass
+            except Exception as del_e:
+                logger.error(f"删除文件失败: {str(del_e)}")
             raise HTTPException(status_code=500, detail=str(e))
-        finally:
-            if conn:
-                try:
-                    conn.close()
-                    logger.info(f"数据库连接已关闭 (record_id: {record_id})")
-                except Exception as e:
-                    logger.error(f"关闭数据库连接失败: {str(e)}")
 
-        # 将任务添加到OCR队列进行处理
-        ocr_queue.put({
+        # 后台生成缩略图，完成后写入数据库，列表接口不再临时生成
+        thumbnail_thread_pool.submit(build_thumbnails, record_id, filename)
+
+        # 先写入任务日志，服务中途崩溃时可在重启后重放（同步写入磁盘，在线程池中执行）
+        try:
+            await loop.run_in_executor(thread_pool, job_journal.enqueue, record_id, filename)
+        except Exception as e:
+            logger.error(f"写入OCR任务日志失败 (record_id: {record_id}): {str(e)}")
+
+        # 将任务添加到OCR队列进行处理（队列满时等待消费者腾出位置，不阻塞事件循环）
+        await ocr_queue.put({
             'record_id': record_id,
-            'image_path': filename  # 只传递文件名，不传递完整路径
+            'image_path': filename,  # 只传递文件名，不传递完整路径
+            'image_bytes': upload.content  # 已接收的图片内容，OCR时不再读取文件
         })
         logger.info(f"任务已添加到OCR队列 (record_id: {record_id}, 队列大小: {ocr_queue.qsize()})")
+        emit_ocr_event(record_id, EVENT_QUEUED, '等待处理', date=date.today().isoformat())
 
         return {
             "status": "success",
@@ -931,6 +1143,7 @@ async def upload_photo(
             "task_id": task_id,
             "image_url": f"/uploads/{filename}",
             "queue_position": ocr_queue.qsize(),
+            "ocr_cache_hit": False,
             "auto_close_delay": 2000,
             "should_refresh": True  # 添加标志，告诉前端需要刷新列表
         }
@@ -946,19 +1159,16 @@ async def check_ocr_service():
     """检查OCR服务状态"""
     try:
         # 检查OCR服务是否可用
-        import requests
-        
-        # 尝试访问OCR服务的健康检查端点
-        health_url = f"{OCR_SERVICE_URL.replace('/ocr', '/health')}"
-        logger.info(f"检查OCR服务健康状态: {health_url}")
+        # 并发探测所有OCR后端的健康检查端点，任一后端可用即视为服务可用
+        logger.info(f"检查OCR服务健康状态: {len(OCR_SERVICE_URLS)} 个后端")
         
-        response = requests.get(health_url, timeout=5)
-        ocr_available = response.status_code == 200
+        probe_results = await ocr_backends.probe_all()
+        ocr_available = any(probe_results)
         
         if ocr_available:
-            logger.info("OCR服务状态: 正常")
+            logger.info(f"OCR服务状态: 正常 ({sum(probe_results)}/{len(probe_results)} 个后端可用)")
         else:
-            logger.warning(f"OCR服务返回异常状态码: {response.status_code}")
+            logger.warning("OCR服务状态: 所有后端均不可用")
             
     except Exception as e:
         logger.error(f"连接OCR服务失败: {str(e)}")
@@ -975,6 +1185,18 @@ async def check_ocr_service():
         "ocr_service": "available" if ocr_available else "unavailable",
         "upload_queue_size": upload_queue_size,
         "ocr_queue_size": ocr_queue_size,
+        "ocr_in_flight": ocr_in_flight,
+        "ocr_consumers": OCR_CONSUMER_COUNT,
+        "ocr_backends": ocr_backends.stats(),
+        "ocr_job_journal": job_journal.stats(),
+        "ocr_recovery": ocr_recovery_stats,
+        "thumbnails": {**thumbnail_stats, 'engine': thumbnail_engine.stats()},
+        "image_normalize": {**image_normalize_stats, 'max_side': OCR_MAX_IMAGE_SIDE, 'workers': OCR_IMAGE_WORKERS},
+        "mrz_fast_path": {**mrz_fast_path_stats, 'enabled': MRZ_FAST_PATH},
+        "ocr_events": ocr_events.stats(),
+        "db_writer": get_db_writer_stats(),
+        "db_pools": [pool.pool_stats() for pool in (connection_pool, write_pool, read_pool)],
+        "async_db_pool": async_db.stats(),
         "active_threads": active_threads,
         "max_upload_queue": MAX_UPLOAD_QUEUE,
         "max_thread_pool": UPLOAD_THREAD_POOL_SIZE
@@ -992,6 +1214,55 @@ async def get_processing_status(record_id: int):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/ocr/events")
+async def stream_ocr_events(
+    request: Request,
+    record_id: Optional[int] = None,
+    date: Optional[str] = None
+):
+    """订阅OCR状态变化（Server-Sent Events）
+    Args:
+        record_id: 只接收该记录的事件
+        date: 只接收该日期 (YYYY-MM-DD) 创建的记录的事件
+    不传参数时接收全部事件
+    """
+    if date:
+        try:
+            datetime.strptime(date, '%Y-%m-%d')
+        except ValueError:
+            raise HTTPException(status_code=400, detail="日期格式应为 YYYY-MM-DD")
+    
+    subscription = ocr_events.subscribe(record_id=record_id, date=date)
+    
+    async def event_stream():
+        try:
+            # 订阅单条记录时先推送当前已知状态
+            if record_id is not None:
+                with processing_lock:
+                    current = processing_status.get(record_id)
+                if current:
+                    yield OCREventBroker.format_sse(current)
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=SSE_HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield OCREventBroker.format_sse(event)
+        finally:
+            ocr_events.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # 关闭nginx缓冲，事件立即送达
+        }
+    )
+
 @app.get("/health")
 async def health_check():
     """健康检查端点"""
@@ -1003,14 +1274,13 @@ async def health_check():
 
 @app.post("/api/passport/today")
 async def get_today_passport_records(
-    db: mysql.connector.MySQLConnection = Depends(get_db)
+    cursor: aiomysql.DictCursor = Depends(get_async_cursor)
 ):
     """
     获取今日所有护照类型的数据
     Returns:
         dict: 包含今日护照记录的列表
     """
-    cursor = db.cursor(dictionary=True)
     try:
         # 查询今日的护照记录
         query = """
@@ -1019,13 +1289,13 @@ async def get_today_passport_records(
                    doc_type_cn, visa_no, visa_date, passport_type,
                    image_path, created_at, updated_at
             FROM passport_records 
-            WHERE DATE(created_at) = CURDATE()
+            WHERE created_at >= CURDATE() AND created_at < CURDATE() + INTERVAL 1 DAY
             AND doc_type_cn LIKE '%护照%'
             ORDER BY created_at DESC
         """
         
-        cursor.execute(query)
-        records = cursor.fetchall()
+        await cursor.execute(query)
+        records = await cursor.fetchall()
         
         # 处理日期格式
         for record in records:
@@ -1050,14 +1320,12 @@ async def get_today_passport_records(
     except Exception as e:
         logger.error(f"获取今日护照记录失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"获取今日护照记录失败: {str(e)}")
-    finally:
-        cursor.close()
 
 @app.post("/api/passport/{record_id}/visa")
 async def update_visa_info(
     record_id: int,
     visa_info: VisaInfoUpdate,
-    db: mysql.connector.MySQLConnection = Depends(get_db)
+    cursor: aiomysql.DictCursor = Depends(get_async_cursor)
 ):
     """
     更新指定记录的签证信息
@@ -1067,11 +1335,10 @@ async def update_visa_info(
     Returns:
         dict: 更新结果
     """
-    cursor = db.cursor()
     try:
         # 检查记录是否存在
-        cursor.execute("SELECT id FROM passport_records WHERE id = %s", (record_id,))
-        if not cursor.fetchone():
+        await cursor.execute("SELECT id FROM passport_records WHERE id = %s", (record_id,))
+        if not await cursor.fetchone():
             raise HTTPException(status_code=404, detail=f"记录ID {record_id} 不存在")
         
         # 构建更新字段
@@ -1111,8 +1378,8 @@ async def update_visa_info(
             WHERE id = %s
         """
         
-        cursor.execute(query, values)
-        db.commit()
+        await cursor.execute(query, values)
+        await cursor.connection.commit()
         
         return {
             "success": True,
@@ -1124,36 +1391,38 @@ async def update_visa_info(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await cursor.connection.rollback()
         logger.error(f"更新签证信息失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"更新签证信息失败: {str(e)}")
-    finally:
-        cursor.close()
 
 @app.get("/api/country/code/{country_code}")
 async def get_country_by_code(country_code: str):
     """
     根据国家代码查询国家信息
     Args:
-        country_code: 3位ISO国家代码 (如: CHN, USA, GBR)
+        country_code: ISO国家代码，支持3位/2位字母代码或数字代码 (如: CHN, CN, 156)
     Returns:
-        dict: 国家信息
+        dict: 国家信息，country_code 为解析后的3位字母代码，query_column 为实际查询的列
     """
     try:
-        country_name = get_country_name_cn(country_code.upper())
-        if country_name:
+        country, query_column = country_registry.lookup(country_code)
+        if country:
             return {
                 "success": True,
-                "country_code": country_code.upper(),
-                "country_name_cn": country_name,
-                "message": f"找到国家: {country_name}"
+                "country_code": country['country_code'],
+                "country_name_cn": country['country_name_cn'],
+                "message": f"找到国家: {country['country_name_cn']}",
+                "query_column": query_column,
+                "result_column": "official_name_cn"
             }
         else:
             return {
                 "success": False,
                 "country_code": country_code.upper(),
                 "country_name_cn": None,
-                "message": f"未找到国家代码: {country_code}"
+                "message": f"未找到国家代码: {country_code}",
+                "query_column": query_column,
+                "result_column": "official_name_cn"
             }
     except Exception as e:
         logger.error(f"查询国家代码时出错: {str(e)}")
@@ -1161,12 +1430,14 @@ async def get_country_by_code(country_code: str):
             "success": False,
             "country_code": country_code.upper(),
             "country_name_cn": None,
-            "message": f"查询失败: {str(e)}"
+            "message": f"查询失败: {str(e)}",
+            "query_column": None,
+            "result_column": "official_name_cn"
         }
 
 @app.get("/api/country/search")
 async def search_countries(
-    keyword: str = Query(..., description="搜索关键词，支持中文国家名或英文国家代码"),
+    keyword: str = Query(..., description="搜索关键词，支持国家代码、中英文国家名前缀/子串及中文名拼音首字母"),
     limit: int = Query(10, description="返回结果数量限制")
 ):
     """
@@ -1178,42 +1449,14 @@ async def search_countries(
         dict: 匹配的国家列表
     """
     try:
-        results = []
-        with open('data/country-codes.csv', 'r', encoding='utf-8') as f:
-            # 读取表头
-            header = f.readline().strip().split(',')
-            try:
-                iso_index = header.index('ISO3166-1-Alpha-3')
-                cn_index = header.index('official_name_cn')
-                en_index = header.index('official_name_en')
-            except ValueError as e:
-                return {
-                    "success": False,
-                    "message": f"CSV文件格式错误: {str(e)}",
-                    "results": []
-                }
-            
-            # 读取数据行
-            for line in f:
-                if len(results) >= limit:
-                    break
-                    
-                parts = line.strip().split(',')
-                if len(parts) > max(iso_index, cn_index, en_index):
-                    code = parts[iso_index].strip()
-                    name_cn = parts[cn_index].strip()
-                    name_en = parts[en_index].strip()
-                    
-                    # 检查是否匹配搜索关键词
-                    keyword_upper = keyword.upper()
-                    if (keyword_upper in code.upper() or 
-                        keyword_upper in name_cn.upper() or 
-                        keyword_upper in name_en.upper()):
-                        results.append({
-                            "country_code": code,
-                            "country_name_cn": name_cn,
-                            "country_name_en": name_en
-                        })
+        results = [
+            {
+                "country_code": country['country_code'],
+                "country_name_cn": country['country_name_cn'],
+                "country_name_en": country['country_name_en']
+            }
+            for country in country_registry.search(keyword, limit)
+        ]
         
         return {
             "success": True,
@@ -1247,40 +1490,17 @@ async def list_countries(
     """
     try:
         all_countries = []
-        with open('data/country-codes.csv', 'r', encoding='utf-8') as f:
-            # 读取表头
-            header = f.readline().strip().split(',')
-            try:
-                iso_index = header.index('ISO3166-1-Alpha-3')
-                cn_index = header.index('official_name_cn')
-                en_index = header.index('official_name_en')
-                region_index = header.index('Region Name')
-            except ValueError as e:
-                return {
-                    "success": False,
-                    "message": f"CSV文件格式错误: {str(e)}",
-                    "results": []
-                }
+        for country in country_registry.all():
+            # 如果指定了地区筛选
+            if region and region.upper() not in country['region'].upper():
+                continue
             
-            # 读取数据行
-            for line in f:
-                parts = line.strip().split(',')
-                if len(parts) > max(iso_index, cn_index, en_index, region_index):
-                    code = parts[iso_index].strip()
-                    name_cn = parts[cn_index].strip()
-                    name_en = parts[en_index].strip()
-                    region_name = parts[region_index].strip()
-                    
-                    # 如果指定了地区筛选
-                    if region and region.upper() not in region_name.upper():
-                        continue
-                    
-                    all_countries.append({
-                        "country_code": code,
-                        "country_name_cn": name_cn,
-                        "country_name_en": name_en,
-                        "region": region_name
-                    })
+            all_countries.append({
+                "country_code": country['country_code'],
+                "country_name_cn": country['country_name_cn'],
+                "country_name_en": country['country_name_en'],
+                "region": country['region']
+            })
         
         # 分页处理
         total = len(all_countries)
@@ -1408,189 +1628,252 @@ async def get_country_columns():
             "columns": []
         }
 
-@app.get("/api/country/code/{country_code}")
-async def get_country_by_code(country_code: str):
-    """
-    根据国家代码查询国家信息
-    Args:
-        country_code: 3位ISO国家代码 (如: CHN, USA, GBR)
+def emit_ocr_event(record_id, status, message='', date=None, **extra):
+    """更新处理状态字典并推送状态事件（线程安全）"""
+    event = ocr_events.publish(record_id, status, message, date=date, **extra)
+    with processing_lock:
+        processing_status.pop(record_id, None)
+        processing_status[record_id] = event
+        while len(processing_status) > MAX_PROCESSING_STATUS:
+            processing_status.pop(next(iter(processing_status)))
+
+def ack_ocr_job(record_id):
+    """确认OCR任务已完成；失败时仅记录日志，任务会在下次启动时重放"""
+    try:
+        job_journal.ack(record_id)
+    except Exception as e:
+        logger.error(f"确认OCR任务失败 (record_id: {record_id}): {str(e)}")
+
+# 写入任务类型
+WRITE_RESULT = 'result'  # 识别结果（status = completed）
+WRITE_STATUS = 'status'  # 状态变更（processing / failed）
+
+RESULT_UPDATE_SQL = """
+    UPDATE passport_records 
+    SET status = %s,
+        doc_type_cn = %s,
+        name1 = %s,
+        name2 = %s,
+        gender = %s,
+        birth_date = %s,
+        expiry_date = %s,
+        passport_no = %s,
+        country_name_cn = %s,
+        visa_no = %s,
+        visa_date = %s,
+        passport_type = %s,
+        updated_at = %s,
+        remarks = %s
+    WHERE id = %s
+"""
+
+STATUS_UPDATE_SQL = """
+    UPDATE passport_records 
+    SET status = %s,
+        updated_at = %s
+    WHERE id = %s
+"""
+
+STATUS_REMARKS_UPDATE_SQL = """
+    UPDATE passport_records 
+    SET status = %s,
+        remarks = %s,
+        updated_at = %s
+    WHERE id = %s
+"""
+
+def validate_result_values(values):
+    """验证识别结果中的日期字段，无效日期设置为None"""
+    values = list(values)
+    date_fields = [5, 6, 10]  # birth_date, expiry_date, visa_date 在values中的索引
+    
+    for field_index in date_fields:
+        if field_index < len(values) and values[field_index]:
+            try:
+                # 验证日期格式
+                if isinstance(values[field_index], str):
+                    parsed_date = datetime.strptime(values[field_index], '%Y-%m-%d')
+                    values[field_index] = parsed_date.strftime('%Y-%m-%d')
+            except (ValueError, TypeError) as e:
+                logger.warning(f"无效的日期格式: {values[field_index]}, 设置为None")
+                values[field_index] = None
+    return values
+
+def write_statement(write_task):
+    """返回写入任务对应的 (SQL, 参数)"""
+    kind = write_task.get('kind', WRITE_RESULT)
+    if kind == WRITE_RESULT:
+        return RESULT_UPDATE_SQL, tuple(validate_result_values(write_task['values']))
+    if write_task.get('remarks') is None:
+        return STATUS_UPDATE_SQL, (write_task['status'], write_task['updated_at'], write_task['record_id'])
+    return STATUS_REMARKS_UPDATE_SQL, (
+        write_task['status'], write_task['remarks'], write_task['updated_at'], write_task['record_id']
+    )
+
+def queue_status_update(record_id, status, remarks=None, date=None):
+    """把状态变更交给写入线程（与识别结果按入队顺序写入）"""
+    db_write_queue.put({
+        'kind': WRITE_STATUS,
+        'record_id': record_id,
+        'status': status,
+        'remarks': remarks,
+        'updated_at': datetime.now(),
+        'date': date
+    })
+
+def after_write_committed(write_task):
+    """写入提交后：确认任务并推送状态事件"""
+    record_id = write_task['record_id']
+    kind = write_task.get('kind', WRITE_RESULT)
+    if kind == WRITE_RESULT:
+        ack_ocr_job(record_id)
+        emit_ocr_event(record_id, EVENT_COMPLETED, '识别成功', date=write_task.get('date'))
+    elif write_task['status'] == 'failed':
+        ack_ocr_job(record_id)
+        emit_ocr_event(record_id, EVENT_FAILED, write_task.get('remarks') or '', date=write_task.get('date'))
+
+def collect_write_batch():
+    """阻塞等待第一个写入任务，然后在 DB_WRITE_BATCH_WAIT_MS 内继续收集，最多 DB_WRITE_BATCH_SIZE 个"""
+    batch = [db_write_queue.get()]
+    deadline = time.monotonic() + DB_WRITE_BATCH_WAIT_MS / 1000
+    while len(batch) < DB_WRITE_BATCH_SIZE:
+        remaining = deadline - time.monotonic()
+        try:
+            if remaining > 0:
+                batch.append(db_write_queue.get(timeout=remaining))
+            else:
+                # 等待时间已到，只取出已在队列中的任务
+                batch.append(db_write_queue.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+def execute_write_batch(cursor, batch):
+    """相邻且SQL相同的任务合并为一次 executemany"""
+    chunk_sql, chunk_params = None, []
+    for write_task in batch:
+        sql, params = write_statement(write_task)
+        if sql != chunk_sql and chunk_params:
+            cursor.executemany(chunk_sql, chunk_params)
+            chunk_params = []
+        chunk_sql = sql
+        chunk_params.append(params)
+    if chunk_params:
+        cursor.executemany(chunk_sql, chunk_params)
+
+def commit_write_batch(batch):
+    """在一个事务中写入一批任务并提交（状态/证件类型的变化同时累加到每日统计汇总表）
     Returns:
-        dict: 国家信息
+        float: 提交耗时(秒)
     """
+    db = get_write_connection()  # 使用写连接池
+    cursor = None
     try:
-        country_name = get_country_name_cn(country_code.upper())
-        if country_name:
-            return {
-                "success": True,
-                "country_code": country_code.upper(),
-                "country_name_cn": country_name,
-                "message": f"找到国家: {country_name}",
-                "query_column": "ISO3166-1-Alpha-3",
-                "result_column": "official_name_cn"
-            }
-        else:
-            return {
-                "success": False,
-                "country_code": country_code.upper(),
-                "country_name_cn": None,
-                "message": f"未找到国家代码: {country_code}",
-                "query_column": "ISO3166-1-Alpha-3",
-                "result_column": "official_name_cn"
-            }
-    except Exception as e:
-        logger.error(f"查询国家代码时出错: {str(e)}")
-        return {
-            "success": False,
-            "country_code": country_code.upper(),
-            "country_name_cn": None,
-            "message": f"查询失败: {str(e)}",
-            "query_column": "ISO3166-1-Alpha-3",
-            "result_column": "official_name_cn"
-        }
+        start = time.time()
+        cursor = db.cursor()
+        db.start_transaction()
+        record_ids = [write_task['record_id'] for write_task in batch]
+        before = daily_stats.snapshot(cursor, record_ids)
+        execute_write_batch(cursor, batch)
+        daily_stats.apply_changes(cursor, record_ids, before)
+        db.commit()
+        return time.time() - start
+    except Exception:
+        try:
+            db.rollback()
+        except Exception as rollback_error:
+            logger.error(f"回滚写入事务失败: {str(rollback_error)}")
+        raise
+    finally:
+        if cursor:
+            cursor.close()
+        db.close()
+
+def record_write_stats(rows, latency):
+    with db_writer_stats_lock:
+        db_writer_stats['commits'] += 1
+        db_writer_stats['rows'] += rows
+        db_writer_stats['last_rows_per_commit'] = rows
+        db_writer_stats['max_rows_per_commit'] = max(db_writer_stats['max_rows_per_commit'], rows)
+        db_writer_stats['last_commit_latency'] = round(latency, 4)
+        db_writer_stats['max_commit_latency'] = round(max(db_writer_stats['max_commit_latency'], latency), 4)
+        db_writer_stats['total_commit_latency'] += latency
+
+def get_db_writer_stats():
+    with db_writer_stats_lock:
+        stats = dict(db_writer_stats)
+    commits = stats['commits']
+    stats['avg_rows_per_commit'] = round(stats['rows'] / commits, 2) if commits else 0
+    stats['avg_commit_latency'] = round(stats.pop('total_commit_latency') / commits, 4) if commits else 0
+    stats['pending'] = db_write_queue.qsize()
+    stats['batch_size'] = DB_WRITE_BATCH_SIZE
+    stats['batch_wait_ms'] = DB_WRITE_BATCH_WAIT_MS
+    return stats
 
 # OCR结果写入线程
 def ocr_result_writer():
-    """独立线程处理OCR结果写入"""
+    """独立线程批量写入OCR结果和状态变更（组提交）"""
     while True:
         try:
-            if not db_write_queue.empty():
-                write_task = db_write_queue.get()
-                db = None
+            batch = collect_write_batch()
+            try:
                 try:
-                    db = get_write_connection()  # 使用写连接池
-                    cursor = db.cursor()
-                    
-                    # 验证日期字段
-                    values = list(write_task['values'])
-                    date_fields = [5, 6, 10]  # birth_date, expiry_date, visa_date 在values中的索引
-                    
-                    for field_index in date_fields:
-                        if field_index < len(values) and values[field_index]:
-                            try:
-                                # 验证日期格式
-                                if isinstance(values[field_index], str):
-                                    from datetime import datetime
-                                    parsed_date = datetime.strptime(values[field_index], '%Y-%m-%d')
-                                    values[field_index] = parsed_date.strftime('%Y-%m-%d')
-                                    logger.info(f"验证日期字段: {values[field_index]}")
-                            except (ValueError, TypeError) as e:
-                                logger.warning(f"无效的日期格式: {values[field_index]}, 设置为None")
-                                values[field_index] = None
-                    
-                    # 更新OCR结果
-                    cursor.execute("""
-                    UPDATE passport_records 
-                    SET status = %s,
-                            doc_type_cn = %s,
-                        name1 = %s,
-                        name2 = %s,
-                        gender = %s,
-                        birth_date = %s,
-                        expiry_date = %s,
-                            passport_no = %s,
-                        country_name_cn = %s,
-                        visa_no = %s,
-                        visa_date = %s,
-                        passport_type = %s,
-                        updated_at = %s,
-                        remarks = %s
-                    WHERE id = %s
-                    """, values)
-                    
-                    db.commit()
-                    logger.info(f"数据库更新成功，记录ID: {write_task['record_id']}")
-                    
+                    latency = commit_write_batch(batch)
+                    record_write_stats(len(batch), latency)
+                    logger.info(f"数据库批量写入成功: {len(batch)} 条, 耗时 {latency:.3f}秒")
+                    committed = batch
                 except Exception as e:
-                    logger.error(f"数据库写入失败: {str(e)}")
-                finally:
-                    if db:
+                    # 整批失败时逐条重试，避免一条坏数据拖垮整批
+                    logger.error(f"数据库批量写入失败，改为逐条写入: {str(e)}")
+                    with db_writer_stats_lock:
+                        db_writer_stats['failed_batches'] += 1
+                    committed = []
+                    for write_task in batch:
                         try:
-                            cursor.close()
-                            db.close()
-                            logger.info(f"数据库写入连接已关闭 (record_id: {write_task['record_id']})")
-                        except Exception as e:
-                            logger.error(f"关闭数据库写入连接失败: {str(e)}")
+                            latency = commit_write_batch([write_task])
+                            record_write_stats(1, latency)
+                            committed.append(write_task)
+                        except Exception as single_error:
+                            with db_writer_stats_lock:
+                                db_writer_stats['failed_rows'] += 1
+                            logger.error(f"数据库写入失败 (record_id: {write_task['record_id']}): {str(single_error)}")
+                
+                for write_task in committed:
+                    after_write_committed(write_task)
+                # 识别结果会改变证件类型统计，使统计缓存失效
+                if any(write_task.get('kind', WRITE_RESULT) == WRITE_RESULT for write_task in committed):
+                    stats_cache.invalidate()
+            finally:
+                for _ in batch:
                     db_write_queue.task_done()
             
-            time.sleep(0.1)  # 避免空队列时的CPU占用
-            
         except Exception as e:
             logger.error(f"OCR结果写入线程错误: {str(e)}")
             time.sleep(1)
 
 # 创建读写连接池
-try:
-    write_pool = mysql.connector.pooling.MySQLConnectionPool(**DB_WRITE_POOL_CONFIG)
-    read_pool = mysql.connector.pooling.MySQLConnectionPool(**DB_READ_POOL_CONFIG)
-    logger.info(f"数据库写连接池初始化成功，连接池大小: {DB_WRITE_POOL_CONFIG['pool_size']}")
-    logger.info(f"数据库读连接池初始化成功，连接池大小: {DB_READ_POOL_CONFIG['pool_size']}")
-except Exception as e:
-    logger.error(f"数据库连接池初始化失败: {str(e)}")
-    raise
+write_pool = ConnectionPool(
+    DB_WRITE_POOL_CONFIG,
+    session_variables=DB_SESSION_VARIABLES,
+    max_retries=5,
+    idle_check_seconds=DB_IDLE_CHECK_SECONDS
+)
+read_pool = ConnectionPool(
+    DB_READ_POOL_CONFIG,
+    session_variables=DB_SESSION_VARIABLES,
+    max_retries=3,
+    idle_check_seconds=DB_IDLE_CHECK_SECONDS
+)
+logger.info(f"数据库写连接池初始化成功，连接池大小: {DB_WRITE_POOL_CONFIG['pool_size']}")
+logger.info(f"数据库读连接池初始化成功，连接池大小: {DB_READ_POOL_CONFIG['pool_size']}")
 
 def get_write_connection():
     """获取写操作的数据库连接"""
-    max_retries = 5
-    retry_delay = 1
-    last_error = None
-    
-    for attempt in range(max_retries):
-        try:
-            connection = write_pool.get_connection()
-            if connection.is_connected():
-                # 设置时区为东八区
-                cursor = connection.cursor()
-                cursor.execute("SET time_zone = '+08:00'")
-                cursor.close()
-                return connection
-            else:
-                connection.ping(reconnect=True, attempts=3, delay=1)
-                # 设置时区为东八区
-                cursor = connection.cursor()
-                cursor.execute("SET time_zone = '+08:00'")
-                cursor.close()
-                return connection
-        except mysql.connector.Error as e:
-            last_error = e
-            if attempt < max_retries - 1:
-                sleep_time = retry_delay * (2 ** attempt)
-                logger.warning(f"获取写连接失败，{sleep_time}秒后重试: {str(e)}")
-                time.sleep(sleep_time)
-            else:
-                logger.error(f"获取写连接失败，已重试{max_retries}次: {str(e)}")
-                raise last_error
+    return write_pool.get_connection()
 
 def get_read_connection():
     """获取读操作的数据库连接"""
-    max_retries = 3
-    retry_delay = 1
-    last_error = None
-    
-    for attempt in range(max_retries):
-        try:
-            connection = read_pool.get_connection()
-            if connection.is_connected():
-                # 设置时区为东八区
-                cursor = connection.cursor()
-                cursor.execute("SET time_zone = '+08:00'")
-                cursor.close()
-                return connection
-            else:
-                connection.ping(reconnect=True, attempts=2, delay=1)
-                # 设置时区为东八区
-                cursor = connection.cursor()
-                cursor.execute("SET time_zone = '+08:00'")
-                cursor.close()
-                return connection
-        except mysql.connector.Error as e:
-            last_error = e
-            if attempt < max_retries - 1:
-                sleep_time = retry_delay * (2 ** attempt)
-                logger.warning(f"获取读连接失败，{sleep_time}秒后重试: {str(e)}")
-                time.sleep(sleep_time)
-            else:
-                logger.error(f"获取读连接失败，已重试{max_retries}次: {str(e)}")
-                raise last_error
+    return read_pool.get_connection()
 
 # 在启动时添加线程池监控
 def monitor_thread_pools():
@@ -1611,51 +1894,50 @@ def monitor_thread_pools():
 async def process_ocr_task(task):
     """处理单个OCR任务"""
     record_id = task['record_id']
-    db = None
+    loop = asyncio.get_running_loop()
     
-    try:
-        # 从数据库获取任务信息
+    # 数据库操作为阻塞调用，放到IO线程池中执行，避免阻塞事件循环中的其他消费者
+    def fetch_record():
+        db = get_db_connection()
         try:
-            db = get_db_connection()
             cursor = db.cursor(dictionary=True)
             cursor.execute("""
-                SELECT image_path, status 
+                SELECT image_path, status, created_at 
                 FROM passport_records 
                 WHERE id = %s
             """, (record_id,))
             record = cursor.fetchone()
             cursor.close()
+            return record
+        finally:
             db.close()
+    
+    try:
+        # 从数据库获取任务信息
+        try:
+            record = await loop.run_in_executor(thread_pool, fetch_record)
             
             if not record:
                 logger.error(f"记录 {record_id} 不存在")
+                ack_ocr_job(record_id)
+                return
+            
+            # 重放的任务可能在上次退出前已经写入结果
+            if record['status'] in ('completed', 'failed'):
+                logger.info(f"记录 {record_id} 已处理完成 (状态: {record['status']})，跳过")
+                ack_ocr_job(record_id)
                 return
                 
             image_path = record['image_path']
+            record_date = record['created_at'].strftime('%Y-%m-%d') if record.get('created_at') else None
             
         except Exception as e:
             logger.error(f"获取任务信息失败: {str(e)}")
-            if db:
-                db.close()
             return
             
-        # 更新状态为处理中
-        try:
-            db = get_db_connection()
-            cursor = db.cursor()
-            cursor.execute("""
-                    UPDATE passport_records 
-                SET status = %s, updated_at = %s
-                    WHERE id = %s
-            """, ('processing', datetime.now(), record_id))
-            db.commit()
-            cursor.close()
-            db.close()
-        except Exception as e:
-            logger.error(f"更新状态失败: {str(e)}")
-            if db:
-                db.close()
-            return
+        # 更新状态为处理中（由写入线程与其他写入合并提交）
+        queue_status_update(record_id, 'processing', date=record_date)
+        emit_ocr_event(record_id, EVENT_PROCESSING, '正在识别', date=record_date)
 
         # 处理OCR
         try:
@@ -1663,13 +1945,22 @@ async def process_ocr_task(task):
             filepath = UPLOAD_DIR / image_path
             logger.info(f"开始处理图片，完整路径: {filepath}")
             
-            # 检查文件是否存在
-            if not os.path.exists(filepath):
-                logger.error(f"图片文件不存在: {filepath}")
-                raise FileNotFoundError(f"图片文件不存在: {filepath}")
+            # 上传时已接收的图片内容直接使用；重放的任务从文件读取
+            image_bytes = task.get('image_bytes')
+            if image_bytes is None:
+                if not os.path.exists(filepath):
+                    logger.error(f"图片文件不存在: {filepath}")
+                    raise FileNotFoundError(f"图片文件不存在: {filepath}")
+                image_bytes = await loop.run_in_executor(thread_pool, filepath.read_bytes)
             
-            ocr_result = await process_image(str(filepath))
-            extracted_data = extract_ocr_data(ocr_result)
+            # 旋转、缩小并重新编码后再发送，原图保留在上传目录中
+            image_bytes = await normalize_for_ocr(record_id, image_bytes)
+            
+            # 护照优先只识别MRZ区域；定位或解析失败（或不是护照）时识别整页
+            extracted_data = await recognize_mrz_crop(record_id, str(filepath), image_bytes)
+            if extracted_data is None:
+                ocr_result = await process_image(str(filepath), image_bytes)
+                extracted_data = await loop.run_in_executor(thread_pool, extract_ocr_data, ocr_result)
             
             # 准备写入数据
             values = (
@@ -1686,51 +1977,103 @@ async def process_ocr_task(task):
                 extracted_data.get('visa_date'),
                 extracted_data.get('passport_type', ''),
                 datetime.now(),
-                '识别成功',
+                '识别成功' if extracted_data.get('mrz_valid') is not False else '识别成功（MRZ校验未通过，请人工核对）',
                 record_id
             )
             
             # 将结果放入写入队列
             db_write_queue.put({
+                'kind': WRITE_RESULT,
                 'record_id': record_id,
+                'date': record_date,
                 'values': values
             })
 
         except Exception as e:
             logger.error(f"OCR处理失败: {str(e)}")
-            # 更新失败状态
-            try:
-                db = get_db_connection()
-                cursor = db.cursor()
-                cursor.execute("""
-                    UPDATE passport_records 
-                    SET status = %s,
-                        remarks = %s,
-                        updated_at = %s
-                    WHERE id = %s
-                """, ('failed', str(e)[:255], datetime.now(), record_id))
-                db.commit()
-                cursor.close()
-                db.close()
-            except Exception as update_err:
-                logger.error(f"更新失败状态时出错: {str(update_err)}")
-                if db:
-                    db.close()
+            # 更新失败状态（写入提交后由写入线程确认任务并推送事件）
+            queue_status_update(record_id, 'failed', str(e)[:255], date=record_date)
             
     except Exception as e:
         logger.error(f"处理任务失败: {str(e)}")
-        if db:
-            db.close()
 
-async def process_image(image_path: str) -> dict:
+async def normalize_for_ocr(record_id: int, image_bytes: bytes) -> bytes:
+    """在OCR图片预处理进程池中预处理图片；失败时发送原图"""
+    if OCR_MAX_IMAGE_SIDE <= 0:
+        return image_bytes
+    loop = asyncio.get_running_loop()
+    try:
+        normalized, info = await loop.run_in_executor(
+            ocr_image_pool, normalize_image, image_bytes, OCR_MAX_IMAGE_SIDE, OCR_IMAGE_QUALITY
+        )
+    except Exception as e:
+        image_normalize_stats['failed'] += 1
+        logger.warning(f"图片预处理失败，发送原图 (record_id: {record_id}): {str(e)}")
+        return image_bytes
+    image_normalize_stats['images'] += 1
+    image_normalize_stats['original_bytes'] += info['original_bytes']
+    image_normalize_stats['sent_bytes'] += info['bytes']
+    if info['reencoded']:
+        image_normalize_stats['reencoded'] += 1
+        logger.info(
+            f"图片预处理 (record_id: {record_id}): {info['original_size'][0]}x{info['original_size'][1]} "
+            f"{info['original_bytes'] / 1024:.0f}KB -> {info['size'][0]}x{info['size'][1]} {info['bytes'] / 1024:.0f}KB"
+        )
+    return normalized
+
+def is_complete_mrz_result(extracted_data: dict) -> bool:
+    """MRZ区域的识别结果是否足以代替整页识别（校验位全部通过，护照类型、护照号码、出生日期和有效期都已解析）"""
+    if not extracted_data.get('mrz_valid'):
+        return False
+    return all(extracted_data.get(field) for field in ('passport_type', 'passport_no', 'birth_date', 'expiry_date'))
+
+async def recognize_mrz_crop(record_id: int, image_path: str, image_bytes: bytes) -> Optional[dict]:
+    """定位护照MRZ区域并只识别该区域
+    Returns:
+        dict: 提取的护照信息；找不到MRZ区域或解析不完整时返回 None，由调用方识别整页
+    """
+    if not MRZ_FAST_PATH:
+        return None
+    loop = asyncio.get_running_loop()
+    mrz_fast_path_stats['attempts'] += 1
+    try:
+        crop = await loop.run_in_executor(ocr_image_pool, crop_mrz, image_bytes)
+        if crop is None:
+            logger.info(f"未找到MRZ区域，识别整页 (record_id: {record_id})")
+            return None
+        crop_bytes, crop_info = crop
+        mrz_fast_path_stats['located'] += 1
+        logger.info(f"找到MRZ区域 (record_id: {record_id}): {crop_info['box']}，先识别裁剪区域")
+        
+        # 裁剪区域只发送一次，失败时不退避重试，直接识别整页（整页识别有自己的重试）
+        ocr_result = await process_image(image_path, crop_bytes, max_retries=1)
+        extracted_data = await loop.run_in_executor(thread_pool, extract_ocr_data, ocr_result)
+    except HTTPException as e:
+        logger.warning(f"MRZ区域识别失败，改为识别整页 (record_id: {record_id}): {e.detail}")
+        mrz_fast_path_stats['fallbacks'] += 1
+        return None
+    except Exception as e:
+        logger.warning(f"MRZ区域识别失败，改为识别整页 (record_id: {record_id}): {str(e)}")
+        mrz_fast_path_stats['fallbacks'] += 1
+        return None
+    
+    if not is_complete_mrz_result(extracted_data):
+        logger.info(f"MRZ区域解析不完整，改为识别整页 (record_id: {record_id})")
+        mrz_fast_path_stats['fallbacks'] += 1
+        return None
+    mrz_fast_path_stats['accepted'] += 1
+    return extracted_data
+
+async def process_image(image_path: str, image_bytes: Optional[bytes] = None, max_retries: int = 5) -> dict:
     """处理单张图片的OCR识别
     Args:
         image_path: 图片路径
+        image_bytes: 已在内存中的图片内容，提供时不再读取文件
+        max_retries: 最多发送次数，1 表示只发送一次、失败不重试
     Returns:
         dict: OCR识别结果
     """
     print(f"\n=== 开始处理图片: {image_path} ===")
-    max_retries = 5  # 增加重试次数
     current_retry = 0
     
     # 获取事件循环
@@ -1747,16 +2090,19 @@ async def process_image(image_path: str) -> dict:
             print("读取图片文件...")
             
             try:
-                # 检查文件是否存在
-                if not os.path.exists(image_path):
-                    raise FileNotFoundError(f"图片文件不存在: {image_path}")
-                
-                # 在线程池中异步读取文件
-                def read_file():
-                    with open(image_path, "rb") as file:
-                        return file.read()
-                        
-                file_bytes = await loop.run_in_executor(thread_pool, read_file)
+                if image_bytes is not None:
+                    file_bytes = image_bytes
+                else:
+                    # 检查文件是否存在
+                    if not os.path.exists(image_path):
+                        raise FileNotFoundError(f"图片文件不存在: {image_path}")
+                    
+                    # 在线程池中异步读取文件
+                    def read_file():
+                        with open(image_path, "rb") as file:
+                            return file.read()
+                            
+                    file_bytes = await loop.run_in_executor(thread_pool, read_file)
                 print(f"图片大小: {len(file_bytes)/1024:.2f} KB")
                 
             except Exception as e:
@@ -1771,43 +2117,23 @@ async def process_image(image_path: str) -> dict:
             # 准备请求数据
             print("准备OCR请求数据...")
 
-            # 在线程池中异步发送OCR请求
+            # 通过长连接池异步发送OCR请求
             async def send_ocr_request():
-                print(f"发送OCR请求到: {OCR_SERVICE_URL}")
+                print(f"发送OCR请求 (后端数: {len(OCR_SERVICE_URLS)}, 路由策略: {OCR_ROUTING})")
                 print(f"当前重试次数: {current_retry + 1}/{max_retries}")
                 print("正在等待响应...")
                 
-                session = requests.Session()
-                adapter = requests.adapters.HTTPAdapter(
-                    max_retries=3,
-                    pool_connections=10,
-                    pool_maxsize=10
-                )
-                session.mount('http://', adapter)
-                session.mount('https://', adapter)
-                
                 try:
                     # 使用 multipart/form-data 格式发送文件
-                    files = {'file': ('image.jpg', file_bytes, 'image/jpeg')}
-                    response = await loop.run_in_executor(
-                        thread_pool,
-                        lambda: session.post(
-                            OCR_SERVICE_URL,
-                            files=files,
-                            verify=False
-                        )
-                    )
-                    return response
+                    return await ocr_backends.post_image(file_bytes)
                 except Exception as e:
                     logger.error(f"发送OCR请求失败: {str(e)}")
                     raise
-                finally:
-                    session.close()
 
             # 异步发送请求
             try:
                 response = await send_ocr_request()
-            except requests.exceptions.ConnectionError as e:
+            except httpx.TransportError as e:
                 logger.error(f"OCR服务连接错误: {str(e)}")
                 if current_retry < max_retries - 1:
                     wait_time = min(30, 5 * (2 ** current_retry))  # 指数退避，最大等待30秒
@@ -1822,6 +2148,13 @@ async def process_image(image_path: str) -> dict:
             
             # 检查响应状态
             print(f"收到响应: HTTP {response.status_code}")
+            if 400 <= response.status_code < 500:
+                # 请求本身有问题（如图片无法解码），重试不会成功
+                logger.error(f"OCR服务拒绝请求: HTTP {response.status_code}, {response.text}")
+                raise HTTPException(
+                    status_code=422,
+                    detail=f"OCR服务无法处理该图片: HTTP {response.status_code}"
+                )
             if response.status_code != 200:
                 logger.error(f"OCR请求失败: HTTP {response.status_code}")
                 logger.error(f"错误响应: {response.text}")
@@ -1853,6 +2186,9 @@ async def process_image(image_path: str) -> dict:
                     detail="OCR服务返回的数据格式无效"
                 )
 
+        except HTTPException:
+            # 已确定的失败（包括重试用尽），不再重复重试
+            raise
         except Exception as e:
             logger.error(f"处理图片时出错: {str(e)}")
             import traceback as tb  # 确保traceback可用
@@ -1873,64 +2209,222 @@ async def process_image(image_path: str) -> dict:
     logger.error(error_msg)
     raise HTTPException(status_code=503, detail=error_msg)
 
-# OCR队列处理线程
-def process_ocr_queue():
-    """独立线程处理OCR队列"""
-    async def run_queue():
-        while True:
-            try:
-                if not ocr_queue.empty():
-                    task = ocr_queue.get()
-                    try:
-                        await process_ocr_task(task)
-                    except Exception as e:
-                        logger.error(f"处理任务失败: {str(e)}")
-                    finally:
-                        ocr_queue.task_done()
-                        logger.info(f"OCR任务处理完成 (record_id: {task.get('record_id')})")
-                
-                await asyncio.sleep(0.1)  # 避免空队列时的CPU占用
-                
-            except Exception as e:
-                logger.error(f"OCR队列处理错误: {str(e)}")
-                await asyncio.sleep(1)
+# OCR队列消费者
+async def ocr_consumer(consumer_id: int):
+    """OCR队列消费者：阻塞等待新任务，多个消费者并发处理"""
+    global ocr_in_flight
+    while True:
+        task = await ocr_queue.get()
+        ocr_in_flight += 1
+        try:
+            await process_ocr_task(task)
+        except Exception as e:
+            logger.error(f"处理任务失败: {str(e)}")
+        finally:
+            ocr_in_flight -= 1
+            ocr_queue.task_done()
+            logger.info(f"OCR任务处理完成 (record_id: {task.get('record_id')}, 消费者: {consumer_id})")
 
-    # 创建新的事件循环
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    
+def fetch_unfinished_records(created_before: datetime):
+    """查询数据库中仍为 pending / processing 状态的记录（只取服务启动前创建的）"""
+    db = get_db_connection()
     try:
-        loop.run_until_complete(run_queue())
-    except Exception as e:
-        logger.error(f"OCR队列处理线程异常: {str(e)}")
+        cursor = db.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT id, image_path
+            FROM passport_records
+            WHERE status IN ('pending', 'processing') AND created_at < %s
+            ORDER BY id
+        """, (created_before,))
+        records = cursor.fetchall()
+        cursor.close()
+        return records
     finally:
-        loop.close()
+        db.close()
 
-def create_thumbnail(image_path, max_size=(128, 128)):
-    """创建图片缩略图"""
+def fetch_record_dates(record_ids: List[int]) -> dict:
+    """查询记录的创建日期 {record_id: 'YYYY-MM-DD'}，用于按日期订阅的事件"""
+    if not record_ids:
+        return {}
+    db = get_db_connection()
     try:
-        # 确保输入路径是字符串
-        image_path = str(image_path)
-
-        # 确保目标目录存在
-        thumbnail_dir = UPLOAD_DIR / "thumbnails"
-        thumbnail_dir.mkdir(exist_ok=True)
-
-        # 生成缩略图文件名（使用原始文件名）
-        filename = os.path.basename(image_path)
-        thumbnail_path = thumbnail_dir / filename
-
-        # 打开原图并创建缩略图
-        with Image.open(image_path) as img:
-            # 保持宽高比
-            img.thumbnail(max_size)
-            # 保存缩略图
-            img.save(str(thumbnail_path), "JPEG", quality=85)
-            
-        return str(thumbnail_path)
+        cursor = db.cursor(dictionary=True)
+        cursor.execute(f"""
+            SELECT id, created_at
+            FROM passport_records
+            WHERE id IN ({', '.join(['%s'] * len(record_ids))})
+        """, list(record_ids))
+        dates = {row['id']: row['created_at'].strftime('%Y-%m-%d') for row in cursor.fetchall() if row['created_at']}
+        cursor.close()
+        return dates
+    finally:
+        db.close()
+
+async def recover_ocr_jobs():
+    """重放上次退出时未完成的OCR任务
+    任务日志中未确认的任务优先，再补充数据库中仍为 pending / processing 的记录
+    """
+    loop = asyncio.get_running_loop()
+    ocr_recovery_stats['running'] = True
+    # 只重放启动前的任务，启动后新上传的任务已由上传接口入队
+    started_at = datetime.now()
+    try:
+        jobs = {}
+        exhausted = []
+        try:
+            for job in await loop.run_in_executor(thread_pool, job_journal.pending, started_at.timestamp()):
+                if job_journal.exhausted(job):
+                    exhausted.append(job)
+                else:
+                    jobs[job['record_id']] = job['image_path']
+        except Exception as e:
+            logger.error(f"读取OCR任务日志失败: {str(e)}")
+        
+        try:
+            abandoned_ids = {job['record_id'] for job in exhausted}
+            for record in await loop.run_in_executor(thread_pool, fetch_unfinished_records, started_at):
+                if record['image_path'] and record['id'] not in abandoned_ids:
+                    jobs.setdefault(record['id'], record['image_path'])
+        except Exception as e:
+            logger.error(f"查询未完成的记录失败: {str(e)}")
+        
+        # 记录的创建日期（事件按日期推送给订阅了该日期的客户端）
+        record_dates = {}
+        try:
+            record_dates = await loop.run_in_executor(
+                thread_pool, fetch_record_dates, list(jobs) + [job['record_id'] for job in exhausted]
+            )
+        except Exception as e:
+            logger.error(f"查询记录创建日期失败: {str(e)}")
+        
+        # 多次重放仍未完成的任务（可能每次处理都导致服务崩溃）不再重放，标记为失败（写入后从日志中确认删除）
+        for job in exhausted:
+            logger.error(f"OCR任务已重放 {job['attempts']} 次仍未完成，标记为失败 (record_id: {job['record_id']})")
+            queue_status_update(job['record_id'], 'failed', f"重放 {job['attempts']} 次仍未完成，已停止处理",
+                                date=record_dates.get(job['record_id']))
+            ocr_recovery_stats['abandoned'] += 1
+        
+        if not jobs:
+            logger.info("没有需要重放的OCR任务")
+            return
+        
+        logger.info(f"开始重放未完成的OCR任务: {len(jobs)} 个")
+        for record_id, image_path in jobs.items():
+            await loop.run_in_executor(thread_pool, job_journal.enqueue, record_id, image_path)
+            await ocr_queue.put({
+                'record_id': record_id,
+                'image_path': image_path
+            })
+            emit_ocr_event(record_id, EVENT_QUEUED, '服务重启后重新排队', date=record_dates.get(record_id))
+            ocr_recovery_stats['recovered'] += 1
+        logger.info(f"OCR任务重放完成: {len(jobs)} 个")
+    finally:
+        ocr_recovery_stats['running'] = False
+
+async def drain_ocr_queue(timeout: float):
+    """等待队列中的任务处理完毕（最多timeout秒）"""
+    try:
+        await asyncio.wait_for(ocr_queue.join(), timeout=timeout)
+        logger.info("OCR队列已清空")
+    except asyncio.TimeoutError:
+        logger.warning(f"等待OCR队列清空超时，剩余任务数: {ocr_queue.qsize()}, 处理中: {ocr_in_flight}")
+
+def thumbnail_urls(image_path: str, thumbnail_sizes: Optional[str]) -> dict:
+    """按数据库记录的已生成尺寸返回缩略图URL {尺寸: {'webp': url, 'jpg': url}}（从小到大）"""
+    if not thumbnail_sizes:
+        return {}
+    return {
+        int(size): {ext: f"/uploads/{thumbnail_path(image_path, size, ext)}" for ext, _ in THUMBNAIL_FORMATS}
+        for size in thumbnail_sizes.split(',')
+    }
+
+def save_thumbnail_sizes(record_id: int, sizes: List[int]):
+    """记录已生成的缩略图尺寸（空字符串表示原图不可用，不再重试）"""
+    conn = get_write_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE passport_records SET thumbnail_sizes = %s WHERE id = %s",
+            (','.join(str(size) for size in sizes), record_id)
+        )
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+def finish_thumbnails(record_id: int, image_path: str, result):
+    """记录缩略图生成结果
+    Args:
+        result: 生成的尺寸列表，或生成时抛出的异常
+    """
+    try:
+        if isinstance(result, FileNotFoundError):
+            logger.warning(f"原图不存在，跳过缩略图 (record_id: {record_id}, 文件: {image_path})")
+            result = []
+        elif isinstance(result, Exception):
+            # 生成失败时保持 NULL，下次启动时补生成
+            thumbnail_stats['failed'] += 1
+            logger.error(f"生成缩略图失败 (record_id: {record_id}): {str(result)}")
+            return
+        else:
+            thumbnail_stats['generated'] += 1
+        save_thumbnail_sizes(record_id, result)
     except Exception as e:
-        logger.error(f"创建缩略图失败: {str(e)}")
-        return None
+        thumbnail_stats['failed'] += 1
+        logger.error(f"保存缩略图信息失败 (record_id: {record_id}): {str(e)}")
+
+def build_thumbnails(record_id: int, image_path: str):
+    """在缩略图进程池中生成缩略图并写入数据库（在缩略图线程池中调用，线程只等待结果）"""
+    try:
+        result = thumbnail_engine.render(image_path)
+    except Exception as e:
+        result = e
+    finish_thumbnails(record_id, image_path, result)
+
+def build_thumbnails_batch(records: List[dict]):
+    """一批记录的缩略图分发到所有工作进程并行生成"""
+    results = thumbnail_engine.render_batch([record['image_path'] for record in records])
+    for record, result in zip(records, results):
+        finish_thumbnails(record['id'], record['image_path'], result)
+
+def fetch_records_without_thumbnails(after_id: int, limit: int):
+    db = get_db_connection()
+    try:
+        cursor = db.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT id, image_path
+            FROM passport_records
+            WHERE id > %s AND thumbnail_sizes IS NULL AND image_path IS NOT NULL AND image_path != ''
+            ORDER BY id
+            LIMIT %s
+        """, (after_id, limit))
+        records = cursor.fetchall()
+        cursor.close()
+        return records
+    finally:
+        db.close()
+
+async def backfill_thumbnails(batch_size: int = 100):
+    """为还没有缩略图的历史记录按批补生成（每批并行分发到缩略图进程池）"""
+    loop = asyncio.get_running_loop()
+    thumbnail_stats['backfill_running'] = True
+    try:
+        last_id = 0
+        while True:
+            try:
+                records = await loop.run_in_executor(thread_pool, fetch_records_without_thumbnails, last_id, batch_size)
+            except Exception as e:
+                logger.error(f"查询缺少缩略图的记录失败: {str(e)}")
+                return
+            if not records:
+                break
+            await loop.run_in_executor(thumbnail_thread_pool, build_thumbnails_batch, records)
+            thumbnail_stats['backfilled'] += len(records)
+            last_id = records[-1]['id']
+        if thumbnail_stats['backfilled']:
+            logger.info(f"缩略图补生成完成: {thumbnail_stats['backfilled']} 条")
+    finally:
+        thumbnail_stats['backfill_running'] = False
 
 def save_ocr_images(record_id: int, ocr_result: dict) -> dict:
     """保存OCR结果图像
@@ -1978,27 +2472,9 @@ def save_ocr_images(record_id: int, ocr_result: dict) -> dict:
 
 
 def get_country_name_cn(country_code: str) -> str:
-    """根据国家代码获取中文名称"""
+    """根据国家代码获取中文名称（支持alpha-3、alpha-2和数字代码）"""
     try:
-        with open('data/country-codes.csv', 'r', encoding='utf-8') as f:
-            # 读取表头
-            header = f.readline().strip().split(',')
-            # 找到需要的列的索引
-            try:
-                iso_index = header.index('ISO3166-1-Alpha-3')
-                cn_index = header.index('official_name_cn')
-            except ValueError as e:
-                print(f"在CSV文件中未找到必要的列: {e}")
-                return ""
-                
-            # 读取数据行
-            for line in f:
-                parts = line.strip().split(',')
-                if len(parts) > max(iso_index, cn_index):
-                    code = parts[iso_index].strip()  # ISO3166-1-Alpha-3代码
-                    name = parts[cn_index].strip()  # 使用official_name_cn列的值
-                    if code and name and code.upper() == country_code.upper():
-                        return name
+        return country_registry.get_name_cn(country_code)
     except Exception as e:
         print(f"获取国家中文名称失败: {str(e)}")
     return ""
@@ -2023,7 +2499,8 @@ def extract_ocr_data(ocr_result: dict) -> dict:
         'country_name_cn': '',
         'visa_no': '',
         'visa_date': None,
-        'passport_type': ''
+        'passport_type': '',
+        'mrz_valid': None  # 找到MRZ时为校验位是否全部通过，不写入数据库
     }
     
     try:
@@ -2149,175 +2626,68 @@ def extract_ocr_data(ocr_result: dict) -> dict:
             extracted_data['doc_type_cn'] = '护照'
             logger.info("🔍 检测到护照特征 (MRZ信息)")
         
-        # 处理MRZ信息
-        mrz_lines = [text for text in all_texts if '<<' in text and len(text) > 30]
-        logger.info(f"🔍 找到 {len(mrz_lines)} 行MRZ信息")
-        
-        # 按顺序分配第一行和第二行MRZ
-        first_line_mrz = None
-        second_line_mrz = None
-        
-        # 直接按OCR获取的顺序，第一个MRZ行就是第一行，第二个MRZ行就是第二行
-        for i, mrz_text in enumerate(mrz_lines):
-            logger.info(f"🔍 分析MRZ行 {i+1}: {mrz_text}")
+        # 处理MRZ信息（格式识别、校验位验证和OCR易混字符纠正见 mrz_parser）
+        mrz = find_mrz(all_texts)
+        if mrz is None:
+            logger.info("🔍 未找到MRZ")
+        else:
+            extracted_data['mrz_valid'] = mrz.valid
+            logger.info(f"🔍 MRZ格式: {mrz.format}, 校验: {mrz.checks}")
+            for field, raw, corrected in mrz.corrections:
+                logger.info(f"🔍 MRZ {field} 易混字符纠正: {raw} -> {corrected}")
+            if mrz.best_effort:
+                logger.warning(f"⚠️  MRZ行长度不符合格式，按护照版面尽量提取（需人工核对）: {mrz.lines}")
+            elif not mrz.valid:
+                logger.warning(f"⚠️  MRZ校验未通过: {mrz.lines}")
             
-            if i == 0:
-                first_line_mrz = mrz_text
-                logger.info(f"🔍 按顺序识别为第一行MRZ: {mrz_text}")
-            elif i == 1:
-                second_line_mrz = mrz_text
-                logger.info(f"🔍 按顺序识别为第二行MRZ: {mrz_text}")
+            if mrz.is_visa:
+                # 签证MRZ：证件号码为签证号码，国家取持证人国籍
+                if mrz.document_number:
+                    extracted_data['visa_no'] = mrz.document_number
+                    logger.info(f"从MRZ设置签证号码: {mrz.document_number}")
+                country_code = mrz.nationality
             else:
-                # 如果有多于2行，忽略后续行
-                logger.warning(f"🔍 忽略额外的MRZ行: {mrz_text}")
-        
-        # 处理第一行MRZ
-        if first_line_mrz:
-            logger.info("🔍 处理第一行MRZ")
-            
-            # 提取护照类型代码 (前2位)
-            if len(first_line_mrz) >= 2:
-                passport_type_code = first_line_mrz[0:2]
-                logger.info(f"🔍 提取的MRZ护照类型代码: {passport_type_code}")
-                
                 # 简化的护照类型判断：只支持三种类型
-                if passport_type_code.startswith('P'):
+                type_code = mrz.document_code[:1]
+                if type_code == 'P':
                     extracted_data['passport_type'] = '普通护照'
-                    logger.info("从MRZ设置护照类型: 普通护照")
-                elif passport_type_code.startswith('D'):
+                elif type_code == 'D':
                     extracted_data['passport_type'] = '外交护照'
-                    logger.info("从MRZ设置护照类型: 外交护照")
-                elif passport_type_code.startswith('O'):
+                elif type_code == 'O':
                     extracted_data['passport_type'] = '外交官'
-                    logger.info("从MRZ设置护照类型: 外交官")
                 else:
-                    logger.info(f"未知的护照类型代码: {passport_type_code}")
+                    logger.info(f"未知的护照类型代码: {mrz.document_code}")
+                if extracted_data['passport_type']:
+                    logger.info(f"从MRZ设置护照类型: {extracted_data['passport_type']}")
+                if mrz.document_number:
+                    extracted_data['passport_no'] = mrz.document_number
+                    logger.info(f"✅ 从MRZ提取护照号码: {mrz.document_number}")
+                country_code = mrz.issuing_state
             
-            # 提取国家代码 (位置2-5)
-            if len(first_line_mrz) >= 5:
-                country_code = first_line_mrz[2:5]
-                logger.info(f"🔍 提取的MRZ国家代码: {country_code}")
-                country_name = get_country_name_cn(country_code)
-                if country_name:
-                    extracted_data['country_name_cn'] = country_name
-                    logger.info(f"从MRZ设置国家: {country_name} ({country_code})")
+            country_name = get_country_name_cn(country_code)
+            if country_name:
+                extracted_data['country_name_cn'] = country_name
+                logger.info(f"从MRZ设置国家: {country_name} ({country_code})")
             
-            # 提取姓名 (去掉护照类型和国家代码前缀)
-            if len(first_line_mrz) >= 5:
-                name_part = first_line_mrz[5:]  # 去掉前5位(护照类型+国家代码)
-                name_parts = name_part.split('<<')
-                if len(name_parts) >= 2:
-                    # 提取姓氏
-                    surname = name_parts[0].replace('<', ' ').strip()
-                    # 提取名字
-                    given_name = name_parts[1].replace('<', ' ').strip()
-                    
-                    if surname and len(surname) > 2 and not extracted_data['name1']:
-                        extracted_data['name1'] = surname
-                        logger.info(f"从MRZ第一行提取姓氏: {surname}")
-                    
-                    if given_name and len(given_name) > 2 and not extracted_data['name2']:
-                        extracted_data['name2'] = given_name
-                        logger.info(f"从MRZ第一行提取名字: {given_name}")
-                elif len(name_parts) == 1:
-                    # 如果只有一个部分，可能是完整的姓名
-                    full_name = name_parts[0].replace('<', ' ').strip()
-                    if full_name and len(full_name) > 2 and not extracted_data['name1']:
-                        extracted_data['name1'] = full_name
-                        logger.info(f"从MRZ第一行提取姓名: {full_name}")
-        
-        # 处理第二行MRZ
-        if second_line_mrz:
-            logger.info("🔍 处理第二行MRZ")
+            if mrz.surname:
+                extracted_data['name1'] = mrz.surname
+                logger.info(f"从MRZ提取姓氏: {mrz.surname}")
+            if mrz.given_names:
+                extracted_data['name2'] = mrz.given_names
+                logger.info(f"从MRZ提取名字: {mrz.given_names}")
             
-            # 从第二行MRZ提取护照号码 (位置0-9)
-            if len(second_line_mrz) >= 9:
-                # 尝试提取护照号码，可能是前9位或者包含字母和数字的组合
-                passport_no = second_line_mrz[0:9]
-                logger.info(f"🔍 从MRZ第二行提取护照号码: {passport_no}")
-                
-                # 清理护照号码，去除填充字符
-                passport_no = passport_no.replace('<', '').strip()
-                if passport_no:
-                    extracted_data['passport_no'] = passport_no
-                    logger.info(f"✅ 从MRZ第二行提取护照号码: {passport_no}")
-                else:
-                    logger.warning("从MRZ第二行提取的护照号码为空")
+            if mrz.sex == 'M':
+                extracted_data['gender'] = '男'
+            elif mrz.sex == 'F':
+                extracted_data['gender'] = '女'
             
-            # 从第二行MRZ提取出生日期 (位置13-19)
-            if len(second_line_mrz) >= 19:
-                birth_mrz = second_line_mrz[13:19]  # 620308 = 62年03月08日
-                logger.info(f"🔍 提取的MRZ出生日期部分: {birth_mrz}")
-                if birth_mrz.isdigit():  # 确保是数字
-                    year = '19' + birth_mrz[0:2]  # 假设是19xx年
-                    month = birth_mrz[2:4]
-                    day = birth_mrz[4:6]
-                    logger.info(f"🔍 解析出生日期: 年={year}, 月={month}, 日={day}")
-                    # 验证日期有效性
-                    if int(month) >= 1 and int(month) <= 12 and int(day) >= 1 and int(day) <= 31:
-                        date_obj = f"{year}-{month}-{day}"
-                        extracted_data['birth_date'] = date_obj
-                        logger.info(f"从MRZ第二行提取出生日期: {date_obj}")
-                    else:
-                        logger.warning(f"无效的MRZ出生日期格式: {birth_mrz}")
-                else:
-                    logger.warning(f"MRZ出生日期部分不是数字: {birth_mrz}")
-            elif len(second_line_mrz) >= 15:
-                # 如果长度不够，尝试从其他位置提取
-                birth_mrz = second_line_mrz[13:15] + second_line_mrz[15:17] + second_line_mrz[17:19]
-                logger.info(f"🔍 尝试从其他位置提取出生日期: {birth_mrz}")
-                if birth_mrz.isdigit() and len(birth_mrz) == 6:
-                    year = '19' + birth_mrz[0:2]
-                    month = birth_mrz[2:4]
-                    day = birth_mrz[4:6]
-                    logger.info(f"🔍 解析出生日期: 年={year}, 月={month}, 日={day}")
-                    if int(month) >= 1 and int(month) <= 12 and int(day) >= 1 and int(day) <= 31:
-                        date_obj = f"{year}-{month}-{day}"
-                        extracted_data['birth_date'] = date_obj
-                        logger.info(f"从MRZ第二行提取出生日期: {date_obj}")
-            
-            # 从第二行MRZ提取性别 (位置20)
-            if len(second_line_mrz) >= 20:
-                gender_code = second_line_mrz[20]
-                logger.info(f"🔍 提取的MRZ性别代码: {gender_code}")
-                if gender_code == 'M':
-                    extracted_data['gender'] = '男'
-                    logger.info("从MRZ第二行提取性别: 男")
-                elif gender_code == 'F':
-                    extracted_data['gender'] = '女'
-                    logger.info("从MRZ第二行提取性别: 女")
-            
-            # 从第二行MRZ提取有效期 (位置21-27)
-            if len(second_line_mrz) >= 27:
-                expiry_mrz = second_line_mrz[21:27]  # 290314 = 29年03月14日
-                logger.info(f"🔍 提取的MRZ有效期部分: {expiry_mrz}")
-                if expiry_mrz.isdigit():  # 确保是数字
-                    year = '20' + expiry_mrz[0:2]
-                    month = expiry_mrz[2:4]
-                    day = expiry_mrz[4:6]
-                    logger.info(f"🔍 解析有效期: 年={year}, 月={month}, 日={day}")
-                    # 验证日期有效性
-                    if int(month) >= 1 and int(month) <= 12 and int(day) >= 1 and int(day) <= 31:
-                        date_obj = f"{year}-{month}-{day}"
-                        extracted_data['expiry_date'] = date_obj
-                        logger.info(f"从MRZ第二行提取有效期: {date_obj}")
-                    else:
-                        logger.warning(f"无效的MRZ有效期格式: {expiry_mrz}")
-                else:
-                    logger.warning(f"MRZ有效期部分不是数字: {expiry_mrz}")
-            elif len(second_line_mrz) >= 23:
-                # 如果长度不够，尝试从其他位置提取
-                expiry_mrz = second_line_mrz[21:23] + second_line_mrz[23:25] + second_line_mrz[25:27]
-                logger.info(f"🔍 尝试从其他位置提取有效期: {expiry_mrz}")
-                if expiry_mrz.isdigit() and len(expiry_mrz) == 6:
-                    year = '20' + expiry_mrz[0:2]
-                    month = expiry_mrz[2:4]
-                    day = expiry_mrz[4:6]
-                    logger.info(f"🔍 解析有效期: 年={year}, 月={month}, 日={day}")
-                    if int(month) >= 1 and int(month) <= 12 and int(day) >= 1 and int(day) <= 31:
-                        date_obj = f"{year}-{month}-{day}"
-                        extracted_data['expiry_date'] = date_obj
-                        logger.info(f"从MRZ第二行提取有效期: {date_obj}")
+            # 出生日期和有效期的世纪已按当前日期推断
+            if mrz.birth_date:
+                extracted_data['birth_date'] = mrz.birth_date.strftime('%Y-%m-%d')
+                logger.info(f"从MRZ提取出生日期: {extracted_data['birth_date']}")
+            if mrz.expiry_date:
+                extracted_data['expiry_date'] = mrz.expiry_date.strftime('%Y-%m-%d')
+                logger.info(f"从MRZ提取有效期: {extracted_data['expiry_date']}")
         
         # ========== 第二步：如果MRZ中没有找到，再从其他OCR文本中提取 ==========
         logger.info("🔍 第二步：如果MRZ中没有找到，再从其他OCR文本中提取")
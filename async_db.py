@@ -0,0 +1,109 @@
+"""
+异步 MySQL 数据访问层
+基于 aiomysql 的连接池，供 FastAPI 路由在事件循环中直接查询，不再占用事件循环执行阻塞的 mysql.connector 调用
+- 会话变量（如 time_zone）通过 init_command 在每个物理连接建立时设置一次
+- 查询参数使用 %s 占位；带参数的查询中字面量 % 需写成 %%（如 DATE_FORMAT 的格式串）
+"""
+
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Sequence
+
+import aiomysql
+
+logger = logging.getLogger('ocr_server.async_db')
+
+
+class AsyncDatabase:
+    """异步连接池（在应用启动时创建，关闭时释放）"""
+
+    def __init__(self, config: dict, minsize: int = 1, maxsize: int = 10,
+                 session_variables: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            config: 数据库配置（host / port / user / password / database / charset）
+            minsize: 连接池最小连接数
+            maxsize: 连接池最大连接数
+            session_variables: 每个物理连接建立时设置的会话变量 (如: {'time_zone': '+08:00'})
+        """
+        self.config = config
+        self.minsize = minsize
+        self.maxsize = maxsize
+        self.session_variables = session_variables or {}
+        self._pool: Optional[aiomysql.Pool] = None
+
+    async def start(self):
+        if self._pool is not None:
+            return
+        init_command = None
+        if self.session_variables:
+            init_command = "SET " + ", ".join(
+                f"@@session.{name} = '{value}'" for name, value in self.session_variables.items()
+            )
+        self._pool = await aiomysql.create_pool(
+            host=self.config['host'],
+            port=self.config.get('port', 3306),
+            user=self.config['user'],
+            password=self.config['password'],
+            db=self.config['database'],
+            charset=self.config.get('charset', 'utf8mb4'),
+            autocommit=True,
+            connect_timeout=self.config.get('connect_timeout', 10),
+            init_command=init_command,
+            minsize=self.minsize,
+            maxsize=self.maxsize,
+            pool_recycle=3600,  # 超过1小时的连接在检出时重建，避免被服务端 wait_timeout 断开
+        )
+        logger.info(f"异步数据库连接池已创建: {self.minsize}-{self.maxsize} 个连接")
+
+    async def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+            self._pool = None
+            logger.info("异步数据库连接池已关闭")
+
+    @property
+    def pool(self) -> aiomysql.Pool:
+        if self._pool is None:
+            raise RuntimeError("异步数据库连接池尚未创建")
+        return self._pool
+
+    @asynccontextmanager
+    async def cursor(self):
+        """获取一个字典游标，退出时归还连接；出错时回滚未提交的事务"""
+        async with self.pool.acquire() as conn:
+            cursor = await conn.cursor(aiomysql.DictCursor)
+            try:
+                yield cursor
+            except Exception:
+                await conn.rollback()
+                raise
+            finally:
+                await cursor.close()
+
+    async def fetch_one(self, sql: str, args: Optional[Sequence[Any]] = None) -> Optional[dict]:
+        async with self.cursor() as cursor:
+            await cursor.execute(sql, args)
+            return await cursor.fetchone()
+
+    async def fetch_all(self, sql: str, args: Optional[Sequence[Any]] = None) -> List[dict]:
+        async with self.cursor() as cursor:
+            await cursor.execute(sql, args)
+            return list(await cursor.fetchall())
+
+    async def execute(self, sql: str, args: Optional[Sequence[Any]] = None) -> int:
+        """执行写操作（自动提交），返回影响行数"""
+        async with self.cursor() as cursor:
+            return await cursor.execute(sql, args)
+
+    def stats(self) -> dict:
+        if self._pool is None:
+            return {'started': False}
+        return {
+            'started': True,
+            'size': self._pool.size,
+            'free': self._pool.freesize,
+            'minsize': self._pool.minsize,
+            'maxsize': self._pool.maxsize,
+        }
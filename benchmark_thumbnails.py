@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+缩略图生成性能对比
+对一个目录中的样本上传图片分别用以下方式生成缩略图，输出每张平均耗时和吞吐量：
+  1. 旧方式：完整解码原图 + thumbnail()，只生成 128 的 JPEG（原 create_thumbnail）
+  2. 完整解码 + 多尺寸：与新引擎输出相同，但不使用 draft
+  3. 新引擎（单进程）：draft 按 DCT 缩放解码 + 多尺寸
+  4. 新引擎（进程池）：同 3，按批分发到多个工作进程
+
+用法:
+    python benchmark_thumbnails.py uploads
+    python benchmark_thumbnails.py uploads --limit 50 --workers 4 --sizes 128,320,640
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from thumbnail_engine import THUMBNAIL_FORMATS, ThumbnailEngine, render_thumbnails, thumbnail_path
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+
+
+def legacy_thumbnail(source_dir: Path, image_path: str, output_dir: Path):
+    """原 create_thumbnail：完整解码后缩放到 128，保存 JPEG"""
+    with Image.open(source_dir / image_path) as img:
+        img.thumbnail((128, 128))
+        img.convert('RGB').save(str(output_dir / Path(image_path).name), 'JPEG', quality=85)
+
+
+def full_decode_thumbnails(source_dir: Path, image_path: str, output_dir: Path, sizes, quality):
+    """与新引擎输出相同的多尺寸缩略图，但完整解码原图"""
+    with Image.open(source_dir / image_path) as img:
+        img = img.convert('RGB')
+    for size in sorted(sizes, reverse=True):
+        img.thumbnail((size, size), Image.LANCZOS)
+        (output_dir / "thumbnails" / str(size)).mkdir(parents=True, exist_ok=True)
+        for ext, image_format in THUMBNAIL_FORMATS:
+            img.save(str(output_dir / thumbnail_path(image_path, size, ext)), image_format, quality=quality)
+
+
+def run_case(name, images, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    per_image = elapsed / len(images) * 1000
+    print(f"  {name:<24} 总耗时 {elapsed:7.2f}秒  每张 {per_image:8.1f}毫秒  吞吐 {len(images) / elapsed:7.1f}张/秒")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='缩略图生成性能对比')
+    parser.add_argument('directory', help='样本图片目录（如 uploads）')
+    parser.add_argument('--limit', type=int, default=100, help='最多使用的图片数量')
+    parser.add_argument('--sizes', default='128,320,640', help='缩略图尺寸(逗号分隔)')
+    parser.add_argument('--quality', type=int, default=80, help='编码质量')
+    parser.add_argument('--workers', type=int, default=None, help='进程池工作进程数，默认 CPU 核数的一半')
+    args = parser.parse_args()
+
+    source_dir = Path(args.directory)
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+    images = sorted(
+        path.name for path in source_dir.iterdir()
+        if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS
+    )[:args.limit]
+    if not images:
+        print(f"❌ 目录中没有图片: {source_dir}")
+        return
+
+    with Image.open(source_dir / images[0]) as sample:
+        print(f"📷 样本: {len(images)} 张 (首张 {sample.format} {sample.size[0]}x{sample.size[1]})，尺寸: {sizes}")
+
+    output_root = Path(tempfile.mkdtemp(prefix='thumb_bench_'))
+    try:
+        def output(case):
+            path = output_root / case
+            path.mkdir()
+            return path
+
+        legacy_dir, full_dir, draft_dir, pool_dir = (output(case) for case in ('legacy', 'full', 'draft', 'pool'))
+        results = {}
+        results['legacy'] = run_case('旧方式 (128 JPEG)', images, lambda: [
+            legacy_thumbnail(source_dir, image, legacy_dir) for image in images
+        ])
+        results['full'] = run_case('完整解码 + 多尺寸', images, lambda: [
+            full_decode_thumbnails(source_dir, image, full_dir, sizes, args.quality) for image in images
+        ])
+        results['draft'] = run_case('draft 解码 + 多尺寸', images, lambda: [
+            render_thumbnails(str(source_dir), image, sizes, args.quality, str(draft_dir)) for image in images
+        ])
+
+        engine = ThumbnailEngine(source_dir, sizes, quality=args.quality, workers=args.workers, output_dir=pool_dir)
+        engine.start()
+        try:
+            # 预热：进程启动和 PIL 导入不计入耗时
+            engine.render_batch(images[:engine.workers])
+            results['pool'] = run_case(f'进程池 x{engine.workers}', images, lambda: engine.render_batch(images))
+        finally:
+            engine.close()
+
+        print(f"\n✅ draft 解码相对完整解码（相同输出）: {results['full'] / results['draft']:.2f}x")
+        print(f"✅ 进程池相对完整解码（相同输出）: {results['full'] / results['pool']:.2f}x")
+    finally:
+        shutil.rmtree(output_root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -46,20 +46,21 @@ def check_database_data():
         for record in recent_records:
             print(f"   ID: {record['id']}, 类型: {record['doc_type_cn']}, 创建时间: {record['created_at']}, 更新时间: {record['updated_at']}")
         
-        # 4. 检查今天的记录
+        # 4. 检查今天的记录（左闭右开的时间范围，可以走 created_at 索引）
         cursor.execute("""
             SELECT COUNT(*) as count 
             FROM passport_records 
-            WHERE DATE(created_at) = CURDATE()
+            WHERE created_at >= CURDATE() AND created_at < CURDATE() + INTERVAL 1 DAY
         """)
         today_raw = cursor.fetchone()['count']
         print(f"\n📅 今天记录数（原始时间）: {today_raw}")
         
-        # 5. 检查时区转换后的今天记录
+        # 5. 检查时区转换后的今天记录（把北京时间的当天边界转换到存储时区，而不是逐行转换 created_at）
         cursor.execute("""
             SELECT COUNT(*) as count 
             FROM passport_records 
-            WHERE DATE(CONVERT_TZ(created_at, '+00:00', '+08:00')) = CURDATE()
+            WHERE created_at >= CONVERT_TZ(CURDATE(), '+08:00', '+00:00')
+            AND created_at < CONVERT_TZ(CURDATE() + INTERVAL 1 DAY, '+08:00', '+00:00')
         """)
         today_converted = cursor.fetchone()['count']
         print(f"📅 今天记录数（时区转换后）: {today_converted}")
@@ -68,7 +69,8 @@ def check_database_data():
         cursor.execute("""
             SELECT COUNT(*) as count 
             FROM passport_records 
-            WHERE DATE(CONVERT_TZ(created_at, '+00:00', '+08:00')) = CURDATE()
+            WHERE created_at >= CONVERT_TZ(CURDATE(), '+08:00', '+00:00')
+            AND created_at < CONVERT_TZ(CURDATE() + INTERVAL 1 DAY, '+08:00', '+00:00')
             AND doc_type_cn = '护照'
         """)
         today_passport = cursor.fetchone()['count']
@@ -35,7 +35,16 @@ APP_CONFIG = {
 OCR_CONFIG = {
     'service_url': 'http://localhost:8080/ocr',
     'max_retries': 5,
-    'timeout': 30
+    'timeout': 30,
+    'connect_timeout': 5,  # 建立连接超时(秒)
+    'read_timeout': 120,  # 等待识别结果超时(秒)，CPU推理排队时可能较慢
+    'max_connections': 20,  # 连接池最大连接数
+    'max_keepalive_connections': 10,  # 保持空闲的最大连接数
+    'routing': 'least_outstanding',  # 多后端路由策略: least_outstanding 或 ewma
+    'failure_threshold': 3,  # 后端连续失败多少次后熔断剔除
+    'probe_interval': 10,  # 后台健康探测间隔(秒)
+    'ewma_alpha': 0.3,  # EWMA延迟平滑系数
+    'health_urls': {}  # 单独指定健康检查地址 {识别接口地址: 健康检查地址}，未指定时把路径末尾的 /ocr 换成 /health
 }
 
 # 日志配置
@@ -0,0 +1,306 @@
+"""
+国家代码注册表
+启动时一次性加载 data/country-codes.csv，按 alpha-3 / alpha-2 / 数字代码建立内存索引，
+仅当文件修改时间(mtime)变化时才重新加载
+同时预建搜索索引，支持前缀匹配、子串匹配（按匹配位置排序）和拼音首字母匹配
+"""
+
+import bisect
+import csv
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger('ocr_server.country')
+
+# 拼音首字母匹配依赖 pypinyin（可选），未安装时跳过拼音索引
+try:
+    from pypinyin import lazy_pinyin, Style
+except ImportError:
+    lazy_pinyin = None
+    Style = None
+
+# CSV中使用的列名
+COL_ALPHA3 = 'ISO3166-1-Alpha-3'
+COL_ALPHA2 = 'ISO3166-1-Alpha-2'
+COL_NUMERIC = 'ISO3166-1-numeric'
+COL_NAME_CN = 'official_name_cn'
+COL_NAME_EN = 'official_name_en'
+COL_REGION = 'Region Name'
+
+REQUIRED_COLUMNS = [COL_ALPHA3, COL_NAME_CN, COL_NAME_EN]
+
+# 搜索键类型
+KEY_CODE = 'code'
+KEY_NAME_CN = 'name_cn'
+KEY_NAME_EN = 'name_en'
+KEY_PINYIN = 'pinyin'
+
+# 匹配等级（数值越小排名越靠前）
+RANK_EXACT_CODE = 0
+RANK_EXACT_NAME = 1
+RANK_PREFIX_CODE = 2
+RANK_PREFIX_NAME = 3
+RANK_PREFIX_PINYIN = 4
+RANK_SUBSTRING = 5
+
+
+def pinyin_initials(text: str) -> str:
+    """获取中文名称的拼音首字母（大写），pypinyin未安装时返回空字符串"""
+    if not text or lazy_pinyin is None:
+        return ''
+    letters = lazy_pinyin(text, style=Style.FIRST_LETTER, errors='ignore')
+    return ''.join(letters).upper()
+
+
+class CountrySearchIndex:
+    """国家搜索索引（加载时一次性构建，构建后只读）"""
+
+    def __init__(self, countries: List[dict]):
+        self.countries = countries
+        # 每个国家的搜索键: [(键类型, 大写键值)]
+        self.keys: List[List[Tuple[str, str]]] = []
+        # 前缀索引: 按键值排序的 (键值, 国家序号, 键类型)
+        self.sorted_keys: List[Tuple[str, int, str]] = []
+        # 子串索引: 单字符/双字符 -> 国家序号集合
+        self.grams: Dict[str, Set[int]] = {}
+
+        for idx, country in enumerate(countries):
+            keys = []
+            for code in (country['country_code'], country['alpha2'], country['numeric']):
+                if code:
+                    keys.append((KEY_CODE, code.upper()))
+            if country['country_name_cn']:
+                keys.append((KEY_NAME_CN, country['country_name_cn'].upper()))
+            if country['country_name_en']:
+                keys.append((KEY_NAME_EN, country['country_name_en'].upper()))
+            initials = pinyin_initials(country['country_name_cn'])
+            if initials:
+                keys.append((KEY_PINYIN, initials))
+            self.keys.append(keys)
+
+            for kind, value in keys:
+                self.sorted_keys.append((value, idx, kind))
+                for gram in self._grams_of(value):
+                    self.grams.setdefault(gram, set()).add(idx)
+
+        self.sorted_keys.sort()
+        self._sorted_values = [item[0] for item in self.sorted_keys]
+
+    @staticmethod
+    def _grams_of(value: str) -> Set[str]:
+        grams = set(value)
+        grams.update(value[i:i + 2] for i in range(len(value) - 1))
+        return grams
+
+    def _prefix_matches(self, query: str) -> List[Tuple[int, str, str]]:
+        """二分查找所有以query开头的键，返回 (国家序号, 键类型, 键值)"""
+        matches = []
+        pos = bisect.bisect_left(self._sorted_values, query)
+        while pos < len(self.sorted_keys) and self._sorted_values[pos].startswith(query):
+            value, idx, kind = self.sorted_keys[pos]
+            matches.append((idx, kind, value))
+            pos += 1
+        return matches
+
+    def _substring_candidates(self, query: str) -> Set[int]:
+        """通过字符/双字符倒排索引求候选国家集合"""
+        grams = [query] if len(query) == 1 else [query[i:i + 2] for i in range(len(query) - 1)]
+        postings = [self.grams.get(gram) for gram in grams]
+        if not all(postings):
+            return set()
+        postings.sort(key=len)
+        return set.intersection(*postings)
+
+    def search(self, keyword: str, limit: int) -> List[dict]:
+        """搜索国家，返回按相关度排序的国家信息
+        Args:
+            keyword: 搜索关键词（代码、中文名、英文名或拼音首字母）
+            limit: 返回数量上限
+        Returns:
+            list: 国家信息列表
+        """
+        query = (keyword or '').strip().upper()
+        if not query or limit <= 0:
+            return []
+
+        # 每个国家取最好的匹配: (等级, 匹配位置, 键长度, 国家序号)
+        best: Dict[int, Tuple[int, int, int, int]] = {}
+
+        def offer(idx, rank, position, length):
+            score = (rank, position, length, idx)
+            if idx not in best or score < best[idx]:
+                best[idx] = score
+
+        for idx, kind, value in self._prefix_matches(query):
+            exact = value == query
+            if kind == KEY_CODE:
+                rank = RANK_EXACT_CODE if exact else RANK_PREFIX_CODE
+            elif kind == KEY_PINYIN:
+                rank = RANK_PREFIX_PINYIN
+            else:
+                rank = RANK_EXACT_NAME if exact else RANK_PREFIX_NAME
+            offer(idx, rank, 0, len(value))
+
+        for idx in self._substring_candidates(query):
+            for kind, value in self.keys[idx]:
+                if kind == KEY_PINYIN:
+                    continue
+                position = value.find(query)
+                if position > 0:
+                    offer(idx, RANK_SUBSTRING, position, len(value))
+
+        ranked = sorted(best.values())
+        return [self.countries[score[3]] for score in ranked[:limit]]
+
+
+class CountryRegistry:
+    """国家代码内存注册表"""
+
+    def __init__(self, csv_path: str, check_interval: float = 5.0):
+        """
+        Args:
+            csv_path: 国家代码CSV文件路径
+            check_interval: 两次检查文件mtime的最小间隔(秒)，避免每次查询都stat文件
+        """
+        self.csv_path = csv_path
+        self.check_interval = check_interval
+        self.header: List[str] = []
+        self.countries: List[dict] = []
+        self._by_alpha3: Dict[str, dict] = {}
+        self._by_alpha2: Dict[str, dict] = {}
+        self._by_numeric: Dict[str, dict] = {}
+        self._search_index: Optional[CountrySearchIndex] = None
+        self._mtime: Optional[float] = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def load(self) -> bool:
+        """从CSV文件加载数据并重建索引
+        Returns:
+            bool: 是否加载成功
+        """
+        with self._lock:
+            try:
+                mtime = os.path.getmtime(self.csv_path)
+                with open(self.csv_path, 'r', encoding='utf-8', newline='') as f:
+                    reader = csv.reader(f)
+                    header = [column.strip() for column in next(reader, [])]
+                    missing = [column for column in REQUIRED_COLUMNS if column not in header]
+                    if missing:
+                        logger.error(f"国家代码CSV文件缺少必要的列: {missing}")
+                        # 记录mtime，文件未修改前不再重复尝试加载
+                        self._mtime = mtime
+                        return False
+
+                    index = {column: i for i, column in enumerate(header)}
+                    countries = []
+                    for parts in reader:
+                        def cell(column):
+                            i = index.get(column)
+                            if i is None or i >= len(parts):
+                                return ''
+                            return parts[i].strip()
+
+                        alpha3 = cell(COL_ALPHA3).upper()
+                        if not alpha3:
+                            continue
+                        numeric = cell(COL_NUMERIC)
+                        countries.append({
+                            'country_code': alpha3,
+                            'alpha2': cell(COL_ALPHA2).upper(),
+                            # CSV中的数字代码可能被存成 "4" 或 "004"，统一补齐为3位
+                            'numeric': numeric.zfill(3) if numeric.isdigit() else numeric,
+                            'country_name_cn': cell(COL_NAME_CN),
+                            'country_name_en': cell(COL_NAME_EN),
+                            'region': cell(COL_REGION),
+                        })
+
+                by_alpha3, by_alpha2, by_numeric = {}, {}, {}
+                for country in countries:
+                    by_alpha3.setdefault(country['country_code'], country)
+                    if country['alpha2']:
+                        by_alpha2.setdefault(country['alpha2'], country)
+                    if country['numeric']:
+                        by_numeric.setdefault(country['numeric'], country)
+                search_index = CountrySearchIndex(countries)
+
+                self.header = header
+                self.countries = countries
+                self._by_alpha3 = by_alpha3
+                self._by_alpha2 = by_alpha2
+                self._by_numeric = by_numeric
+                self._search_index = search_index
+                self._mtime = mtime
+                self._last_check = time.monotonic()
+                logger.info(f"国家代码注册表加载完成: {len(countries)} 个国家/地区")
+                return True
+            except Exception as e:
+                logger.error(f"加载国家代码文件失败: {str(e)}")
+                return False
+
+    def _refresh_if_changed(self):
+        """文件mtime变化时重新加载（按check_interval节流）"""
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        try:
+            mtime = os.path.getmtime(self.csv_path)
+        except OSError:
+            return
+        if mtime != self._mtime:
+            logger.info("检测到国家代码文件已修改，重新加载")
+            self.load()
+
+    def lookup(self, code: str) -> Tuple[Optional[dict], str]:
+        """按 alpha-3、alpha-2 或数字代码查询国家，同时返回按代码格式选用的CSV列
+        Args:
+            code: 国家代码 (如: CHN, CN, 156)
+        Returns:
+            (dict, str): 国家信息（未找到为None）和查询的列名（代码为空时为空字符串）
+        """
+        self._refresh_if_changed()
+        code = (code or '').strip().upper()
+        if not code:
+            return None, ''
+        if code.isdigit():
+            return self._by_numeric.get(code.zfill(3)), COL_NUMERIC
+        if len(code) == 2:
+            return self._by_alpha2.get(code), COL_ALPHA2
+        return self._by_alpha3.get(code), COL_ALPHA3
+
+    def get(self, code: str) -> Optional[dict]:
+        """按 alpha-3、alpha-2 或数字代码查询国家
+        Args:
+            code: 国家代码 (如: CHN, CN, 156)
+        Returns:
+            dict: 国家信息，未找到返回None
+        """
+        return self.lookup(code)[0]
+
+    def get_name_cn(self, code: str) -> str:
+        """根据国家代码获取中文名称，未找到返回空字符串"""
+        country = self.get(code)
+        return country['country_name_cn'] if country else ''
+
+    def search(self, keyword: str, limit: int = 10) -> List[dict]:
+        """按代码、中文名、英文名或拼音首字母搜索国家
+        Args:
+            keyword: 搜索关键词
+            limit: 返回数量上限
+        Returns:
+            list: 按相关度排序的国家信息列表
+        """
+        self._refresh_if_changed()
+        search_index = self._search_index
+        if search_index is None:
+            return []
+        return search_index.search(keyword, limit)
+
+    def all(self) -> List[dict]:
+        """返回全部国家（按CSV顺序）"""
+        self._refresh_if_changed()
+        return self.countries
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+每日统计汇总表 passport_daily_stats 和总数表 passport_stats_totals
+按 (日期, 证件类型, 状态) 维护记录数，另按 (证件类型, 状态) 维护全部日期的总数，
+统计接口只需读取今日的几行汇总数据和总数表，不再扫描 passport_records 或整个汇总表
+- 写入 passport_records 的事务中：修改前后各取一次受影响记录的快照，把差值累加到两个表（同一事务提交）
+- 快照使用 SELECT ... FOR UPDATE 锁定记录，并发修改同一条记录时不会重复或遗漏计数
+- 汇总数据出现偏差（如手工修改了数据库）时，用本脚本按日期范围重建：
+    python daily_stats.py                               重建全部日期
+    python daily_stats.py --from 2025-06-01 --to 2025-06-30
+"""
+
+import argparse
+import logging
+from collections import Counter
+from datetime import date
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger('ocr_server.daily_stats')
+
+DAILY_STATS_TABLE = 'passport_daily_stats'
+TOTALS_TABLE = 'passport_stats_totals'
+
+# 证件类型/状态为 NULL 的记录在汇总表中记为空字符串（主键列不能为 NULL）
+SNAPSHOT_SQL = """
+    SELECT DATE(created_at) AS stat_date,
+           COALESCE(doc_type_cn, '') AS doc_type_cn,
+           COALESCE(status, '') AS status
+    FROM passport_records
+    WHERE id IN ({placeholders})
+    FOR UPDATE
+"""
+
+APPLY_DELTA_SQL = f"""
+    INSERT INTO {DAILY_STATS_TABLE} (stat_date, doc_type_cn, status, record_count)
+    VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE record_count = record_count + VALUES(record_count)
+"""
+
+APPLY_TOTAL_DELTA_SQL = f"""
+    INSERT INTO {TOTALS_TABLE} (doc_type_cn, status, record_count)
+    VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE record_count = record_count + VALUES(record_count)
+"""
+
+REBUILD_TOTALS_SQL = f"""
+    INSERT INTO {TOTALS_TABLE} (doc_type_cn, status, record_count)
+    SELECT doc_type_cn, status, SUM(record_count)
+    FROM {DAILY_STATS_TABLE}
+    GROUP BY doc_type_cn, status
+"""
+
+REBUILD_SQL = f"""
+    INSERT INTO {DAILY_STATS_TABLE} (stat_date, doc_type_cn, status, record_count)
+    SELECT DATE(created_at), COALESCE(doc_type_cn, ''), COALESCE(status, ''), COUNT(*)
+    FROM passport_records
+    {{where}}
+    GROUP BY DATE(created_at), COALESCE(doc_type_cn, ''), COALESCE(status, '')
+"""
+
+StatKey = Tuple[date, str, str]
+
+
+def _row_key(row) -> StatKey:
+    """字典游标和元组游标的行统一转换为 (日期, 证件类型, 状态)"""
+    if isinstance(row, dict):
+        return row['stat_date'], row['doc_type_cn'], row['status']
+    return row[0], row[1], row[2]
+
+
+def _snapshot_sql(record_ids: Sequence[int]) -> str:
+    return SNAPSHOT_SQL.format(placeholders=', '.join(['%s'] * len(record_ids)))
+
+
+def diff_snapshots(before: Counter, after: Counter) -> List[Tuple[date, str, str, int]]:
+    """计算两次快照的差值，返回非零的 (日期, 证件类型, 状态, 增量)，按主键排序以固定加锁顺序"""
+    deltas = []
+    for key in sorted(set(before) | set(after)):
+        delta = after[key] - before[key]
+        if delta:
+            deltas.append((*key, delta))
+    return deltas
+
+
+def total_deltas(deltas: Sequence[Tuple[date, str, str, int]]) -> List[Tuple[str, str, int]]:
+    """把每日增量按 (证件类型, 状态) 合并为总数增量，去掉相互抵消的项，按主键排序"""
+    totals = Counter()
+    for _, doc_type_cn, status, delta in deltas:
+        totals[(doc_type_cn, status)] += delta
+    return [(*key, delta) for key, delta in sorted(totals.items()) if delta]
+
+
+def snapshot(cursor, record_ids: Iterable[int]) -> Counter:
+    """在当前事务中锁定并统计指定记录（mysql.connector 游标）"""
+    record_ids = list(dict.fromkeys(record_ids))
+    if not record_ids:
+        return Counter()
+    cursor.execute(_snapshot_sql(record_ids), record_ids)
+    return Counter(_row_key(row) for row in cursor.fetchall())
+
+
+def apply_changes(cursor, record_ids: Iterable[int], before: Optional[Counter] = None) -> int:
+    """修改完成后再取一次快照，把差值写入汇总表（与修改在同一事务中）
+    Args:
+        before: 修改前的快照；新插入的记录不需要传
+    Returns:
+        int: 变化的汇总行数
+    """
+    deltas = diff_snapshots(before or Counter(), snapshot(cursor, record_ids))
+    if deltas:
+        cursor.executemany(APPLY_DELTA_SQL, deltas)
+        totals = total_deltas(deltas)
+        if totals:
+            cursor.executemany(APPLY_TOTAL_DELTA_SQL, totals)
+    return len(deltas)
+
+
+async def snapshot_async(cursor, record_ids: Iterable[int]) -> Counter:
+    """snapshot 的 aiomysql 版本"""
+    record_ids = list(dict.fromkeys(record_ids))
+    if not record_ids:
+        return Counter()
+    await cursor.execute(_snapshot_sql(record_ids), record_ids)
+    return Counter(_row_key(row) for row in await cursor.fetchall())
+
+
+async def apply_changes_async(cursor, record_ids: Iterable[int], before: Optional[Counter] = None) -> int:
+    """apply_changes 的 aiomysql 版本"""
+    deltas = diff_snapshots(before or Counter(), await snapshot_async(cursor, record_ids))
+    if deltas:
+        await cursor.executemany(APPLY_DELTA_SQL, deltas)
+        totals = total_deltas(deltas)
+        if totals:
+            await cursor.executemany(APPLY_TOTAL_DELTA_SQL, totals)
+    return len(deltas)
+
+
+def rebuild(conn, start: Optional[date] = None, end: Optional[date] = None) -> int:
+    """按日期范围（含首尾）从 passport_records 重新生成汇总数据，再由汇总表重新计算总数表
+    Returns:
+        int: 写入的汇总行数
+    """
+    stats_conditions, record_conditions, params = [], [], []
+    if start is not None:
+        stats_conditions.append("stat_date >= %s")
+        record_conditions.append("created_at >= %s")
+        params.append(start)
+    if end is not None:
+        stats_conditions.append("stat_date <= %s")
+        record_conditions.append("created_at < %s + INTERVAL 1 DAY")
+        params.append(end)
+
+    cursor = conn.cursor()
+    try:
+        conn.start_transaction()
+        delete_sql = f"DELETE FROM {DAILY_STATS_TABLE}"
+        if stats_conditions:
+            delete_sql += " WHERE " + " AND ".join(stats_conditions)
+        cursor.execute(delete_sql, params)
+        where = "WHERE " + " AND ".join(record_conditions) if record_conditions else ""
+        cursor.execute(REBUILD_SQL.format(where=where), params)
+        rows = cursor.rowcount
+        cursor.execute(f"DELETE FROM {TOTALS_TABLE}")
+        cursor.execute(REBUILD_TOTALS_SQL)
+        conn.commit()
+        logger.info(f"每日统计已重建: {start or '最早'} ~ {end or '最新'}, {rows} 行")
+        return rows
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='重建每日统计汇总表 passport_daily_stats 和总数表 passport_stats_totals')
+    parser.add_argument('--from', dest='start', type=date.fromisoformat, help='起始日期 (YYYY-MM-DD)，默认不限')
+    parser.add_argument('--to', dest='end', type=date.fromisoformat, help='结束日期 (YYYY-MM-DD，包含)，默认不限')
+    args = parser.parse_args()
+
+    import mysql.connector
+    from config import DB_CONFIG
+
+    conn = mysql.connector.connect(**DB_CONFIG)
+    try:
+        date_range = f"{args.start or '最早'} ~ {args.end or '最新'}"
+        print(f"🔄 正在重建每日统计: {date_range}")
+        rows = rebuild(conn, args.start, args.end)
+        print(f"✅ 重建完成，写入 {rows} 行汇总数据")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
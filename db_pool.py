@@ -0,0 +1,163 @@
+"""
+MySQL 连接池
+- 每个物理连接只在建立时初始化一次会话变量（如 time_zone），归还时不重置会话
+- 检出连接时不再每次 ping：只有空闲超过阈值的连接才检查存活，失效则重建
+- 获取连接的重试逻辑集中在这里，读/写/通用连接池共用
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Dict, Optional
+
+import mysql.connector
+
+logger = logging.getLogger('ocr_server.db_pool')
+
+# 连接池专用参数，不传给 mysql.connector.connect
+POOL_ONLY_KEYS = ('pool_name', 'pool_size', 'pool_reset_session')
+
+
+class PooledConnection:
+    """物理连接的包装，close() 时归还连接池而不是断开"""
+
+    def __init__(self, pool: 'ConnectionPool', cnx):
+        self._pool = pool
+        self._cnx = cnx
+
+    def __getattr__(self, name):
+        if self._cnx is None:
+            raise mysql.connector.errors.OperationalError("连接已归还连接池")
+        return getattr(self._cnx, name)
+
+    def close(self):
+        if self._cnx is not None:
+            cnx, self._cnx = self._cnx, None
+            self._pool._release(cnx)
+
+
+class ConnectionPool:
+    """带会话初始化钩子和延迟存活检查的连接池（线程安全）"""
+
+    def __init__(self, config: dict, session_variables: Optional[Dict[str, str]] = None,
+                 max_retries: int = 5, retry_delay: float = 1, idle_check_seconds: float = 30):
+        """
+        Args:
+            config: 连接配置，pool_name / pool_size 为连接池参数，其余传给 mysql.connector.connect
+            session_variables: 每个物理连接建立后设置一次的会话变量 (如: {'time_zone': '+08:00'})
+            max_retries: 获取连接失败时的最大重试次数
+            retry_delay: 重试的初始等待时间(秒)，按指数退避
+            idle_check_seconds: 连接空闲超过该时间后，检出时先 ping 检查存活
+        """
+        self.name = config.get('pool_name', 'pool')
+        self.size = config.get('pool_size', 5)
+        self.connect_config = {k: v for k, v in config.items() if k not in POOL_ONLY_KEYS}
+        self.session_variables = session_variables or {}
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.idle_check_seconds = idle_check_seconds
+        # LIFO：优先复用最近使用过的连接，长时间空闲的连接留在底部
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self.stats = {'connects': 0, 'checkouts': 0, 'idle_pings': 0, 'discarded': 0}
+
+    def _connect(self):
+        """建立物理连接并初始化会话变量（每个物理连接只执行一次）"""
+        cnx = mysql.connector.connect(**self.connect_config)
+        if self.session_variables:
+            assignments = ', '.join(f"@@session.{name} = %s" for name in self.session_variables)
+            cursor = cnx.cursor()
+            cursor.execute(f"SET {assignments}", tuple(self.session_variables.values()))
+            cursor.close()
+        cnx._pool_last_used = time.monotonic()
+        self.stats['connects'] += 1
+        return cnx
+
+    def _discard(self, cnx):
+        with self._lock:
+            self._created -= 1
+        self.stats['discarded'] += 1
+        try:
+            cnx.close()
+        except Exception:
+            pass
+
+    def _checkout(self, timeout: float):
+        """取出一个可用连接：优先复用空闲连接，未满时新建，否则等待归还"""
+        try:
+            cnx = self._idle.get_nowait()
+        except queue.Empty:
+            cnx = None
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    return self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            try:
+                cnx = self._idle.get(timeout=timeout)
+            except queue.Empty:
+                raise mysql.connector.errors.PoolError(f"连接池 {self.name} 已耗尽 (大小: {self.size})")
+
+        # 只检查空闲超过阈值的连接，失效时重建
+        if time.monotonic() - cnx._pool_last_used > self.idle_check_seconds:
+            self.stats['idle_pings'] += 1
+            try:
+                cnx.ping(reconnect=False)
+            except Exception:
+                logger.info(f"连接池 {self.name} 中的空闲连接已失效，重新建立")
+                self._discard(cnx)
+                with self._lock:
+                    self._created += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+        return cnx
+
+    def _release(self, cnx):
+        """归还连接；未结束的事务先回滚，出错的连接直接丢弃"""
+        try:
+            if cnx.in_transaction:
+                cnx.rollback()
+            if cnx.unread_result:
+                cnx.consume_results()
+        except Exception:
+            self._discard(cnx)
+            return
+        cnx._pool_last_used = time.monotonic()
+        self._idle.put(cnx)
+
+    def get_connection(self, timeout: float = 10) -> PooledConnection:
+        """获取连接，失败时按指数退避重试"""
+        for attempt in range(self.max_retries):
+            try:
+                cnx = self._checkout(timeout)
+                self.stats['checkouts'] += 1
+                return PooledConnection(self, cnx)
+            except mysql.connector.Error as e:
+                if attempt < self.max_retries - 1:
+                    sleep_time = self.retry_delay * (2 ** attempt)
+                    logger.warning(f"获取数据库连接失败 ({self.name})，{sleep_time}秒后重试: {str(e)}")
+                    time.sleep(sleep_time)
+                else:
+                    logger.error(f"获取数据库连接失败 ({self.name})，已重试{self.max_retries}次: {str(e)}")
+                    raise
+
+    def pool_stats(self) -> dict:
+        return {
+            'name': self.name,
+            'size': self.size,
+            'created': self._created,
+            'idle': self._idle.qsize(),
+            **self.stats,
+        }
@@ -0,0 +1,55 @@
+"""
+OCR前的图片预处理（在网关中执行，原图仍保存在上传目录中用于留档）
+- 按 EXIF 方向旋转，OCR服务收到的图片方向与拍摄时一致
+- 缩小到最长边不超过 max_side：JPEG 先用 draft 按 DCT 缩放解码，再精确缩放
+- 重新编码为 JPEG，减少发往OCR服务的字节数以及OCR服务端的解码时间和内存
+已满足要求的 JPEG（尺寸不超过上限且无需旋转）原样返回，不做有损的重新编码
+"""
+
+from io import BytesIO
+from typing import Tuple
+
+from PIL import Image, ImageOps
+
+from thumbnail_engine import draft_size
+
+EXIF_ORIENTATION = 0x0112
+
+
+def normalize_image(data: bytes, max_side: int, quality: int = 85) -> Tuple[bytes, dict]:
+    """预处理一张图片（CPU密集，在进程池中执行）
+    Args:
+        data: 原图字节
+        max_side: 最长边上限(像素)
+        quality: JPEG 编码质量
+    Returns:
+        (bytes, dict): 发往OCR服务的图片字节，以及处理前后的尺寸和字节数
+    """
+    with Image.open(BytesIO(data)) as img:
+        info = {
+            'original_size': img.size,
+            'original_bytes': len(data),
+            'size': img.size,
+            'bytes': len(data),
+            'reencoded': False,
+        }
+        orientation = img.getexif().get(EXIF_ORIENTATION, 1)
+        needs_resize = max(img.size) > max_side
+        if img.format == 'JPEG' and not needs_resize and orientation == 1:
+            return data, info
+
+        if needs_resize:
+            # 只对 JPEG 生效，其他格式忽略
+            img.draft('RGB', draft_size(img.size, max_side))
+        img = ImageOps.exif_transpose(img).convert('RGB')
+    img.thumbnail((max_side, max_side), Image.LANCZOS)
+
+    buffer = BytesIO()
+    img.save(buffer, 'JPEG', quality=quality)
+    encoded = buffer.getvalue()
+    if not needs_resize and orientation == 1 and len(encoded) >= len(data):
+        # 只是格式转换且没有变小，发送原图
+        return data, info
+
+    info.update({'size': img.size, 'bytes': len(encoded), 'reencoded': True})
+    return encoded, info
@@ -50,7 +50,7 @@ CREATE TABLE `passport_records`  (
   PRIMARY KEY (`id`) USING BTREE,
   INDEX `idx_task_id`(`task_id` ASC) USING BTREE,
   INDEX `idx_image_id`(`image_id` ASC) USING BTREE,
-  INDEX `idx_created_at`(`created_at` ASC) USING BTREE
+  INDEX `idx_created_at_doc_type`(`created_at` ASC, `doc_type_cn` ASC) USING BTREE
 ) ENGINE = InnoDB AUTO_INCREMENT = 610 CHARACTER SET = utf8mb4 COLLATE = utf8mb4_0900_ai_ci COMMENT = '护照识别记录表' ROW_FORMAT = Dynamic;
 
 -- ----------------------------
@@ -310,4 +310,57 @@ INSERT INTO `passport_records` VALUES (607, 'e261bee00cbd4ba5b068915428ee112b',
 INSERT INTO `passport_records` VALUES (608, '3365dda5f62144aeb56b2b0c1941dbab', 'completed', 'PASSPORT', '', 'photo_20250811_101041_899131.jpg', '', '普通护照', 'CH1H3VHP9', '', NULL, 'KOHL', 'KATHRIN SILKE', NULL, '1975-08-23', '2030-07-09', '女', '2025-08-11 10:10:42', '2025-08-11 10:11:20', NULL, NULL, '识别成功', '护照', '刚果民主共和国', NULL);
 INSERT INTO `passport_records` VALUES (609, '51cc4c3483a84a46b8824a26fa7be016', 'completed', 'PASSPORT', '', 'photo_20250811_101048_782709.jpg', '', '普通护照', 'PE0193604', 'V987654321', '2024-08-15 00:00:00', 'TSOGBADRAKH', 'ENKHMANDAKH', NULL, '1909-01-22', '2028-08-29', '男', '2025-08-11 10:10:49', '2025-08-11 10:12:28', NULL, NULL, '识别成功', '护照', '蒙古', NULL);
 
+-- ----------------------------
+-- 图片内容哈希去重（与 migrations/001_add_content_hash.sql 相同，在导入数据之后添加，不改动上面的数据行）
+-- ----------------------------
+ALTER TABLE `passport_records`
+  ADD COLUMN `content_hash` char(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NULL DEFAULT NULL COMMENT '图片内容SHA-256',
+  ADD COLUMN `ocr_cache_hit` tinyint(1) NOT NULL DEFAULT 0 COMMENT '是否复用重复图片的识别结果',
+  ADD INDEX `idx_content_hash`(`content_hash` ASC) USING BTREE;
+
+-- ----------------------------
+-- 多尺寸缩略图尺寸列（与 migrations/004_thumbnail_sizes.sql 相同，在导入数据之后添加，已有记录保持 NULL）
+-- ----------------------------
+ALTER TABLE `passport_records`
+  ADD COLUMN `thumbnail_sizes` varchar(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NULL DEFAULT NULL COMMENT '已生成的缩略图尺寸（逗号分隔，NULL表示尚未生成）';
+
+-- ----------------------------
+-- Table structure for passport_daily_stats
+-- ----------------------------
+DROP TABLE IF EXISTS `passport_daily_stats`;
+CREATE TABLE `passport_daily_stats`  (
+  `stat_date` date NOT NULL COMMENT '日期（按 created_at）',
+  `doc_type_cn` varchar(50) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NOT NULL DEFAULT '' COMMENT '证件类型中文（未识别为空字符串）',
+  `status` varchar(20) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NOT NULL DEFAULT '' COMMENT '记录状态',
+  `record_count` int NOT NULL DEFAULT 0 COMMENT '记录数',
+  PRIMARY KEY (`stat_date`, `doc_type_cn`, `status`) USING BTREE
+) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_0900_ai_ci COMMENT = '每日统计汇总表（随记录写入增量维护）' ROW_FORMAT = Dynamic;
+
+-- ----------------------------
+-- Records of passport_daily_stats（由 passport_records 汇总生成）
+-- ----------------------------
+INSERT INTO `passport_daily_stats` (`stat_date`, `doc_type_cn`, `status`, `record_count`)
+SELECT DATE(`created_at`), COALESCE(`doc_type_cn`, ''), COALESCE(`status`, ''), COUNT(*)
+FROM `passport_records`
+GROUP BY DATE(`created_at`), COALESCE(`doc_type_cn`, ''), COALESCE(`status`, '');
+
+-- ----------------------------
+-- Table structure for passport_stats_totals
+-- ----------------------------
+DROP TABLE IF EXISTS `passport_stats_totals`;
+CREATE TABLE `passport_stats_totals`  (
+  `doc_type_cn` varchar(50) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NOT NULL DEFAULT '' COMMENT '证件类型中文（未识别为空字符串）',
+  `status` varchar(20) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NOT NULL DEFAULT '' COMMENT '记录状态',
+  `record_count` int NOT NULL DEFAULT 0 COMMENT '记录数',
+  PRIMARY KEY (`doc_type_cn`, `status`) USING BTREE
+) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_0900_ai_ci COMMENT = '全部日期的记录总数（随每日统计汇总表增量维护）' ROW_FORMAT = Dynamic;
+
+-- ----------------------------
+-- Records of passport_stats_totals（由 passport_daily_stats 汇总生成）
+-- ----------------------------
+INSERT INTO `passport_stats_totals` (`doc_type_cn`, `status`, `record_count`)
+SELECT `doc_type_cn`, `status`, SUM(`record_count`)
+FROM `passport_daily_stats`
+GROUP BY `doc_type_cn`, `status`;
+
 SET FOREIGN_KEY_CHECKS = 1;
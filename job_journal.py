@@ -0,0 +1,119 @@
+"""
+OCR任务持久化日志
+基于本地 SQLite (WAL 模式) 记录已入队但尚未完成的OCR任务：
+- 入队时写入日志，识别结果（或失败状态）写入 MySQL 并提交后才确认(ack)删除
+- 服务崩溃或重新部署后，启动时重放未确认的任务，保证任务至少被处理一次
+- 每次重放累加尝试次数，超过上限的任务（可能每次都导致服务崩溃）不再重放，由调用方标记为失败
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+logger = logging.getLogger('ocr_server.job_journal')
+
+
+class JobJournal:
+    """OCR任务日志（线程安全，事件循环和写入线程均可调用）"""
+
+    def __init__(self, db_path: str, max_attempts: int = 3):
+        """
+        Args:
+            db_path: SQLite 数据库文件路径 (如: data/ocr_jobs.sqlite3)
+            max_attempts: 任务最多重放的次数
+        """
+        self.db_path = db_path
+        self.max_attempts = max(1, max_attempts)
+        self._conn = None
+        self._lock = threading.Lock()
+        self.enqueued_total = 0
+        self.acked_total = 0
+
+    def open(self):
+        """打开日志数据库，不存在时自动创建"""
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            if self._conn is not None:
+                return
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            # WAL + FULL：每次提交都把日志刷到磁盘，进程崩溃、断电或系统崩溃后已提交的任务都不会丢失
+            #（NORMAL 只保证进程崩溃时不丢失，断电时最近的提交可能回滚）
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS ocr_jobs (
+                    record_id INTEGER PRIMARY KEY,
+                    image_path TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    enqueued_at REAL NOT NULL
+                )
+            """)
+            self._conn = conn
+        logger.info(f"OCR任务日志已打开: {self.db_path}")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def enqueue(self, record_id: int, image_path: str):
+        """记录一个待处理任务；重复入队（重放）时累加尝试次数（同步写入磁盘，应在线程池中调用）"""
+        with self._lock:
+            self._conn.execute("""
+                INSERT INTO ocr_jobs (record_id, image_path, attempts, enqueued_at)
+                VALUES (?, ?, 0, ?)
+                ON CONFLICT(record_id) DO UPDATE SET attempts = attempts + 1
+            """, (record_id, image_path, time.time()))
+            self.enqueued_total += 1
+
+    def ack(self, record_id: int):
+        """确认任务已完成（结果已提交到 MySQL）"""
+        with self._lock:
+            if self._conn is None:
+                # 服务关闭后写入线程仍可能提交结果，此时任务留在日志中，下次启动重放时会被跳过
+                logger.warning(f"OCR任务日志已关闭，无法确认任务 (record_id: {record_id})")
+                return
+            self._conn.execute("DELETE FROM ocr_jobs WHERE record_id = ?", (record_id,))
+            self.acked_total += 1
+
+    def pending(self, enqueued_before: Optional[float] = None) -> List[dict]:
+        """返回未确认的任务（按入队顺序）
+        Args:
+            enqueued_before: 只返回该时间戳之前入队的任务，默认全部
+        """
+        if enqueued_before is None:
+            enqueued_before = time.time()
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT record_id, image_path, attempts
+                FROM ocr_jobs
+                WHERE enqueued_at < ?
+                ORDER BY enqueued_at, record_id
+            """, (enqueued_before,)).fetchall()
+        return [
+            {'record_id': row[0], 'image_path': row[1], 'attempts': row[2]}
+            for row in rows
+        ]
+
+    def exhausted(self, job: dict) -> bool:
+        """任务的重放次数是否已达到上限"""
+        return job['attempts'] >= self.max_attempts
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM ocr_jobs").fetchone()[0]
+
+    def stats(self) -> dict:
+        return {
+            'path': self.db_path,
+            'unacked': self.size() if self._conn is not None else None,
+            'enqueued_total': self.enqueued_total,
+            'acked_total': self.acked_total,
+            'max_attempts': self.max_attempts,
+        }
@@ -7,8 +7,11 @@
 import os
 import gc
 
-def setup_memory_optimization():
-    """设置内存优化配置"""
+def setup_memory_optimization(num_threads=2):
+    """设置内存优化配置
+    Args:
+        num_threads: OpenMP/MKL 线程数，多进程推理池中按每个工作进程分配到的核心数设置
+    """
     
     # 设置PaddlePaddle环境变量
     os.environ['FLAGS_use_gpu'] = '0'  # 强制使用CPU
@@ -20,8 +23,7 @@ def setup_memory_optimization():
     os.environ['FLAGS_memory_fraction_of_eager_deletion'] = '1.0'  # 内存删除比例
     
     # 设置线程数限制
-    os.environ['OMP_NUM_THREADS'] = '2'  # OpenMP线程数
-    os.environ['MKL_NUM_THREADS'] = '2'  # MKL线程数
+    set_thread_count(num_threads)
     
     # 设置内存限制
     os.environ['PADDLE_DISABLE_GPU_MEMORY_POOL'] = 'True'  # 禁用GPU内存池
@@ -29,6 +31,12 @@ def setup_memory_optimization():
     
     print("✅ 内存优化配置已设置")
 
+def set_thread_count(num_threads):
+    """设置 OpenMP/MKL 线程数（必须在导入 Paddle 之前调用）"""
+    num_threads = str(max(1, int(num_threads)))
+    os.environ['OMP_NUM_THREADS'] = num_threads  # OpenMP线程数
+    os.environ['MKL_NUM_THREADS'] = num_threads  # MKL线程数
+
 def cleanup_memory():
     """清理内存"""
     gc.collect()
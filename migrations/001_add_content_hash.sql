@@ -0,0 +1,8 @@
+-- ----------------------------
+-- 图片内容哈希去重：重复上传的图片直接复用已完成的识别结果
+-- 适用于在此之前用 init_db.sql 创建的数据库
+-- ----------------------------
+ALTER TABLE `passport_records`
+  ADD COLUMN `content_hash` char(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NULL DEFAULT NULL COMMENT '图片内容SHA-256',
+  ADD COLUMN `ocr_cache_hit` tinyint(1) NOT NULL DEFAULT 0 COMMENT '是否复用重复图片的识别结果',
+  ADD INDEX `idx_content_hash`(`content_hash` ASC) USING BTREE;
@@ -0,0 +1,7 @@
+-- ----------------------------
+-- 今日统计 / 列表按 created_at 的时间范围过滤并按 doc_type_cn 分组，
+-- 用 (created_at, doc_type_cn) 复合索引替代单列的 idx_created_at，统计查询可以只扫描索引
+-- ----------------------------
+ALTER TABLE `passport_records`
+  ADD INDEX `idx_created_at_doc_type`(`created_at` ASC, `doc_type_cn` ASC) USING BTREE,
+  DROP INDEX `idx_created_at`;
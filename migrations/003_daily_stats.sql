@@ -0,0 +1,17 @@
+-- ----------------------------
+-- 每日统计汇总表：按 (日期, 证件类型, 状态) 维护记录数，统计接口不再扫描 passport_records
+-- 创建后用现有数据回填；之后由服务在写入记录时增量维护，出现偏差时运行 python daily_stats.py 重建
+-- ----------------------------
+CREATE TABLE IF NOT EXISTS `passport_daily_stats`  (
+  `stat_date` date NOT NULL COMMENT '日期（按 created_at）',
+  `doc_type_cn` varchar(50) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NOT NULL DEFAULT '' COMMENT '证件类型中文（未识别为空字符串）',
+  `status` varchar(20) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NOT NULL DEFAULT '' COMMENT '记录状态',
+  `record_count` int NOT NULL DEFAULT 0 COMMENT '记录数',
+  PRIMARY KEY (`stat_date`, `doc_type_cn`, `status`) USING BTREE
+) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_0900_ai_ci COMMENT = '每日统计汇总表（随记录写入增量维护）' ROW_FORMAT = Dynamic;
+
+DELETE FROM `passport_daily_stats`;
+INSERT INTO `passport_daily_stats` (`stat_date`, `doc_type_cn`, `status`, `record_count`)
+SELECT DATE(`created_at`), COALESCE(`doc_type_cn`, ''), COALESCE(`status`, ''), COUNT(*)
+FROM `passport_records`
+GROUP BY DATE(`created_at`), COALESCE(`doc_type_cn`, ''), COALESCE(`status`, '');
@@ -0,0 +1,6 @@
+-- ----------------------------
+-- 多尺寸缩略图：上传后在后台生成，已生成的尺寸记录在数据库中，列表接口不再检查或临时生成缩略图文件
+-- 已有记录保持 NULL，服务启动时在后台补生成
+-- ----------------------------
+ALTER TABLE `passport_records`
+  ADD COLUMN `thumbnail_sizes` varchar(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NULL DEFAULT NULL COMMENT '已生成的缩略图尺寸（逗号分隔，NULL表示尚未生成）';
@@ -0,0 +1,16 @@
+-- ----------------------------
+-- 按 (证件类型, 状态) 维护全部日期的记录总数，统计接口读取总数时不再扫描整个每日统计汇总表
+-- 在 003_daily_stats.sql 之后执行；创建后用每日统计汇总表回填，之后由服务在写入记录时增量维护
+-- ----------------------------
+CREATE TABLE IF NOT EXISTS `passport_stats_totals`  (
+  `doc_type_cn` varchar(50) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NOT NULL DEFAULT '' COMMENT '证件类型中文（未识别为空字符串）',
+  `status` varchar(20) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NOT NULL DEFAULT '' COMMENT '记录状态',
+  `record_count` int NOT NULL DEFAULT 0 COMMENT '记录数',
+  PRIMARY KEY (`doc_type_cn`, `status`) USING BTREE
+) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_0900_ai_ci COMMENT = '全部日期的记录总数（随每日统计汇总表增量维护）' ROW_FORMAT = Dynamic;
+
+DELETE FROM `passport_stats_totals`;
+INSERT INTO `passport_stats_totals` (`doc_type_cn`, `status`, `record_count`)
+SELECT `doc_type_cn`, `status`, SUM(`record_count`)
+FROM `passport_daily_stats`
+GROUP BY `doc_type_cn`, `status`;
@@ -0,0 +1,105 @@
+"""
+护照MRZ区域定位
+用 OpenCV 形态学运算在页面下部查找机读区（两行 OCR-B 字符组成的宽而扁的文本带），
+裁剪后只把这一小块图片发给OCR服务，避免对整页做文本检测和识别
+- 黑帽运算突出浅色背景上的深色字符
+- Scharr 水平梯度 + 闭运算把字符连成行，再把两行连成一个区域
+- 按宽高比和宽度占比筛选候选区域
+找不到符合条件的区域时返回 None，由调用方走整页识别
+"""
+
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+ANALYSIS_WIDTH = 600  # 定位时先缩放到该宽度，形态学核大小按此宽度设定
+MIN_ASPECT_RATIO = 5.0  # MRZ区域宽高比下限
+MIN_WIDTH_RATIO = 0.45  # MRZ区域宽度占图片宽度的下限（照片四周可能有背景）
+PAD_X_RATIO = 0.03  # 裁剪时左右外扩（占区域宽度）
+PAD_Y_RATIO = 0.25  # 裁剪时上下外扩（占区域高度）
+
+
+def find_mrz_box(gray: np.ndarray, search_fraction: float = 1 / 3) -> Optional[Tuple[int, int, int, int]]:
+    """在灰度图的下部查找MRZ区域
+    Args:
+        gray: 灰度图
+        search_fraction: 搜索范围（页面底部所占比例）
+    Returns:
+        (x, y, w, h): MRZ区域在 gray 中的坐标，找不到时返回 None
+    """
+    height, width = gray.shape[:2]
+    scale = ANALYSIS_WIDTH / width
+    small = cv2.resize(gray, (ANALYSIS_WIDTH, max(1, round(height * scale))), interpolation=cv2.INTER_AREA)
+    top = int(small.shape[0] * (1 - search_fraction))
+    roi = small[top:]
+
+    rect_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (13, 5))
+    square_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (21, 21))
+
+    roi = cv2.GaussianBlur(roi, (3, 3), 0)
+    blackhat = cv2.morphologyEx(roi, cv2.MORPH_BLACKHAT, rect_kernel)
+
+    # Scharr 水平梯度：字符的竖直笔画密集，MRZ行的梯度响应连续且均匀
+    grad = np.absolute(cv2.Sobel(blackhat, cv2.CV_32F, 1, 0, ksize=cv2.FILTER_SCHARR))
+    min_val, max_val = float(grad.min()), float(grad.max())
+    if max_val - min_val < 1e-6:
+        return None
+    grad = (255 * (grad - min_val) / (max_val - min_val)).astype('uint8')
+
+    # 字符连成行 -> 二值化 -> 两行连成一个区域 -> 去掉细小的连接
+    grad = cv2.morphologyEx(grad, cv2.MORPH_CLOSE, rect_kernel)
+    thresh = cv2.threshold(grad, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)[1]
+    thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, square_kernel)
+    thresh = cv2.erode(thresh, None, iterations=4)
+    # 去掉贴着左右边缘的响应（页面边框、阴影）
+    border = int(ANALYSIS_WIDTH * 0.02)
+    thresh[:, :border] = 0
+    thresh[:, ANALYSIS_WIDTH - border:] = 0
+
+    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    best = None
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if h == 0 or w / h < MIN_ASPECT_RATIO or w < ANALYSIS_WIDTH * MIN_WIDTH_RATIO:
+            continue
+        # 多个候选时取最靠下的（MRZ位于资料页底部）
+        if best is None or y > best[1]:
+            best = (x, y, w, h)
+    if best is None:
+        return None
+
+    # 外扩后映射回原图坐标
+    x, y, w, h = best
+    pad_x, pad_y = int(w * PAD_X_RATIO), int(h * PAD_Y_RATIO)
+    x0 = max(0, x - pad_x)
+    y0 = max(0, top + y - pad_y)
+    x1 = min(ANALYSIS_WIDTH, x + w + pad_x)
+    y1 = min(small.shape[0], top + y + h + pad_y)
+    return (
+        int(x0 / scale), int(y0 / scale),
+        int((x1 - x0) / scale), int((y1 - y0) / scale),
+    )
+
+
+def crop_mrz(data: bytes, search_fraction: float = 1 / 3, quality: int = 90) -> Optional[Tuple[bytes, dict]]:
+    """定位并裁剪MRZ区域（CPU密集，在进程池中执行）
+    Args:
+        data: 图片字节（已按 EXIF 方向旋转）
+        search_fraction: 搜索范围（页面底部所占比例）
+        quality: 裁剪图的 JPEG 编码质量
+    Returns:
+        (bytes, dict): 裁剪后的 JPEG 字节和区域信息，找不到时返回 None
+    """
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return None
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    box = find_mrz_box(gray, search_fraction)
+    if box is None:
+        return None
+    x, y, w, h = box
+    ok, encoded = cv2.imencode('.jpg', image[y:y + h, x:x + w], [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        return None
+    return encoded.tobytes(), {'box': box, 'page_size': (image.shape[1], image.shape[0])}
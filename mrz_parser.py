@@ -0,0 +1,449 @@
+"""
+机读区(MRZ)解析（ICAO Doc 9303）
+支持 TD1（身份证类，3行x30）、TD2（2行x36）、TD3（护照，2行x44）以及签证 MRV-A（2行x44）、MRV-B（2行x36）
+- 各格式的字段位置、字符类型和校验位位置由 FORMATS 表描述，解析时只做切片和查表
+- 校验位按 7-3-1 加权（'<' 为 0，A-Z 为 10-35）逐字段验证，TD1/TD2/TD3 还验证综合校验位
+- OCR 易混字符（O/0、I/1、S/5、B/8、Z/2、G/6）：日期和校验位按数字纠正，国家代码和姓名按字母纠正，
+  证件号码等字母数字混合字段在校验位不符时逐一尝试替换易混字符，直到校验位通过
+- 出生年份按当前年份推断世纪（不晚于今年），有效期年份默认 20xx
+- 没有任何连续行符合格式时，按护照 TD3 版面从前两行含 '<<' 的文本中尽量切出字段，结果标记为未通过校验
+解析只依赖标准库，不导入其他项目模块
+
+用法:
+    python mrz_parser.py 'P<UTOERIKSSON<<ANNA<MARIA<<<<<<<<<<<<<<<<<<<' 'L898902C36UTO7408122F1204159ZE184226B<<<<<10'
+"""
+
+import argparse
+import itertools
+import logging
+import time
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger('ocr_server.mrz_parser')
+
+FILLER = '<'
+CHECK_WEIGHTS = (7, 3, 1)
+CHAR_VALUES = {ch: value for value, ch in enumerate('0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ')}
+CHAR_VALUES[FILLER] = 0
+
+# OCR 常见的易混字符
+TO_DIGIT = str.maketrans('OQDILZSBG', '000112586')
+TO_ALPHA = str.maketrans('012568', 'OIZSBG')
+CONFUSABLE = {
+    'O': '0', '0': 'O', 'Q': '0', 'D': '0',
+    'I': '1', '1': 'I', 'L': '1',
+    'S': '5', '5': 'S',
+    'B': '8', '8': 'B',
+    'Z': '2', '2': 'Z',
+    'G': '6', '6': 'G',
+}
+MAX_CORRECTIONS = 1  # 字母数字混合字段最多同时替换的字符数（校验位只有一位，替换越多误纠正越多）
+
+# OCR 常把这些字符识别成填充符 '<'
+FILLER_LOOKALIKES = str.maketrans({'«': '<<', '‹': '<', '〈': '<', '＜': '<', 'く': '<'})
+
+EXPIRY_WINDOW = 50  # 有效期年份超过今年 + EXPIRY_WINDOW 时视为 19xx
+
+# 字段类型
+ALPHA = 'alpha'  # 字母和 '<'：证件类型、国家代码、姓名
+NUMERIC = 'numeric'  # 数字：日期
+ALNUM = 'alnum'  # 字母数字混合：证件号码、可选数据
+SEX = 'sex'  # M/F/X/<
+
+
+class MRZFormat:
+    """一种 MRZ 格式的版面定义"""
+
+    def __init__(self, name: str, lines: int, length: int, fields: Sequence[tuple],
+                 composite: Optional[tuple] = None, document_codes: str = ''):
+        """
+        Args:
+            name: 格式名称
+            lines: 行数
+            length: 每行字符数
+            fields: (字段名, 行, 起始, 结束, 字段类型, 校验位位置(行, 列) 或 None)
+            composite: 综合校验 ((行, 起始, 结束), ...), (行, 列)
+            document_codes: 证件类型代码首字母（为空表示不限）
+        """
+        self.name = name
+        self.lines = lines
+        self.length = length
+        self.fields = fields
+        self.composite = composite
+        self.document_codes = document_codes
+
+
+TD3 = MRZFormat('TD3', 2, 44, (
+    ('document_code', 0, 0, 2, ALPHA, None),
+    ('issuing_state', 0, 2, 5, ALPHA, None),
+    ('names', 0, 5, 44, ALPHA, None),
+    ('document_number', 1, 0, 9, ALNUM, (1, 9)),
+    ('nationality', 1, 10, 13, ALPHA, None),
+    ('birth_date', 1, 13, 19, NUMERIC, (1, 19)),
+    ('sex', 1, 20, 21, SEX, None),
+    ('expiry_date', 1, 21, 27, NUMERIC, (1, 27)),
+    ('optional_data', 1, 28, 42, ALNUM, (1, 42)),
+), composite=(((1, 0, 10), (1, 13, 20), (1, 21, 43)), (1, 43)))
+
+MRV_A = MRZFormat('MRV-A', 2, 44, (
+    ('document_code', 0, 0, 2, ALPHA, None),
+    ('issuing_state', 0, 2, 5, ALPHA, None),
+    ('names', 0, 5, 44, ALPHA, None),
+    ('document_number', 1, 0, 9, ALNUM, (1, 9)),
+    ('nationality', 1, 10, 13, ALPHA, None),
+    ('birth_date', 1, 13, 19, NUMERIC, (1, 19)),
+    ('sex', 1, 20, 21, SEX, None),
+    ('expiry_date', 1, 21, 27, NUMERIC, (1, 27)),
+    ('optional_data', 1, 28, 44, ALNUM, None),
+), document_codes='V')
+
+TD2 = MRZFormat('TD2', 2, 36, (
+    ('document_code', 0, 0, 2, ALPHA, None),
+    ('issuing_state', 0, 2, 5, ALPHA, None),
+    ('names', 0, 5, 36, ALPHA, None),
+    ('document_number', 1, 0, 9, ALNUM, (1, 9)),
+    ('nationality', 1, 10, 13, ALPHA, None),
+    ('birth_date', 1, 13, 19, NUMERIC, (1, 19)),
+    ('sex', 1, 20, 21, SEX, None),
+    ('expiry_date', 1, 21, 27, NUMERIC, (1, 27)),
+    ('optional_data', 1, 28, 35, ALNUM, None),
+), composite=(((1, 0, 10), (1, 13, 20), (1, 21, 35)), (1, 35)))
+
+MRV_B = MRZFormat('MRV-B', 2, 36, (
+    ('document_code', 0, 0, 2, ALPHA, None),
+    ('issuing_state', 0, 2, 5, ALPHA, None),
+    ('names', 0, 5, 36, ALPHA, None),
+    ('document_number', 1, 0, 9, ALNUM, (1, 9)),
+    ('nationality', 1, 10, 13, ALPHA, None),
+    ('birth_date', 1, 13, 19, NUMERIC, (1, 19)),
+    ('sex', 1, 20, 21, SEX, None),
+    ('expiry_date', 1, 21, 27, NUMERIC, (1, 27)),
+    ('optional_data', 1, 28, 36, ALNUM, None),
+), document_codes='V')
+
+TD1 = MRZFormat('TD1', 3, 30, (
+    ('document_code', 0, 0, 2, ALPHA, None),
+    ('issuing_state', 0, 2, 5, ALPHA, None),
+    ('document_number', 0, 5, 14, ALNUM, (0, 14)),
+    ('optional_data', 0, 15, 30, ALNUM, None),
+    ('birth_date', 1, 0, 6, NUMERIC, (1, 6)),
+    ('sex', 1, 7, 8, SEX, None),
+    ('expiry_date', 1, 8, 14, NUMERIC, (1, 14)),
+    ('nationality', 1, 15, 18, ALPHA, None),
+    ('optional_data2', 1, 18, 29, ALNUM, None),
+    ('names', 2, 0, 30, ALPHA, None),
+), composite=(((0, 5, 30), (1, 0, 7), (1, 8, 15), (1, 18, 29)), (1, 29)))
+
+# 按 (行数, 每行字符数) 查找格式；同一版面的签证格式按证件类型代码区分
+FORMATS: Dict[Tuple[int, int], Tuple[MRZFormat, ...]] = {
+    (2, 44): (MRV_A, TD3),
+    (2, 36): (MRV_B, TD2),
+    (3, 30): (TD1,),
+}
+LINE_LENGTHS = sorted({length for _, length in FORMATS})
+LENGTH_TOLERANCE = 3  # OCR 多识别或漏识别的填充符个数上限
+
+
+def check_digit(value: str) -> str:
+    """按 7-3-1 加权计算校验位（非法字符按 0 计算）"""
+    total = 0
+    for index, ch in enumerate(value):
+        total += CHAR_VALUES.get(ch, 0) * CHECK_WEIGHTS[index % 3]
+    return str(total % 10)
+
+
+def _check_passes(value: str, check: str) -> bool:
+    # 空的可选数据字段允许用 '<' 作为校验位
+    if check == FILLER:
+        return value.strip(FILLER) == ''
+    return check_digit(value) == check
+
+
+def correct_with_check_digit(value: str, check: str) -> Optional[str]:
+    """替换字段中的 OCR 易混字符，返回唯一通过校验的结果（替换最少的优先）
+    同样替换个数下有多个结果都能通过校验时无法确定哪个正确，返回 None
+    """
+    # 字母都可能是识别错的数字；数字只在字母前缀中（证件号码开头的字母之后）才考虑识别错的字母
+    positions = [
+        index for index, ch in enumerate(value)
+        if ch in CONFUSABLE and (ch.isalpha() or index == 0 or value[index - 1].isalpha())
+    ]
+    for count in range(1, min(MAX_CORRECTIONS, len(positions)) + 1):
+        matches = []
+        for combination in itertools.combinations(positions, count):
+            chars = list(value)
+            for index in combination:
+                chars[index] = CONFUSABLE[chars[index]]
+            candidate = ''.join(chars)
+            if check_digit(candidate) == check:
+                matches.append(candidate)
+        if len(matches) == 1:
+            return matches[0]
+        if matches:
+            return None
+    return None
+
+
+def infer_date(yymmdd: str, is_expiry: bool, today: date) -> Optional[date]:
+    """YYMMDD 转为日期：出生日期不晚于今天，有效期默认 20xx（超出 EXPIRY_WINDOW 年视为 19xx）"""
+    if len(yymmdd) != 6 or not yymmdd.isdigit():
+        return None
+    yy, month, day = int(yymmdd[0:2]), int(yymmdd[2:4]), int(yymmdd[4:6])
+    year = 2000 + yy
+    if is_expiry:
+        if year > today.year + EXPIRY_WINDOW:
+            year -= 100
+    elif year > today.year:
+        year -= 100
+    try:
+        result = date(year, month, day)
+    except ValueError:
+        return None
+    if not is_expiry and result > today:
+        # 今年出生但月日晚于今天
+        result = result.replace(year=year - 100)
+    return result
+
+
+def clean_line(text: str) -> str:
+    """统一为 MRZ 字符集：大写、去空格、把 OCR 识别出的相似符号替换为 '<'，丢弃其他字符"""
+    text = text.upper().translate(FILLER_LOOKALIKES)
+    return ''.join(ch for ch in text if ch in CHAR_VALUES)
+
+
+def fit_line(line: str, length: int) -> Optional[str]:
+    """把行长度调整为 length：末尾补齐或去掉多出的填充符；相差太多或多出的不是填充符时返回 None"""
+    if len(line) == length:
+        return line
+    if abs(len(line) - length) > LENGTH_TOLERANCE:
+        return None
+    if len(line) < length:
+        return line + FILLER * (length - len(line))
+    if line[length:].strip(FILLER):
+        return None
+    return line[:length]
+
+
+class MRZResult:
+    """MRZ解析结果"""
+
+    def __init__(self, mrz_format: MRZFormat, lines: List[str]):
+        self.format = mrz_format.name
+        self.lines = lines
+        self.fields: Dict[str, str] = {}
+        self.checks: Dict[str, bool] = {}
+        self.corrections: List[Tuple[str, str, str]] = []  # (字段名, 识别值, 纠正值)
+        self.birth_date: Optional[date] = None
+        self.expiry_date: Optional[date] = None
+        self.best_effort = False  # 行长度不符合格式，按 TD3 版面补齐或截断后切出的字段
+
+    @property
+    def valid(self) -> bool:
+        """所有校验位都通过且日期有效（尽量切出的结果始终为 False）"""
+        if self.best_effort:
+            return False
+        return all(self.checks.values()) and self.birth_date is not None and self.expiry_date is not None
+
+    @property
+    def is_visa(self) -> bool:
+        return self.format.startswith('MRV')
+
+    @property
+    def document_code(self) -> str:
+        return self.fields.get('document_code', '').replace(FILLER, '')
+
+    @property
+    def issuing_state(self) -> str:
+        return self.fields.get('issuing_state', '').replace(FILLER, '')
+
+    @property
+    def nationality(self) -> str:
+        return self.fields.get('nationality', '').replace(FILLER, '')
+
+    @property
+    def document_number(self) -> str:
+        return self.fields.get('document_number', '').replace(FILLER, '')
+
+    @property
+    def sex(self) -> str:
+        return self.fields.get('sex', '').replace(FILLER, '')
+
+    @property
+    def surname(self) -> str:
+        return self.fields.get('names', '').split(FILLER * 2, 1)[0].replace(FILLER, ' ').strip()
+
+    @property
+    def given_names(self) -> str:
+        parts = self.fields.get('names', '').split(FILLER * 2, 1)
+        return parts[1].replace(FILLER, ' ').strip() if len(parts) == 2 else ''
+
+    def to_dict(self) -> dict:
+        return {
+            'format': self.format,
+            'valid': self.valid,
+            'best_effort': self.best_effort,
+            'document_code': self.document_code,
+            'issuing_state': self.issuing_state,
+            'surname': self.surname,
+            'given_names': self.given_names,
+            'document_number': self.document_number,
+            'nationality': self.nationality,
+            'birth_date': self.birth_date.isoformat() if self.birth_date else None,
+            'sex': self.sex,
+            'expiry_date': self.expiry_date.isoformat() if self.expiry_date else None,
+            'checks': dict(self.checks),
+            'corrections': list(self.corrections),
+        }
+
+
+def _select_format(lines: Sequence[str]) -> Optional[MRZFormat]:
+    candidates = FORMATS.get((len(lines), len(lines[0])))
+    if not candidates:
+        return None
+    first = lines[0][:1].translate(TO_ALPHA)
+    for mrz_format in candidates:
+        if not mrz_format.document_codes or first in mrz_format.document_codes:
+            return mrz_format
+    return None
+
+
+def parse_mrz(lines: Sequence[str], today: Optional[date] = None,
+              mrz_format: Optional[MRZFormat] = None) -> Optional[MRZResult]:
+    """解析已分好行的 MRZ（每行长度必须符合某种格式）
+    Args:
+        lines: MRZ各行（已经过 clean_line）
+        today: 推断世纪使用的当前日期，默认今天
+        mrz_format: 指定格式，默认按行数、行长度和证件类型代码选择
+    Returns:
+        MRZResult: 解析结果（校验不通过时 valid 为 False）；不符合任何格式时返回 None
+    """
+    if not lines or any(len(line) != len(lines[0]) for line in lines):
+        return None
+    mrz_format = mrz_format or _select_format(lines)
+    if mrz_format is not None and (len(lines), len(lines[0])) != (mrz_format.lines, mrz_format.length):
+        return None
+    if mrz_format is None:
+        return None
+    today = today or date.today()
+    result = MRZResult(mrz_format, list(lines))
+    rows = [list(line) for line in lines]
+
+    for name, row, start, end, kind, check_pos in mrz_format.fields:
+        raw = lines[row][start:end]
+        if kind == NUMERIC:
+            value = raw.translate(TO_DIGIT)
+        elif kind == ALPHA:
+            value = raw.translate(TO_ALPHA)
+        else:
+            value = raw
+
+        if check_pos is not None:
+            check_row, check_col = check_pos
+            check = lines[check_row][check_col].translate(TO_DIGIT)
+            passed = _check_passes(value, check)
+            if not passed and kind == ALNUM:
+                corrected = correct_with_check_digit(value, check)
+                if corrected is not None:
+                    value, passed = corrected, True
+            result.checks[name] = passed
+            rows[check_row][check_col] = check
+
+        if value != raw:
+            result.corrections.append((name, raw, value))
+        rows[row][start:end] = value
+        result.fields[name] = value
+
+    if mrz_format.composite:
+        segments, (check_row, check_col) = mrz_format.composite
+        corrected_lines = [''.join(row) for row in rows]
+        composite_value = ''.join(corrected_lines[r][s:e] for r, s, e in segments)
+        check = corrected_lines[check_row][check_col].translate(TO_DIGIT)
+        result.checks['composite'] = _check_passes(composite_value, check)
+
+    result.birth_date = infer_date(result.fields['birth_date'], False, today)
+    result.expiry_date = infer_date(result.fields['expiry_date'], True, today)
+    return result
+
+
+def _candidate_lines(texts: Iterable[str]) -> List[str]:
+    """从OCR文本中挑出可能是MRZ行的文本（OCR把两行识别成一段时按长度拆开）"""
+    candidates = []
+    for text in texts:
+        line = clean_line(text)
+        if FILLER not in line or len(line) < LINE_LENGTHS[0] - LENGTH_TOLERANCE:
+            continue
+        for length in LINE_LENGTHS:
+            parts = len(line) // length
+            if parts > 1 and len(line) % length <= LENGTH_TOLERANCE:
+                candidates.extend(line[i * length:(i + 1) * length] for i in range(parts))
+                break
+        else:
+            candidates.append(line)
+    return candidates
+
+
+def parse_best_effort(lines: Sequence[str], today: Optional[date] = None) -> Optional[MRZResult]:
+    """行长度不符合任何格式时，取前两行含 '<<' 的文本按 TD3 版面补齐或截断后切出字段
+    校验位照常计算，但结果的 valid 始终为 False，调用方应提示人工核对
+    """
+    lines = [line for line in lines if FILLER * 2 in line][:TD3.lines]
+    if not lines:
+        return None
+    # 只有一行时第二行全部为填充符（只能得到证件类型、国家和姓名）
+    lines += [''] * (TD3.lines - len(lines))
+    fitted = [(line + FILLER * TD3.length)[:TD3.length] for line in lines]
+    result = parse_mrz(fitted, today, mrz_format=TD3)
+    result.best_effort = True
+    return result
+
+
+def _score(result: MRZResult) -> Tuple[bool, int]:
+    return result.valid, sum(result.checks.values())
+
+
+def find_mrz(texts: Iterable[str], today: Optional[date] = None) -> Optional[MRZResult]:
+    """在一组OCR文本（按识别顺序）中查找并解析MRZ
+    连续的候选行按各格式的行数和行长度组合尝试解析，优先返回校验全部通过的结果，
+    其次返回通过校验位最多的结果；没有符合任何格式的行时按 TD3 版面尽量切出字段（valid 为 False），
+    没有含 '<<' 的文本时返回 None
+    """
+    lines = _candidate_lines(texts)
+    best = None
+    for (line_count, length), _ in FORMATS.items():
+        for start in range(len(lines) - line_count + 1):
+            fitted = [fit_line(line, length) for line in lines[start:start + line_count]]
+            if any(line is None for line in fitted):
+                continue
+            result = parse_mrz(fitted, today)
+            if result is not None and (best is None or _score(result) > _score(best)):
+                best = result
+    if best is None:
+        best = parse_best_effort(lines, today)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='解析MRZ并验证校验位')
+    parser.add_argument('lines', nargs='+', help='MRZ各行')
+    parser.add_argument('--repeat', type=int, default=10000, help='测速时的重复解析次数')
+    args = parser.parse_args()
+
+    result = find_mrz(args.lines)
+    if result is None:
+        print("❌ 未找到符合格式的MRZ")
+        return
+    print(f"{'✅' if result.valid else '⚠️ '} {result.format}{'（行长度不符，尽量切出）' if result.best_effort else ''} "
+          f"校验{'通过' if result.valid else '未通过'}")
+    for key, value in result.to_dict().items():
+        print(f"   {key}: {value}")
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        find_mrz(args.lines)
+    elapsed = time.perf_counter() - start
+    print(f"⏱️  每次解析 {elapsed / args.repeat * 1e6:.1f} 微秒")
+
+
+if __name__ == '__main__':
+    main()
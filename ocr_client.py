@@ -0,0 +1,343 @@
+"""
+OCR服务客户端
+由应用生命周期持有的长连接异步HTTP客户端：连接池复用(keep-alive)、
+可用时启用HTTP/2、按请求设置连接/读取超时，并统计连接池使用情况
+多个OCR后端时由 OCRBackendPool 按最少在途请求或EWMA延迟路由，
+连续失败的后端被熔断剔除，后台 /health 探测恢复后重新加入
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+import httpx
+
+logger = logging.getLogger('ocr_server.ocr_client')
+
+# 计入熔断的响应状态码：网关错误、服务不可用、网关超时
+BREAKER_STATUS_CODES = (502, 503, 504)
+
+# HTTP/2 依赖 h2 包（可选），未安装时使用 HTTP/1.1 keep-alive
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def default_health_url(service_url: str) -> str:
+    """由识别接口地址推出健康检查地址：只把路径末尾的 /ocr 换成 /health（不改动主机名等其他部分）"""
+    parts = urlsplit(service_url)
+    path = parts.path.rstrip('/')
+    if path.endswith('/ocr'):
+        path = path[:-len('/ocr')]
+    return urlunsplit((parts.scheme, parts.netloc, path + '/health', '', ''))
+
+
+class OCRServiceClient:
+    """OCR服务异步HTTP客户端"""
+
+    def __init__(self, service_url: str, connect_timeout: float = 5.0, read_timeout: float = 120.0,
+                 max_connections: int = 20, max_keepalive_connections: int = 10,
+                 health_url: Optional[str] = None):
+        """
+        Args:
+            service_url: OCR识别接口地址 (如: http://localhost:8080/ocr)
+            health_url: 健康检查地址，默认把识别接口路径末尾的 /ocr 换成 /health
+            connect_timeout: 建立连接超时(秒)
+            read_timeout: 等待响应超时(秒)
+            max_connections: 连接池最大连接数
+            max_keepalive_connections: 保持空闲的最大连接数
+        """
+        self.service_url = service_url
+        self.health_url = health_url or default_health_url(service_url)
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self.requests_total = 0
+        self.errors_total = 0
+        self.in_flight = 0
+        self.last_latency = 0.0
+        self.last_http_version = None
+
+    async def start(self):
+        """创建连接池（在应用启动时调用）"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                timeout=self.timeout,
+                limits=self.limits,
+                verify=False
+            )
+            logger.info(f"OCR客户端已创建: {self.service_url} (HTTP/2: {'启用' if HTTP2_AVAILABLE else '未安装h2，使用HTTP/1.1'})")
+
+    async def close(self):
+        """关闭连接池（在应用关闭时调用）"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("OCR客户端已关闭")
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError("OCR客户端尚未启动")
+        return self._client
+
+    async def post_image(self, file_bytes: bytes, filename: str = 'image.jpg') -> httpx.Response:
+        """以 multipart/form-data 格式发送图片到OCR服务"""
+        files = {'file': (filename, file_bytes, 'image/jpeg')}
+        self.requests_total += 1
+        self.in_flight += 1
+        start = time.time()
+        try:
+            response = await self.client.post(self.service_url, files=files)
+            self.last_http_version = response.http_version
+            return response
+        except Exception:
+            self.errors_total += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.last_latency = time.time() - start
+
+    async def get_health(self, timeout: float = 5.0) -> httpx.Response:
+        """请求OCR服务的健康检查端点"""
+        return await self.client.get(self.health_url, timeout=timeout)
+
+    def pool_stats(self) -> dict:
+        """连接池统计（基于 httpcore 连接池的内部状态，取不到时返回空）"""
+        stats = {}
+        try:
+            pool = self.client._transport._pool
+            connections = list(pool.connections)
+            stats['connections'] = len(connections)
+            stats['idle_connections'] = sum(1 for conn in connections if conn.is_idle())
+            stats['http2_connections'] = sum(
+                1 for conn in connections if 'HTTP/2' in repr(conn)
+            )
+        except Exception:
+            pass
+        return stats
+
+    def stats(self) -> dict:
+        return {
+            'service_url': self.service_url,
+            'started': self._client is not None,
+            'http2_available': HTTP2_AVAILABLE,
+            'last_http_version': self.last_http_version,
+            'requests_total': self.requests_total,
+            'errors_total': self.errors_total,
+            'in_flight': self.in_flight,
+            'last_latency': round(self.last_latency, 3),
+            'max_connections': self.limits.max_connections,
+            'max_keepalive_connections': self.limits.max_keepalive_connections,
+            'connect_timeout': self.timeout.connect,
+            'read_timeout': self.timeout.read,
+            **({'pool': self.pool_stats()} if self._client is not None else {})
+        }
+
+
+# 路由策略
+ROUTING_LEAST_OUTSTANDING = 'least_outstanding'
+ROUTING_EWMA = 'ewma'
+
+# 熔断器状态
+BREAKER_CLOSED = 'closed'  # 正常参与路由
+BREAKER_OPEN = 'open'  # 已剔除，等待健康探测恢复
+
+
+class NoAvailableBackendError(httpx.TransportError):
+    """所有OCR后端都已被熔断剔除"""
+
+
+class OCRBackend:
+    """单个OCR后端：HTTP客户端 + 熔断器状态 + 延迟统计"""
+
+    def __init__(self, client: OCRServiceClient, ewma_alpha: float):
+        self.client = client
+        self.ewma_alpha = ewma_alpha
+        self.state = BREAKER_CLOSED
+        self.consecutive_failures = 0
+        self.ewma_latency: Optional[float] = None
+        self.opened_at: Optional[float] = None
+        self.ejections = 0
+        self.last_error: Optional[str] = None
+        self.last_probe_ok: Optional[bool] = None
+
+    @property
+    def url(self) -> str:
+        return self.client.service_url
+
+    @property
+    def available(self) -> bool:
+        return self.state == BREAKER_CLOSED
+
+    def score(self, routing: str):
+        """路由打分，越小越优先；没有延迟样本的后端优先试探"""
+        in_flight = self.client.in_flight
+        latency = self.ewma_latency or 0.0
+        if routing == ROUTING_EWMA:
+            # 排队越多预期等待越久：用 EWMA 延迟乘以(在途请求数+1)估算
+            return (latency * (in_flight + 1), in_flight)
+        return (in_flight, latency)
+
+    def record_success(self, latency: float):
+        if self.ewma_latency is None:
+            self.ewma_latency = latency
+        else:
+            self.ewma_latency = self.ewma_alpha * latency + (1 - self.ewma_alpha) * self.ewma_latency
+        self.consecutive_failures = 0
+        self.last_error = None
+
+    def record_failure(self, error: str, failure_threshold: int):
+        self.consecutive_failures += 1
+        self.last_error = error
+        if self.state == BREAKER_CLOSED and self.consecutive_failures >= failure_threshold:
+            self.state = BREAKER_OPEN
+            self.opened_at = time.time()
+            self.ejections += 1
+            logger.warning(f"OCR后端已熔断剔除: {self.url} (连续失败 {self.consecutive_failures} 次: {error})")
+
+    def readmit(self):
+        self.state = BREAKER_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        logger.info(f"OCR后端健康探测成功，重新加入路由: {self.url}")
+
+    def stats(self) -> dict:
+        return {
+            'url': self.url,
+            'state': self.state,
+            'in_flight': self.client.in_flight,
+            'ewma_latency': round(self.ewma_latency, 3) if self.ewma_latency is not None else None,
+            'last_latency': round(self.client.last_latency, 3),
+            'requests_total': self.client.requests_total,
+            'errors_total': self.client.errors_total,
+            'consecutive_failures': self.consecutive_failures,
+            'ejections': self.ejections,
+            'opened_at': self.opened_at,
+            'last_error': self.last_error,
+            'last_probe_ok': self.last_probe_ok,
+        }
+
+
+class OCRBackendPool:
+    """多个OCR后端的负载均衡池"""
+
+    def __init__(self, service_urls: List[str], routing: str = ROUTING_LEAST_OUTSTANDING,
+                 failure_threshold: int = 3, probe_interval: float = 10.0, probe_timeout: float = 5.0,
+                 ewma_alpha: float = 0.3, health_urls: Optional[Dict[str, str]] = None, **client_options):
+        """
+        Args:
+            service_urls: OCR识别接口地址列表
+            routing: 路由策略 least_outstanding（最少在途请求）或 ewma（EWMA延迟）
+            failure_threshold: 连续失败多少次后熔断剔除
+            probe_interval: 后台健康探测间隔(秒)
+            probe_timeout: 单次健康探测超时(秒)
+            ewma_alpha: EWMA延迟平滑系数
+            health_urls: 按识别接口地址单独指定的健康检查地址，未指定的后端使用 default_health_url
+            client_options: 传给每个 OCRServiceClient 的超时和连接池参数
+        """
+        if not service_urls:
+            raise ValueError("至少需要配置一个OCR服务地址")
+        if routing not in (ROUTING_LEAST_OUTSTANDING, ROUTING_EWMA):
+            raise ValueError(f"不支持的路由策略: {routing}")
+        self.routing = routing
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.backends = [
+            OCRBackend(OCRServiceClient(url, health_url=(health_urls or {}).get(url), **client_options), ewma_alpha)
+            for url in service_urls
+        ]
+        self._probe_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        for backend in self.backends:
+            await backend.client.start()
+        if self._probe_task is None:
+            self._probe_task = asyncio.create_task(self._probe_loop())
+        logger.info(f"OCR后端池已启动: {len(self.backends)} 个后端, 路由策略: {self.routing}")
+
+    async def close(self):
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+        for backend in self.backends:
+            await backend.client.close()
+
+    def _pick(self) -> OCRBackend:
+        candidates = [backend for backend in self.backends if backend.available]
+        if not candidates:
+            raise NoAvailableBackendError("所有OCR后端均不可用（已熔断）")
+        return min(candidates, key=lambda backend: backend.score(self.routing))
+
+    async def post_image(self, file_bytes: bytes, filename: str = 'image.jpg') -> httpx.Response:
+        """选择一个后端发送图片；连接错误和 502/503/504 计为该后端失败
+        其他错误响应（如无法解码图片的 422、单张推理失败的 500）说明后端仍在正常处理请求，不计入熔断
+        """
+        backend = self._pick()
+        start = time.time()
+        try:
+            response = await backend.client.post_image(file_bytes, filename)
+        except httpx.TransportError as e:
+            backend.record_failure(f"{type(e).__name__}: {str(e)}", self.failure_threshold)
+            raise
+        if response.status_code in BREAKER_STATUS_CODES:
+            backend.record_failure(f"HTTP {response.status_code}", self.failure_threshold)
+        else:
+            backend.record_success(time.time() - start)
+        return response
+
+    async def _probe(self, backend: OCRBackend) -> bool:
+        try:
+            response = await backend.client.get_health(timeout=self.probe_timeout)
+            ok = response.status_code == 200
+            error = f"健康检查返回 HTTP {response.status_code}"
+        except Exception as e:
+            ok = False
+            error = f"健康检查失败: {str(e)}"
+        backend.last_probe_ok = ok
+        if ok:
+            if not backend.available:
+                backend.readmit()
+        else:
+            backend.record_failure(error, self.failure_threshold)
+        return ok
+
+    async def probe_all(self) -> List[bool]:
+        """并发探测全部后端的 /health"""
+        return await asyncio.gather(*[self._probe(backend) for backend in self.backends])
+
+    async def _probe_loop(self):
+        while True:
+            await asyncio.sleep(self.probe_interval)
+            try:
+                await self.probe_all()
+            except Exception as e:
+                logger.error(f"OCR后端健康探测出错: {str(e)}")
+
+    def routing_table(self) -> List[dict]:
+        """路由表：每个后端的状态、在途请求和延迟"""
+        return [backend.stats() for backend in self.backends]
+
+    def stats(self) -> dict:
+        return {
+            'routing': self.routing,
+            'failure_threshold': self.failure_threshold,
+            'probe_interval': self.probe_interval,
+            'available_backends': sum(1 for backend in self.backends if backend.available),
+            'total_backends': len(self.backends),
+            'backends': self.routing_table(),
+            'clients': [backend.client.stats() for backend in self.backends],
+        }
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+PP-OCRv5 推理引擎
+- 模型创建、图片解码、批量推理、结果内存序列化
+- 不依赖 Web 框架，既供 ppocrv5_server_final 单进程使用，也供多进程推理池的工作进程导入
+"""
+
+import base64
+import os
+import tempfile
+import time
+from io import BytesIO
+from typing import Any, List, Sequence, Tuple
+
+
+def build_ocr(device: str = "cpu"):
+    """创建 PaddleOCR 模型
+    关闭文档方向分类 / 文本图像矫正 / 文本行方向分类
+    Args:
+        device: cpu、gpu 或 gpu:0
+    """
+    # 延迟导入，工作进程在设置好线程数环境变量后才加载 Paddle
+    from paddleocr import PaddleOCR
+
+    if device.lower().startswith("gpu"):
+        # 使用 GPU（若环境不具备，请改为 CPU 或设置 PPOCR_DEVICE=cpu）
+        return PaddleOCR(
+            device="gpu",
+            use_doc_orientation_classify=False,
+            use_doc_unwarping=False,
+            use_textline_orientation=False,
+        )
+    # 使用 CPU
+    return PaddleOCR(
+        device="cpu",
+        use_doc_orientation_classify=False,
+        use_doc_unwarping=False,
+        use_textline_orientation=False,
+        # 指定本地模型路径（离线部署时使用）
+        # det_model_dir="/path/to/offline/models/PP-OCRv5_server_det",
+        # rec_model_dir="/path/to/offline/models/PP-OCRv5_server_rec",
+    )
+
+
+def warmup(ocr):
+    """用一张空白图片跑一次推理，提前完成模型初始化和内存分配"""
+    import numpy as np
+
+    ocr.predict(np.full((64, 256, 3), 255, dtype=np.uint8))
+
+
+def decode_image(data: bytes):
+    """将上传的图片字节解码为 RGB numpy 数组"""
+    from PIL import Image
+    import numpy as np
+
+    if len(data) == 0:
+        raise ValueError("上传的文件数据为空")
+    try:
+        image = Image.open(BytesIO(data))
+        image = image.convert('RGB') if image.mode != 'RGB' else image
+    except Exception as img_error:
+        raise ValueError(f"无法识别图片格式: {str(img_error)}")
+    return np.array(image)
+
+
+def serialize_result(res) -> List[Any]:
+    """直接在内存中序列化单个识别结果
+
+    与 save_to_json 写出的文件内容一致：res.json 的每个键对应一个 JSON 文件
+    """
+    data = res.json
+    if isinstance(data, dict):
+        return list(data.values())
+    return [data]
+
+
+def render_visualizations(res) -> dict:
+    """将可视化结果图片编码为 base64 PNG（与 save_to_img 输出的图片对应）"""
+    images = {}
+    for name, image in (res.img or {}).items():
+        buffer = BytesIO()
+        image.save(buffer, format="PNG")
+        images[name] = base64.b64encode(buffer.getvalue()).decode("ascii")
+    return images
+
+
+def _predict_single(ocr, array, data: bytes):
+    """单张推理；numpy 数组方式失败时改用临时文件路径方式"""
+    try:
+        return list(ocr.predict(array))[0]
+    except Exception as ocr_error:
+        print(f"❌ OCR 预测失败，尝试使用文件路径方式: {str(ocr_error)}")
+        with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as tmp_file:
+            tmp_file.write(data)
+            tmp_file.flush()
+        try:
+            return list(ocr.predict(tmp_file.name))[0]
+        except Exception as file_ocr_error:
+            print(f"❌ 文件路径方式也失败: {str(file_ocr_error)}")
+            raise ValueError(f"OCR 处理失败: {str(ocr_error)}")
+        finally:
+            os.unlink(tmp_file.name)
+
+
+def predict_batch(ocr, arrays: List[Any], datas: List[bytes]) -> List[Any]:
+    """整批推理；整批失败时逐张重试，避免一张坏图拖垮整批
+    Returns:
+        list: 与输入一一对应的识别结果，失败的项为 Exception
+    """
+    if len(arrays) > 1:
+        try:
+            results = list(ocr.predict(arrays))
+            if len(results) != len(arrays):
+                raise ValueError(f"结果数量与输入不一致: {len(results)} != {len(arrays)}")
+            return results
+        except Exception as batch_error:
+            print(f"❌ 批量预测失败，改为逐张预测: {str(batch_error)}")
+
+    results = []
+    for array, data in zip(arrays, datas):
+        try:
+            results.append(_predict_single(ocr, array, data))
+        except Exception as single_error:
+            results.append(single_error)
+    return results
+
+
+def run_ocr(ocr, items: Sequence[Tuple[bytes, bool]]) -> List[dict]:
+    """解码、推理并序列化一批图片
+    Args:
+        ocr: PaddleOCR 实例
+        items: [(图片字节, 是否生成可视化图片)]
+    Returns:
+        list: 与输入一一对应的 {"results", "error", "invalid_image", "timing", ["visualizations"]}
+              invalid_image 为 True 表示图片本身无法解码（客户端错误，不是服务故障）
+    """
+    outputs: List[dict] = [{"results": [], "error": None, "invalid_image": False} for _ in items]
+
+    decode_start = time.time()
+    arrays, datas, positions = [], [], []
+    for idx, (data, _) in enumerate(items):
+        try:
+            arrays.append(decode_image(data))
+            datas.append(data)
+            positions.append(idx)
+        except Exception as e:
+            outputs[idx]["error"] = str(e)
+            outputs[idx]["invalid_image"] = True
+    decode_time = time.time() - decode_start
+
+    ocr_start = time.time()
+    results = predict_batch(ocr, arrays, datas) if arrays else []
+    ocr_time = time.time() - ocr_start
+
+    serialize_start = time.time()
+    for idx, res in zip(positions, results):
+        if isinstance(res, Exception):
+            outputs[idx]["error"] = str(res)
+            continue
+        outputs[idx]["results"] = serialize_result(res)
+        if items[idx][1]:
+            outputs[idx]["visualizations"] = render_visualizations(res)
+    serialize_time = time.time() - serialize_start
+
+    for output in outputs:
+        output["timing"] = {
+            "decode_time": round(decode_time, 3),
+            "ocr_time": round(ocr_time, 3),
+            "save_time": round(serialize_time, 3),
+        }
+    return outputs
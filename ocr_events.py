@@ -0,0 +1,118 @@
+"""
+OCR状态事件推送
+在事件循环中维护订阅者列表，把每条记录的状态变化（queued / processing / completed / failed）
+推送给按记录ID或按日期订阅的客户端（SSE），替代前端轮询
+publish 可以在任意线程中调用（如OCR结果写入线程），通过 call_soon_threadsafe 切回事件循环分发
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from datetime import datetime
+from typing import Optional, Set
+
+logger = logging.getLogger('ocr_server.events')
+
+# 事件类型
+EVENT_QUEUED = 'queued'
+EVENT_PROCESSING = 'processing'
+EVENT_COMPLETED = 'completed'
+EVENT_FAILED = 'failed'
+
+
+class Subscription:
+    """单个订阅者：按记录ID或日期过滤事件"""
+
+    def __init__(self, record_id: Optional[int], date: Optional[str], max_pending: int):
+        self.record_id = record_id
+        self.date = date
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self.dropped = 0
+
+    def matches(self, event: dict) -> bool:
+        if self.record_id is not None and event['record_id'] != self.record_id:
+            return False
+        if self.date is not None and event.get('date') != self.date:
+            return False
+        return True
+
+    def offer(self, event: dict):
+        """放入事件；客户端消费过慢时丢弃最旧的事件，避免内存无限增长"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+
+class OCREventBroker:
+    """OCR状态事件分发器"""
+
+    def __init__(self, max_pending: int = 100):
+        """
+        Args:
+            max_pending: 每个订阅者最多缓存的未读事件数
+        """
+        self.max_pending = max_pending
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._subscriptions: Set[Subscription] = set()
+        self.published_total = 0
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        """绑定事件循环（在应用启动时调用）"""
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+
+    def subscribe(self, record_id: Optional[int] = None, date: Optional[str] = None) -> Subscription:
+        subscription = Subscription(record_id, date, self.max_pending)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscriptions.discard(subscription)
+
+    def publish(self, record_id: int, status: str, message: str = '', date: Optional[str] = None, **extra) -> dict:
+        """发布一条状态事件（线程安全）
+        Args:
+            record_id: 记录ID
+            status: 事件类型 queued / processing / completed / failed
+            message: 状态说明
+            date: 记录所属日期 (YYYY-MM-DD)，用于按日期订阅
+        Returns:
+            dict: 事件内容
+        """
+        event = {
+            'record_id': record_id,
+            'status': status,
+            'message': message,
+            'date': date,
+            'timestamp': datetime.now().isoformat(),
+            **extra,
+        }
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return event
+        if threading.get_ident() == self._loop_thread:
+            self._dispatch(event)
+        else:
+            loop.call_soon_threadsafe(self._dispatch, event)
+        return event
+
+    def _dispatch(self, event: dict):
+        self.published_total += 1
+        for subscription in list(self._subscriptions):
+            if subscription.matches(event):
+                subscription.offer(event)
+
+    @staticmethod
+    def format_sse(event: dict) -> str:
+        """格式化为 SSE 消息"""
+        data = json.dumps(event, ensure_ascii=False, default=str)
+        return f"event: {event['status']}\ndata: {data}\n\n"
+
+    def stats(self) -> dict:
+        return {
+            'subscribers': len(self._subscriptions),
+            'published_total': self.published_total,
+        }
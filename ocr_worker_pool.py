@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+PP-OCRv5 多进程推理池
+- 启动 N 个推理进程，每个进程持有独立预热的 PaddleOCR 模型
+- 每个进程绑定到一组 CPU 核心，OMP/MKL 线程数按分配到的核心数设置
+- 前端分发器把请求路由到当前排队最少的进程，并统计每个进程的队列深度
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Sequence, Tuple
+
+# 工作进程内的模型实例（每个进程一份）
+_worker_ocr = None
+
+
+def available_cores() -> List[int]:
+    """当前进程可用的 CPU 核心编号"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def split_cores(cores: List[int], num_workers: int) -> List[List[int]]:
+    """把核心尽量平均地切分给各工作进程；核心数少于进程数时多个进程共享核心"""
+    if num_workers <= len(cores):
+        size, extra = divmod(len(cores), num_workers)
+        slices, start = [], 0
+        for i in range(num_workers):
+            end = start + size + (1 if i < extra else 0)
+            slices.append(cores[start:end])
+            start = end
+        return slices
+    return [[cores[i % len(cores)]] for i in range(num_workers)]
+
+
+def _init_worker(device: str, cores: List[int]):
+    """工作进程初始化：绑核、设置线程数、加载并预热模型"""
+    global _worker_ocr
+
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+
+    # 线程数必须在导入 Paddle 之前设置
+    from memory_optimized_config import setup_memory_optimization, set_thread_count
+    if device.lower().startswith("gpu"):
+        set_thread_count(len(cores))
+    else:
+        setup_memory_optimization(num_threads=len(cores))
+
+    from ocr_engine import build_ocr, warmup
+    _worker_ocr = build_ocr(device)
+    warmup(_worker_ocr)
+    print(f"✅ 推理进程 {os.getpid()} 已就绪，核心: {cores}")
+
+
+def _worker_ready() -> int:
+    """确认工作进程已完成初始化"""
+    return os.getpid()
+
+
+def _worker_run(items: Sequence[Tuple[bytes, bool]]) -> List[dict]:
+    """在工作进程中执行一批推理"""
+    from ocr_engine import run_ocr
+    return run_ocr(_worker_ocr, items)
+
+
+class OCRWorker:
+    """单个推理进程及其统计信息"""
+
+    def __init__(self, worker_id: int, device: str, cores: List[int]):
+        self.worker_id = worker_id
+        self.device = device
+        self.cores = cores
+        self.executor = self._create_executor()
+        self.pid: Optional[int] = None
+        self.queue_depth = 0  # 已分发但未完成的批次数
+        self.completed = 0
+        self.failed = 0
+        self.restarts = 0
+        self.last_latency = 0.0
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        # spawn 方式启动，避免 fork 继承父进程中的线程和 Paddle 状态
+        return ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.device, self.cores),
+        )
+
+    def restart(self):
+        """推理进程异常退出（如段错误）后重建进程，模型在下一次任务时重新加载"""
+        self.executor.shutdown(wait=False)
+        self.executor = self._create_executor()
+        self.pid = None
+        self.restarts += 1
+
+    def stats(self) -> dict:
+        return {
+            "worker_id": self.worker_id,
+            "pid": self.pid,
+            "cores": self.cores,
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "failed": self.failed,
+            "restarts": self.restarts,
+            "last_latency": round(self.last_latency, 3),
+        }
+
+
+class OCRWorkerPool:
+    """多进程推理池与分发器"""
+
+    def __init__(self, num_workers: int, device: str = "cpu", cores: Optional[List[int]] = None):
+        """
+        Args:
+            num_workers: 推理进程数
+            device: 推理设备
+            cores: 参与分配的核心列表，默认为当前进程可用的全部核心
+        """
+        cores = cores or available_cores()
+        self.workers = [
+            OCRWorker(i, device, worker_cores)
+            for i, worker_cores in enumerate(split_cores(cores, num_workers))
+        ]
+
+    async def start(self):
+        """启动全部进程并等待模型加载、预热完成"""
+        loop = asyncio.get_running_loop()
+        pids = await asyncio.gather(*[
+            loop.run_in_executor(worker.executor, _worker_ready) for worker in self.workers
+        ])
+        for worker, pid in zip(self.workers, pids):
+            worker.pid = pid
+
+    async def stop(self):
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[
+            loop.run_in_executor(None, lambda w=worker: w.executor.shutdown(wait=True))
+            for worker in self.workers
+        ])
+
+    def _pick(self) -> OCRWorker:
+        """选择排队最少的进程（相同时选最近延迟较低的）"""
+        return min(self.workers, key=lambda w: (w.queue_depth, w.last_latency))
+
+    async def run(self, items: Sequence[Tuple[bytes, bool]]) -> List[dict]:
+        """把一批图片分发到空闲进程执行
+        Returns:
+            list: 与输入一一对应的推理结果，额外带 worker_id
+        """
+        worker = self._pick()
+        executor = worker.executor
+        worker.queue_depth += 1
+        start = time.time()
+        try:
+            loop = asyncio.get_running_loop()
+            outputs = await loop.run_in_executor(executor, _worker_run, list(items))
+            worker.completed += 1
+        except BrokenProcessPool:
+            worker.failed += 1
+            # 同一进程上的并发任务会同时失败，只重建一次
+            if worker.executor is executor:
+                print(f"❌ 推理进程 {worker.worker_id} 异常退出，正在重建")
+                worker.restart()
+            raise
+        except Exception:
+            worker.failed += 1
+            raise
+        finally:
+            worker.queue_depth -= 1
+            worker.last_latency = time.time() - start
+
+        for output in outputs:
+            output["worker_id"] = worker.worker_id
+        return outputs
+
+    def stats(self) -> List[dict]:
+        return [worker.stats() for worker in self.workers]
@@ -2,50 +2,208 @@
 """
 最简版 OCR 服务（Python API 版本）
 - 启动时仅加载一次 PaddleOCR 模型（按用户给定参数：关闭三个可选模块）
-- 仅提供 /ocr 接口：接收图片，调用 ocr.predict 处理
-- 将结果保存为 JSON 到临时目录，并读回内容作为返回值
+- 提供 /ocr 接口：接收图片，调用 ocr.predict 处理
+- 提供 /ocr/batch 接口：一次请求上传多张图片，合并为一次 ocr.predict 批量推理
+- 并发的 /ocr 请求在服务端自动合批（micro-batching），按最大等待时间/最大批量合并推理
+- 识别结果直接在内存中序列化返回；可视化图片仅在请求带 visualize=true 时生成
+- 设置 PPOCR_WORKERS=N 时启用多进程推理池：N 个进程各自持有预热模型并绑定到不同核心
 """
 
 import os
-import json
-import tempfile
+import asyncio
 import time
-from pathlib import Path
-from typing import List, Any
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import List, Any, Callable, Awaitable, Sequence, Tuple
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
+from ocr_engine import build_ocr, run_ocr
+from ocr_worker_pool import OCRWorkerPool
+
 # 依据环境变量配置设备，默认为 cpu；可设置 PPOCR_DEVICE=gpu 或 gpu:0
 PPOCR_DEVICE = os.environ.get("PPOCR_DEVICE", "cpu")
 
-# 延迟导入以加快模块加载提示
-from paddleocr import PaddleOCR
-
-# 全局仅初始化一次模型
-# 关闭文档方向分类 / 文本图像矫正 / 文本行方向分类，等同你提供的示例
-if PPOCR_DEVICE.lower().startswith("gpu"):
-    # 使用 GPU（若环境不具备，请改为 CPU 或设置 PPOCR_DEVICE=cpu）
-    ocr = PaddleOCR(
-        device="gpu",
-        use_doc_orientation_classify=False,
-        use_doc_unwarping=False,
-        use_textline_orientation=False,
-    )
-else:
-    # 使用 CPU
-    ocr = PaddleOCR(
-        device="cpu",
-        use_doc_orientation_classify=False,
-        use_doc_unwarping=False,
-        use_textline_orientation=False,
-        # 指定本地模型路径（离线部署时使用）
-        # det_model_dir="/path/to/offline/models/PP-OCRv5_server_det",
-        # rec_model_dir="/path/to/offline/models/PP-OCRv5_server_rec",
-    )
-
-app = FastAPI(title="Minimal PP-OCRv5 Service (Python API)", version="1.0.0")
+# 推理进程数：0 表示在服务进程内加载单个模型；N>0 时启动 N 个推理进程
+PPOCR_WORKERS = int(os.environ.get("PPOCR_WORKERS", "0"))
+
+# 单次批量请求允许的最大图片数量
+PPOCR_MAX_BATCH_SIZE = int(os.environ.get("PPOCR_MAX_BATCH_SIZE", "16"))
+
+# 单张图片大小限制
+MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+
+# /ocr 服务端合批配置：最多合并多少个请求、第一个请求最多等待多久(毫秒)
+PPOCR_BATCH_MAX_SIZE = int(os.environ.get("PPOCR_BATCH_MAX_SIZE", "8"))
+PPOCR_BATCH_MAX_DELAY_MS = float(os.environ.get("PPOCR_BATCH_MAX_DELAY_MS", "10"))
+
+# 单进程模式下全局仅初始化一次模型；推理池模式下模型由各推理进程加载
+ocr = build_ocr(PPOCR_DEVICE) if PPOCR_WORKERS <= 0 else None
+worker_pool = OCRWorkerPool(PPOCR_WORKERS, PPOCR_DEVICE) if PPOCR_WORKERS > 0 else None
+
+# PaddleOCR 实例非线程安全，单进程模式下所有推理都在这个单线程执行器中串行进行，避免阻塞事件循环
+predict_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ppocr-predict")
+
+
+async def run_images(items: Sequence[Tuple[bytes, bool]]) -> List[dict]:
+    """执行一批推理：推理池模式分发到空闲进程，否则在本进程的推理线程中执行
+    Args:
+        items: [(图片字节, 是否生成可视化图片)]
+    Returns:
+        list: 与输入一一对应的 {"results", "error", "timing", ["visualizations"], ["worker_id"]}
+    """
+    if worker_pool is not None:
+        return await worker_pool.run(items)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(predict_executor, run_ocr, ocr, list(items))
+
+
+class BatcherStopped(RuntimeError):
+    """合批器已停止（服务关闭），请求未被处理"""
+
+
+class MicroBatcher:
+    """服务端请求合并器
+
+    并发请求先进入 asyncio 队列；批处理循环取到第一个请求后，
+    最多再等待 max_delay 秒或凑满 max_batch_size 个请求，然后一次性交给 run_batch 推理，
+    再把各自的结果分发回对应的请求
+    """
+
+    def __init__(self, run_batch: Callable[[List[Any]], Awaitable[List[Any]]], max_batch_size: int,
+                 max_delay: float, max_concurrency: int = 1):
+        """
+        Args:
+            run_batch: 异步批处理函数，输入列表，按顺序返回结果列表（单项可为 Exception）
+            max_batch_size: 单批最大请求数
+            max_delay: 第一个请求进入后最多等待的秒数
+            max_concurrency: 同时在执行的批次数（推理池模式下等于进程数）
+        """
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_delay = max(0.0, max_delay)
+        self.max_concurrency = max(1, max_concurrency)
+        self._queue: asyncio.Queue = None
+        self._task: asyncio.Task = None
+        self._semaphore: asyncio.Semaphore = None
+        self._running: set = set()
+        self._stopped = False
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._stopped = False
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """停止合批：已开始推理的批次执行完毕，仍在排队的请求以 BatcherStopped 失败返回"""
+        self._stopped = True
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+        pending = []
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        self._fail(pending)
+
+    @staticmethod
+    def _fail(batch):
+        for _, future, _ in batch:
+            if not future.done():
+                future.set_exception(BatcherStopped("OCR服务正在关闭，请求未处理"))
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def submit(self, item: Any):
+        """提交单个请求，等待其所在批次完成
+        Returns:
+            tuple: (结果, 批次信息 {"batch_size", "batch_wait_time"})
+        """
+        if self._stopped:
+            raise BatcherStopped("OCR服务正在关闭，请求未处理")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future, time.time()))
+        return await future
+
+    async def _loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            try:
+                deadline = loop.time() + self.max_delay
+                while len(batch) < self.max_batch_size:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+                await self._semaphore.acquire()
+            except asyncio.CancelledError:
+                # 已从队列取出但还未开始推理的请求
+                self._fail(batch)
+                raise
+            task = asyncio.create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch):
+        batch_start = time.time()
+        try:
+            outputs = await self.run_batch([item for item, _, _ in batch])
+        except Exception as e:
+            outputs = [e] * len(batch)
+        finally:
+            self._semaphore.release()
+
+        for (_, future, enqueued_at), output in zip(batch, outputs):
+            if future.done():
+                continue
+            if isinstance(output, Exception):
+                future.set_exception(output)
+            else:
+                future.set_result((output, {
+                    "batch_size": len(batch),
+                    "batch_wait_time": round(batch_start - enqueued_at, 3)
+                }))
+
+
+batcher = MicroBatcher(
+    run_images,
+    max_batch_size=PPOCR_BATCH_MAX_SIZE,
+    max_delay=PPOCR_BATCH_MAX_DELAY_MS / 1000.0,
+    max_concurrency=max(1, PPOCR_WORKERS),
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if worker_pool is not None:
+        start = time.time()
+        print(f"🚀 正在启动 {len(worker_pool.workers)} 个推理进程...")
+        await worker_pool.start()
+        print(f"✅ 推理进程已全部就绪，耗时 {time.time() - start:.1f}秒")
+        for stats in worker_pool.stats():
+            print(f"   进程 {stats['worker_id']}: pid={stats['pid']}, 核心={stats['cores']}")
+    await batcher.start()
+    print(f"✅ 请求合批已启用: 最大批量 {batcher.max_batch_size}, 最大等待 {PPOCR_BATCH_MAX_DELAY_MS}ms")
+    yield
+    await batcher.stop()
+    if worker_pool is not None:
+        await worker_pool.stop()
+    predict_executor.shutdown(wait=True)
+
+
+app = FastAPI(title="Minimal PP-OCRv5 Service (Python API)", version="1.0.0", lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -55,21 +213,23 @@ app.add_middleware(
 )
 
 @app.post("/ocr")
-async def ocr_endpoint(file: UploadFile = File(...)) -> Any:
+async def ocr_endpoint(
+    file: UploadFile = File(...),
+    visualize: bool = Query(False, description="是否返回可视化结果图片(base64 PNG)")
+) -> Any:
     start_time = time.time()
     print(f"🚀 开始处理OCR请求: {file.filename}")
     print(f"📥 收到文件上传请求:")
     print(f"   文件名: {file.filename}")
     print(f"   内容类型: {file.content_type}")
     print(f"   文件大小: {file.size if hasattr(file, 'size') else '未知'}")
-    
+
     if not file.content_type or not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="只支持图片文件")
-    
+
     # 检查文件大小限制（可选）
-    max_file_size = 10 * 1024 * 1024  # 10MB
-    if hasattr(file, 'size') and file.size and file.size > max_file_size:
-        raise HTTPException(status_code=400, detail=f"文件大小超过限制: {file.size} > {max_file_size}")
+    if hasattr(file, 'size') and file.size and file.size > MAX_FILE_SIZE:
+        raise HTTPException(status_code=400, detail=f"文件大小超过限制: {file.size} > {MAX_FILE_SIZE}")
 
     # 读取图片数据到内存
     read_start = time.time()
@@ -77,138 +237,149 @@ async def ocr_endpoint(file: UploadFile = File(...)) -> Any:
     read_time = time.time() - read_start
     print(f"📏 文件大小: {len(data)} 字节")
     print(f"⏱️  文件读取耗时: {read_time:.3f}秒")
-    
-    # 使用 BytesIO 直接在内存中处理图片
-    from io import BytesIO
-    from PIL import Image
-    import numpy as np
-    
+
     try:
         # 检查数据是否为空
         if len(data) == 0:
-            raise ValueError("上传的文件数据为空")
-        
-        print(f"🔍 数据前20字节: {data[:20].hex()}")
-        
-        # 从内存数据创建 PIL Image
-        try:
-            image = Image.open(BytesIO(data))
-            print(f"🖼️  图片信息: {image.size} {image.mode}")
-        except Exception as img_error:
-            print(f"❌ PIL 无法识别图片: {str(img_error)}")
-            # 尝试保存到临时文件进行调试
-            with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as tmp_file:
-                tmp_file.write(data)
-                tmp_file.flush()
-                print(f"💾 调试：文件已保存到 {tmp_file.name}")
-                try:
-                    # 尝试从文件读取
-                    image = Image.open(tmp_file.name)
-                    print(f"✅ 从文件读取成功: {image.size} {image.mode}")
-                except Exception as file_error:
-                    print(f"❌ 从文件读取也失败: {str(file_error)}")
-                    raise ValueError(f"无法识别图片格式: {str(img_error)}")
-                finally:
-                    # 清理临时文件
-                    import os
-                    os.unlink(tmp_file.name)
-        
-        # 转换为 RGB 模式（如果需要）
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-            print(f"🔄 转换为 RGB 模式")
-        
-        # 转换为 numpy 数组
-        image_array = np.array(image)
+            raise HTTPException(status_code=422, detail="上传的文件数据为空")
+
+        # 提交到合批队列，与并发请求合并为一次预测（解码、推理、序列化都在推理线程/进程中完成）
         print(f"🔍 开始OCR识别 (内存处理)")
-        
-        # 直接使用 numpy 数组进行预测
-        ocr_start = time.time()
         try:
-            results = ocr.predict(image_array)
-            ocr_time = time.time() - ocr_start
-            print(f"⏱️  OCR识别耗时: {ocr_time:.3f}秒")
-        except Exception as ocr_error:
-            print(f"❌ OCR 预测失败: {str(ocr_error)}")
-            # 尝试使用文件路径方式
-            print("🔄 尝试使用文件路径方式...")
-            with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as tmp_file:
-                tmp_file.write(data)
-                tmp_file.flush()
-                try:
-                    results = ocr.predict(tmp_file.name)
-                    print("✅ 文件路径方式成功")
-                except Exception as file_ocr_error:
-                    print(f"❌ 文件路径方式也失败: {str(file_ocr_error)}")
-                    raise ValueError(f"OCR 处理失败: {str(ocr_error)}")
-                finally:
-                    import os
-                    os.unlink(tmp_file.name)
-        
-        # 打印识别结果
-        print(f"\n🔍 OCR 识别结果 (文件: {file.filename}):")
-        print("=" * 50)
-        
-        for idx, res in enumerate(results):
-            print(f"📄 第 {idx + 1} 个结果:")
-            res.print()  # 打印详细结果
-            print("-" * 30)
-
-        # 使用临时目录保存输出结果
-        save_start = time.time()
-        with tempfile.TemporaryDirectory() as tmpdir:
-            out_dir = Path(tmpdir) / "output"
-            out_dir.mkdir(parents=True, exist_ok=True)
-        
-            # 将结果保存到临时目录，并读回 JSON 内容
-            saved_json_files: List[str] = []
-            saved_img_files: List[str] = []
-            aggregated: List[Any] = []
-
-            for idx, res in enumerate(results):
-                # 保存可视化结果图片与 JSON
-                res.save_to_img(str(out_dir))
-                res.save_to_json(str(out_dir))
-
-            # 读取保存的 JSON 文件
-            for p in sorted(out_dir.glob("*.json")):
-                try:
-                    aggregated.append(json.loads(p.read_text(encoding="utf-8")))
-                    saved_json_files.append(str(p))
-                except Exception:
-                    continue
-
-            # 收集保存的图片文件（若有）
-            for p in sorted(out_dir.glob("*.png")):
-                if p.is_file():
-                    saved_img_files.append(str(p))
-
-        save_time = time.time() - save_start
+            output, batch_info = await batcher.submit((data, visualize))
+        except BatcherStopped as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        if output.get("invalid_image"):
+            # 图片无法解码是请求本身的问题，返回4xx，调用方不应重试或将本服务计为故障
+            raise HTTPException(status_code=422, detail=f"图片无法解码: {output['error']}")
+        if output["error"]:
+            raise ValueError(output["error"])
+
+        timing = output["timing"]
         total_time = time.time() - start_time
-        
-        print(f"⏱️  结果保存耗时: {save_time:.3f}秒")
+        print(f"⏱️  OCR识别耗时: {timing['ocr_time']:.3f}秒 (批量 {batch_info['batch_size']}, 等待 {batch_info['batch_wait_time']:.3f}秒)")
+        print(f"⏱️  结果序列化耗时: {timing['save_time']:.3f}秒")
         print(f"⏱️  总处理耗时: {total_time:.3f}秒")
         print(f"✅ OCR处理完成")
 
-        return {
+        response = {
             "status": "success",
-            "results": aggregated,  # 直接返回 JSON 解析后的结构
-            "saved_json_files": saved_json_files,
-            "saved_image_files": saved_img_files,
+            "results": output["results"],  # 直接返回 JSON 结构
             "timing": {
                 "file_read_time": round(read_time, 3),
-                "ocr_time": round(ocr_time, 3),
-                "save_time": round(save_time, 3),
-                "total_time": round(total_time, 3)
+                "decode_time": timing["decode_time"],
+                "ocr_time": timing["ocr_time"],
+                "save_time": timing["save_time"],
+                "total_time": round(total_time, 3),
+                "batch_size": batch_info["batch_size"],
+                "batch_wait_time": batch_info["batch_wait_time"]
             }
         }
-        
+        if "worker_id" in output:
+            response["timing"]["worker_id"] = output["worker_id"]
+        if visualize:
+            response["visualizations"] = output.get("visualizations", {})
+        return response
+
+    except HTTPException:
+        raise
     except Exception as e:
         total_time = time.time() - start_time
         print(f"❌ 图片处理失败: {str(e)}")
         print(f"⏱️  失败前耗时: {total_time:.3f}秒")
         raise HTTPException(status_code=500, detail=f"图片处理失败: {str(e)}")
 
+@app.post("/ocr/batch")
+async def ocr_batch_endpoint(
+    files: List[UploadFile] = File(...),
+    visualize: bool = Query(False, description="是否返回可视化结果图片(base64 PNG)")
+) -> Any:
+    """批量OCR：一次上传多张图片，合并为一次 ocr.predict 调用，按上传顺序返回结果"""
+    start_time = time.time()
+    print(f"🚀 开始处理批量OCR请求: {len(files)} 张图片")
+
+    if not files:
+        raise HTTPException(status_code=400, detail="未上传图片")
+    if len(files) > PPOCR_MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"图片数量超过限制: {len(files)} > {PPOCR_MAX_BATCH_SIZE}"
+        )
+
+    # 读取全部图片，单张失败不影响其他图片
+    read_start = time.time()
+    items: List[dict] = []
+    for idx, file in enumerate(files):
+        item = {"index": idx, "filename": file.filename, "data": None, "error": None}
+        try:
+            if not file.content_type or not file.content_type.startswith("image/"):
+                raise ValueError("只支持图片文件")
+            data = await file.read()
+            if len(data) > MAX_FILE_SIZE:
+                raise ValueError(f"文件大小超过限制: {len(data)} > {MAX_FILE_SIZE}")
+            item["data"] = data
+        except Exception as e:
+            item["error"] = str(e)
+            print(f"❌ 第 {idx + 1} 张图片无效 ({file.filename}): {str(e)}")
+        items.append(item)
+    read_time = time.time() - read_start
+
+    valid_items = [item for item in items if item["error"] is None]
+    timing = {"decode_time": 0.0, "ocr_time": 0.0, "save_time": 0.0}
+    worker_id = None
+    if valid_items:
+        try:
+            outputs = await run_images([(item["data"], visualize) for item in valid_items])
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"批量OCR处理失败: {str(e)}")
+        for item, output in zip(valid_items, outputs):
+            if output["error"]:
+                item["error"] = f"OCR 处理失败: {output['error']}"
+            item["results"] = output["results"]
+            item["visualizations"] = output.get("visualizations", {})
+        timing = outputs[0]["timing"]
+        worker_id = outputs[0].get("worker_id")
+        print(f"⏱️  批量OCR识别耗时: {timing['ocr_time']:.3f}秒 ({len(valid_items)} 张)")
+
+    total_time = time.time() - start_time
+    print(f"⏱️  批量总处理耗时: {total_time:.3f}秒")
+
+    response = {
+        "status": "success",
+        "count": len(items),
+        "results": [
+            {
+                "index": item["index"],
+                "filename": item["filename"],
+                "status": "failed" if item["error"] else "success",
+                "error": item["error"],
+                "results": item.get("results", []),
+                **({"visualizations": item.get("visualizations", {})} if visualize else {}),
+            }
+            for item in items
+        ],
+        "timing": {
+            "file_read_time": round(read_time, 3),
+            "decode_time": timing["decode_time"],
+            "ocr_time": timing["ocr_time"],
+            "save_time": timing["save_time"],
+            "total_time": round(total_time, 3),
+            "batch_size": len(valid_items)
+        }
+    }
+    if worker_id is not None:
+        response["timing"]["worker_id"] = worker_id
+    return response
+
+@app.get("/workers")
+async def workers():
+    """推理池状态：每个推理进程的核心分配、队列深度和处理统计"""
+    return {
+        "mode": "pool" if worker_pool is not None else "single",
+        "batch_queue_depth": batcher.queue_depth(),
+        "workers": worker_pool.stats() if worker_pool is not None else [],
+    }
+
 @app.get("/")
 async def root():
     """根路径 - 服务状态检查"""
@@ -217,17 +388,27 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "ocr": "POST /ocr - 上传图片进行OCR识别",
+            "ocr_batch": "POST /ocr/batch - 一次上传多张图片进行批量OCR识别",
+            "workers": "GET /workers - 推理进程状态",
             "docs": "GET /docs - API文档"
         },
-        "device": PPOCR_DEVICE
+        "device": PPOCR_DEVICE,
+        "workers": PPOCR_WORKERS
     }
 
 @app.get("/health")
 async def health():
     """健康检查"""
-    return {"status": "healthy", "service": "PP-OCRv5"}
+    response = {"status": "healthy", "service": "PP-OCRv5"}
+    if worker_pool is not None:
+        response["workers"] = [
+            {"worker_id": w["worker_id"], "queue_depth": w["queue_depth"]}
+            for w in worker_pool.stats()
+        ]
+    return response
 
 if __name__ == "__main__":
     host = os.environ.get("HOST", "0.0.0.0")
     port = int(os.environ.get("PORT", "8080"))
-    uvicorn.run("ppocrv5_server_final:app", host=host, port=port, workers=1, log_level="info") 
\ No newline at end of file
+    # 直接传入 app 对象，避免 uvicorn 按模块路径再次导入本文件导致模型重复加载
+    uvicorn.run(app, host=host, port=port, workers=1, log_level="info")
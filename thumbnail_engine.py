@@ -0,0 +1,143 @@
+"""
+缩略图生成引擎
+- JPEG 使用 Image.draft 在解码时按 DCT 缩放（1/2、1/4、1/8），只解码接近目标尺寸的像素，不再完整解码几千万像素的原图
+- 多个尺寸从大到小依次缩放，原图只解码一次
+- 缩放和编码在独立的进程池中执行，CPU密集的工作不与API进程争用GIL
+工作进程只导入本模块和 PIL，使用 spawn 方式启动，不继承API进程中的线程和数据库连接
+"""
+
+import logging
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple, Union
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger('ocr_server.thumbnail_engine')
+
+# 每个尺寸同时生成 WebP 和 JPEG（扩展名, PIL格式）
+THUMBNAIL_FORMATS = (('webp', 'WEBP'), ('jpg', 'JPEG'))
+
+
+def thumbnail_path(image_path: str, size: int, ext: str) -> str:
+    """缩略图相对于上传目录的路径: thumbnails/<尺寸>/<原文件名>.<扩展名>"""
+    return f"thumbnails/{size}/{Path(image_path).stem}.{ext}"
+
+
+def draft_size(image_size: Tuple[int, int], max_side: int) -> Tuple[int, int]:
+    """原图等比缩放到最长边为 max_side 时的尺寸，作为 draft 的目标尺寸（draft 只会缩小到不低于该尺寸）"""
+    ratio = max(image_size) / max_side
+    if ratio <= 1:
+        return image_size
+    return math.ceil(image_size[0] / ratio), math.ceil(image_size[1] / ratio)
+
+
+def render_thumbnails(upload_dir: str, image_path: str, sizes: Sequence[int], quality: int = 80,
+                      output_dir: Optional[str] = None) -> List[int]:
+    """生成各尺寸的 WebP 和 JPEG 缩略图（在工作进程中执行）
+    Args:
+        upload_dir: 上传目录
+        image_path: 上传目录中的文件名
+        sizes: 缩略图最长边(像素)
+        quality: 编码质量
+        output_dir: 缩略图输出目录（其下的 thumbnails/<尺寸>/），默认为上传目录
+    Returns:
+        List[int]: 已生成的尺寸（从小到大）
+    """
+    sizes = sorted(sizes)
+    upload_dir = Path(upload_dir)
+    output_dir = Path(output_dir) if output_dir else upload_dir
+    with Image.open(upload_dir / image_path) as img:
+        # 只对 JPEG 生效：按最大的缩略图尺寸选择 DCT 缩放比例，其他格式忽略
+        img.draft('RGB', draft_size(img.size, sizes[-1]))
+        img = ImageOps.exif_transpose(img).convert('RGB')
+    for size in reversed(sizes):
+        # 保持宽高比，不放大小图；每个尺寸在上一个尺寸的结果上继续缩小
+        img.thumbnail((size, size), Image.LANCZOS)
+        (output_dir / "thumbnails" / str(size)).mkdir(parents=True, exist_ok=True)
+        for ext, image_format in THUMBNAIL_FORMATS:
+            img.save(str(output_dir / thumbnail_path(image_path, size, ext)), image_format, quality=quality)
+    return sizes
+
+
+class ThumbnailEngine:
+    """缩略图进程池（在应用启动时创建，关闭时释放）"""
+
+    def __init__(self, upload_dir: Union[str, Path], sizes: Sequence[int], quality: int = 80,
+                 workers: Optional[int] = None, output_dir: Optional[Union[str, Path]] = None):
+        """
+        Args:
+            upload_dir: 上传目录
+            sizes: 缩略图最长边(像素)
+            quality: 编码质量
+            workers: 工作进程数，默认 CPU 核数的一半
+            output_dir: 缩略图输出目录，默认为上传目录
+        """
+        self.upload_dir = str(upload_dir)
+        self.output_dir = str(output_dir) if output_dir else None
+        self.sizes = sorted(sizes)
+        self.quality = quality
+        self.workers = workers or max(1, (os.cpu_count() or 2) // 2)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.rendered = 0
+        self.total_seconds = 0.0
+
+    def start(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            logger.info(f"缩略图进程池已创建: {self.workers} 个进程, 尺寸: {self.sizes}")
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+            logger.info("缩略图进程池已关闭")
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            raise RuntimeError("缩略图进程池尚未创建")
+        return self._executor
+
+    def _submit(self, image_path: str):
+        return self.executor.submit(
+            render_thumbnails, self.upload_dir, image_path, self.sizes, self.quality, self.output_dir
+        )
+
+    def render(self, image_path: str) -> List[int]:
+        """生成一张图片的缩略图，阻塞等待结果（在线程池中调用）"""
+        start = time.perf_counter()
+        sizes = self._submit(image_path).result()
+        self.rendered += 1
+        self.total_seconds += time.perf_counter() - start
+        return sizes
+
+    def render_batch(self, image_paths: Sequence[str]) -> List[Union[List[int], Exception]]:
+        """一批图片分发到所有工作进程并行生成，按输入顺序返回每张的尺寸列表或异常"""
+        start = time.perf_counter()
+        futures = [self._submit(image_path) for image_path in image_paths]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+                self.rendered += 1
+            except Exception as e:
+                results.append(e)
+        self.total_seconds += time.perf_counter() - start
+        return results
+
+    def stats(self) -> dict:
+        return {
+            'started': self._executor is not None,
+            'workers': self.workers,
+            'sizes': self.sizes,
+            'rendered': self.rendered,
+            'avg_seconds': round(self.total_seconds / self.rendered, 4) if self.rendered else 0,
+        }
@@ -0,0 +1,180 @@
+"""
+流式接收上传文件
+直接解析请求体（multipart/form-data），不经过 Starlette 的临时文件：
+- 每收到一块数据就在线程池中追加写入磁盘，事件循环不执行阻塞的文件IO
+- 边接收边计算 SHA-256 并检查大小，超过上限立即中止，不再继续读取请求体
+- 接收到的字节保留在内存中，交给OCR时无需重新读取文件
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import List
+
+from multipart.multipart import MultipartParser, parse_options_header
+from starlette.requests import Request
+
+logger = logging.getLogger('ocr_server.upload_stream')
+
+# multipart 边界和各部分头部的额外开销上限，用于按 Content-Length 提前拒绝
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadError(ValueError):
+    """请求格式不正确（不是 multipart、缺少文件字段、文件类型不符等）"""
+
+
+class UploadTooLarge(UploadError):
+    """上传内容超过大小上限"""
+
+    def __init__(self, max_size: int):
+        super().__init__(f"文件超过大小上限 ({max_size / 1024 / 1024:.0f}MB)")
+        self.max_size = max_size
+
+
+class StreamedUpload:
+    """已接收的上传文件"""
+
+    def __init__(self, path: Path, content: bytes, content_hash: str, content_type: str, filename: str):
+        self.path = path
+        self.content = content
+        self.content_hash = content_hash
+        self.content_type = content_type
+        self.filename = filename
+
+    @property
+    def size(self) -> int:
+        return len(self.content)
+
+
+class _FilePartCollector:
+    """multipart 解析回调：只收集指定字段的文件数据，其余字段忽略"""
+
+    def __init__(self, field_name: str, content_type_prefix: str):
+        self.field_name = field_name.encode()
+        self.content_type_prefix = content_type_prefix
+        self.headers = {}
+        self._header_name: List[bytes] = []
+        self._header_value: List[bytes] = []
+        self.in_target = False
+        self.found = False
+        self.content_type = ''
+        self.filename = ''
+        # 本次 parser.write 产生的文件数据（由调用方取走后写入磁盘）
+        self.pending: List[bytes] = []
+
+    def callbacks(self) -> dict:
+        return {
+            'on_part_begin': self.on_part_begin,
+            'on_header_field': lambda data, start, end: self._header_name.append(data[start:end]),
+            'on_header_value': lambda data, start, end: self._header_value.append(data[start:end]),
+            'on_header_end': self.on_header_end,
+            'on_headers_finished': self.on_headers_finished,
+            'on_part_data': self.on_part_data,
+            'on_part_end': self.on_part_end,
+        }
+
+    def on_part_begin(self):
+        self.headers = {}
+
+    def on_header_end(self):
+        self.headers[b''.join(self._header_name).lower()] = b''.join(self._header_value)
+        self._header_name.clear()
+        self._header_value.clear()
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self.headers.get(b'content-disposition'))
+        self.in_target = options.get(b'name') == self.field_name and not self.found
+        if not self.in_target:
+            return
+        content_type = self.headers.get(b'content-type', b'').decode('latin-1').strip().lower()
+        if not content_type.startswith(self.content_type_prefix):
+            raise UploadError("请选择有效的图片文件")
+        self.content_type = content_type
+        self.filename = options.get(b'filename', b'').decode('utf-8', 'replace')
+
+    def on_part_data(self, data, start, end):
+        if self.in_target:
+            self.pending.append(bytes(data[start:end]))
+
+    def on_part_end(self):
+        if self.in_target:
+            self.found = True
+            self.in_target = False
+
+    def take_pending(self) -> bytes:
+        if not self.pending:
+            return b''
+        data = b''.join(self.pending)
+        self.pending.clear()
+        return data
+
+
+async def receive_upload(request: Request, target_path: Path, max_size: int, executor: Executor,
+                         field_name: str = 'file', content_type_prefix: str = 'image/') -> StreamedUpload:
+    """流式接收 multipart 请求中的文件字段并写入 target_path
+    出错（格式错误、超过大小、客户端断开）时删除已写入的部分文件
+    Args:
+        request: 请求
+        target_path: 文件保存路径
+        max_size: 文件大小上限(字节)
+        executor: 执行文件写入的线程池
+        field_name: 文件字段名
+        content_type_prefix: 允许的文件类型前缀
+    Raises:
+        UploadTooLarge: 超过大小上限
+        UploadError: 请求格式不正确
+    """
+    content_type, options = parse_options_header(request.headers.get('content-type', ''))
+    boundary = options.get(b'boundary')
+    if content_type != b'multipart/form-data' or not boundary:
+        raise UploadError("请求必须为 multipart/form-data")
+
+    # 声明的请求体已经超过上限时不读取请求体
+    content_length = request.headers.get('content-length')
+    if content_length and content_length.isdigit() and int(content_length) > max_size + MULTIPART_OVERHEAD:
+        raise UploadTooLarge(max_size)
+
+    loop = asyncio.get_running_loop()
+    collector = _FilePartCollector(field_name, content_type_prefix)
+    parser = MultipartParser(boundary, collector.callbacks())
+    hasher = hashlib.sha256()
+    chunks: List[bytes] = []
+    size = 0
+
+    file = await loop.run_in_executor(executor, open, target_path, 'wb')
+    try:
+        async for body_chunk in request.stream():
+            parser.write(body_chunk)
+            data = collector.take_pending()
+            if not data:
+                continue
+            size += len(data)
+            if size > max_size:
+                raise UploadTooLarge(max_size)
+            hasher.update(data)
+            chunks.append(data)
+            await loop.run_in_executor(executor, file.write, data)
+        parser.finalize()
+        if not collector.found:
+            raise UploadError(f"缺少文件字段: {field_name}")
+        await loop.run_in_executor(executor, file.close)
+    except BaseException:
+        await loop.run_in_executor(executor, _discard, file, target_path)
+        raise
+
+    return StreamedUpload(target_path, b''.join(chunks), hasher.hexdigest(),
+                          collector.content_type, collector.filename)
+
+
+def _discard(file, path: Path):
+    try:
+        file.close()
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass